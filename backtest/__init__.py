@@ -0,0 +1,6 @@
+"""
+Backtest package
+"""
+from .engine import backtest_signals, run_sweep, load_signals
+
+__all__ = ['backtest_signals', 'run_sweep', 'load_signals']
@@ -0,0 +1,204 @@
+"""
+Векторизованный бэктест сигналов с лестницей TP1/TP2/TP3 и стоп-лоссом
+
+Повторяет логику SignalExecutor.execute_signal: рыночный вход в зоне входа, стоп-лосс на всю
+позицию, TP1 и TP2 по 30% и TP3 на остаток. Все сигналы одного инструмента обрабатываются
+пачками как матрицы (сигнал x минута), без цикла Python по свечам.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Sequence
+import numpy as np
+
+# Доли позиции, закрываемые на TP1, TP2 и TP3 (остаток)
+DEFAULT_TP_SIZES = (0.3, 0.3, 0.4)
+
+# Исходы сигнала в колонке 'outcome'
+OUTCOME_NOT_FILLED = 0
+OUTCOME_SL = 1
+OUTCOME_TP1 = 2
+OUTCOME_TP2 = 3
+OUTCOME_TP3 = 4
+OUTCOME_OPEN = 5  # Позиция не закрыта до конца горизонта и оценена по последней цене
+
+OUTCOME_NAMES = ('not_filled', 'sl', 'tp1', 'tp2', 'tp3', 'open')
+
+def load_signals(path: str) -> Dict[str, np.ndarray]:
+    """Загрузка сигналов из .npz, записанного strategies.signals.batch_replay"""
+    with np.load(path) as data:
+        signals = {name: data[name] for name in data.files}
+    signals['ts'] = signals['date'].astype('datetime64[ms]').astype(np.int64)
+    return signals
+
+def _first_true(mask: np.ndarray) -> np.ndarray:
+    """Индекс первого True в каждой строке или ширина матрицы, если True нет"""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+def _simulate_chunk(candles: Dict[str, np.ndarray], signal_ts: np.ndarray, is_buy: np.ndarray,
+                    zone_low: np.ndarray, zone_high: np.ndarray, tps: np.ndarray, sl: np.ndarray,
+                    horizon: int, entry_timeout: int, tp_sizes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Расчет исходов для пачки сигналов одного инструмента"""
+    ts, open_, high, low, close = candles['ts'], candles['open'], candles['high'], candles['low'], candles['close']
+    n = len(ts)
+    count = len(signal_ts)
+    steps = np.arange(horizon)
+
+    # Матрица индексов свечей: строка - сигнал, столбец - минута после сигнала
+    start = np.searchsorted(ts, signal_ts, side='left')
+    index = start[:, None] + steps[None, :]
+    valid = index < n
+    index = np.minimum(index, n - 1)
+    highs = high[index]
+    lows = low[index]
+
+    # Вход: первая свеча в пределах таймаута, пересекающая зону входа
+    touched = valid & (steps[None, :] < entry_timeout) & (lows <= zone_high[:, None]) & (highs >= zone_low[:, None])
+    fill_step = _first_true(touched)
+    filled = fill_step < horizon
+    fill_index = index[np.arange(count), np.minimum(fill_step, horizon - 1)]
+    fill_price = np.clip(open_[fill_index], zone_low, zone_high)
+
+    # Уровни действуют начиная со свечи входа
+    active = valid & (steps[None, :] >= fill_step[:, None])
+    buy = is_buy[:, None]
+    sl_hit = active & np.where(buy, lows <= sl[:, None], highs >= sl[:, None])
+    sl_step = _first_true(sl_hit)
+
+    tp_steps = np.empty((count, 3), dtype=np.int64)
+    for level in range(3):
+        level_price = tps[:, level][:, None]
+        tp_hit = active & np.where(buy, highs >= level_price, lows <= level_price)
+        tp_steps[:, level] = _first_true(tp_hit)
+
+    # Последняя доступная свеча для оценки незакрытой позиции
+    last_step = valid.sum(axis=1) - 1
+    last_close = close[index[np.arange(count), np.maximum(last_step, 0)]]
+
+    # При касании TP и SL в одной свече считаем, что первым сработал стоп-лосс
+    tp_first = tp_steps < sl_step[:, None]
+    sl_reached = sl_step < horizon
+    exit_prices = np.where(tp_first, tps, np.where(sl_reached, sl, last_close)[:, None])
+
+    direction = np.where(is_buy, 1.0, -1.0)
+    leg_returns = (exit_prices - fill_price[:, None]) / fill_price[:, None] * direction[:, None]
+    pnl = np.where(filled, leg_returns @ tp_sizes, 0.0)
+
+    # Исход - последний достигнутый уровень; без стопа и TP3 позиция остается открытой
+    tp_count = tp_first.sum(axis=1)
+    outcome = np.where(sl_reached, OUTCOME_SL + tp_count, OUTCOME_OPEN)
+    outcome = np.where(tp_count == 3, OUTCOME_TP3, outcome)
+    outcome = np.where(filled, outcome, OUTCOME_NOT_FILLED)
+
+    exit_step = np.where(tp_count == 3, tp_steps[:, 2], np.where(sl_reached, sl_step, last_step))
+    return {
+        'filled': filled,
+        'fill_price': np.where(filled, fill_price, np.nan),
+        'fill_ts': np.where(filled, ts[fill_index], -1),
+        'exit_ts': np.where(filled, ts[index[np.arange(count), np.minimum(exit_step, horizon - 1)]], -1),
+        'outcome': outcome,
+        'pnl': pnl
+    }
+
+def backtest_signals(signals: Dict[str, np.ndarray], candles: Dict[str, Dict[str, np.ndarray]],
+                     horizon: int = 7 * 24 * 60, entry_timeout: int = 24 * 60,
+                     tp_sizes: Sequence[float] = DEFAULT_TP_SIZES, chunk_size: int = 512) -> Dict[str, Any]:
+    """
+    Бэктест сигналов по минутным свечам
+
+    Args:
+        signals: Колонки сигналов: ts (мс), symbol, side, entry_high, entry_low, tp1, tp2, tp3, sl,
+            опционально leverage
+        candles: Свечи по инструментам: {symbol: {'ts', 'open', 'high', 'low', 'close'}}, ts по возрастанию
+        horizon: Сколько минут после сигнала отслеживать позицию
+        entry_timeout: Сколько минут после сигнала ждать входа в зону
+        tp_sizes: Доли позиции для TP1, TP2 и TP3
+        chunk_size: Количество сигналов в одной матрице (ограничивает расход памяти)
+
+    Returns:
+        Dict[str, Any]: {'trades': колонки по сигналам, 'stats': сводная статистика}
+    """
+    count = len(signals['ts'])
+    sizes = np.asarray(tp_sizes, dtype=np.float64)
+    trades = {
+        'filled': np.zeros(count, dtype=bool),
+        'fill_price': np.full(count, np.nan),
+        'fill_ts': np.full(count, -1, dtype=np.int64),
+        'exit_ts': np.full(count, -1, dtype=np.int64),
+        'outcome': np.zeros(count, dtype=np.int8),
+        'pnl': np.zeros(count)
+    }
+
+    symbols = np.asarray(signals['symbol'])
+    entry_a = np.asarray(signals['entry_high'], dtype=np.float64)
+    entry_b = np.asarray(signals['entry_low'], dtype=np.float64)
+    # Порядок границ зоны в сообщениях не гарантирован
+    zone_low = np.minimum(entry_a, entry_b)
+    zone_high = np.maximum(entry_a, entry_b)
+    tps = np.column_stack([np.asarray(signals[name], dtype=np.float64) for name in ('tp1', 'tp2', 'tp3')])
+    sl = np.asarray(signals['sl'], dtype=np.float64)
+    is_buy = np.asarray(signals['side']) == 'BUY'
+    signal_ts = np.asarray(signals['ts'], dtype=np.int64)
+
+    for symbol in np.unique(symbols):
+        if symbol not in candles or len(candles[symbol]['ts']) == 0:
+            continue
+        positions = np.flatnonzero(symbols == symbol)
+        for chunk_start in range(0, len(positions), chunk_size):
+            chunk = positions[chunk_start:chunk_start + chunk_size]
+            result = _simulate_chunk(candles[symbol], signal_ts[chunk], is_buy[chunk], zone_low[chunk],
+                                     zone_high[chunk], tps[chunk], sl[chunk], horizon, entry_timeout, sizes)
+            for name, values in result.items():
+                trades[name][chunk] = values
+
+    if 'leverage' in signals:
+        trades['pnl_leveraged'] = trades['pnl'] * np.asarray(signals['leverage'], dtype=np.float64)
+
+    return {'trades': trades, 'stats': summarize(trades, signal_ts)}
+
+def summarize(trades: Dict[str, np.ndarray], signal_ts: np.ndarray) -> Dict[str, Any]:
+    """Сводная статистика по результатам бэктеста"""
+    filled = trades['filled']
+    pnl = trades['pnl'][filled]
+    order = np.argsort(signal_ts[filled], kind='stable')
+    equity = np.cumsum(pnl[order])
+    drawdown = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:] - equity if len(equity) else np.zeros(0)
+    gains = pnl[pnl > 0].sum()
+    losses = -pnl[pnl < 0].sum()
+    outcomes = np.bincount(trades['outcome'], minlength=len(OUTCOME_NAMES))
+    return {
+        'signals': int(len(filled)),
+        'filled': int(filled.sum()),
+        'win_rate': float((pnl > 0).mean()) if len(pnl) else 0.0,
+        'avg_pnl': float(pnl.mean()) if len(pnl) else 0.0,
+        'total_pnl': float(pnl.sum()),
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+        'profit_factor': float(gains / losses) if losses else float('inf') if gains else 0.0,
+        'outcomes': {name: int(outcomes[code]) for code, name in enumerate(OUTCOME_NAMES)}
+    }
+
+# Данные для рабочих процессов перебора параметров передаются один раз через initializer
+_sweep_signals: Optional[Dict[str, np.ndarray]] = None
+_sweep_candles: Optional[Dict[str, Dict[str, np.ndarray]]] = None
+
+def _init_sweep_worker(signals, candles) -> None:
+    global _sweep_signals, _sweep_candles
+    _sweep_signals, _sweep_candles = signals, candles
+
+def _run_sweep_point(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'params': params, 'stats': backtest_signals(_sweep_signals, _sweep_candles, **params)['stats']}
+
+def run_sweep(signals: Dict[str, np.ndarray], candles: Dict[str, Dict[str, np.ndarray]],
+              param_grid: List[Dict[str, Any]], processes: int = 4) -> List[Dict[str, Any]]:
+    """
+    Перебор параметров бэктеста на нескольких ядрах
+
+    Args:
+        param_grid: Список наборов аргументов backtest_signals, например
+            [{'entry_timeout': 60}, {'entry_timeout': 240, 'tp_sizes': (0.5, 0.25, 0.25)}]
+        processes: Количество процессов
+
+    Returns:
+        List[Dict[str, Any]]: Статистика по каждому набору параметров в порядке param_grid
+    """
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_sweep_worker,
+                             initargs=(signals, candles)) as pool:
+        return list(pool.map(_run_sweep_point, param_grid))
@@ -0,0 +1,78 @@
+"""
+Бенчмарк векторизованного бэктеста на синтетических данных
+
+Запуск:
+    python bench_backtest.py [--signals 5000] [--days 90] [--symbols 5] [--processes 4]
+"""
+import argparse
+import time
+import numpy as np
+from backtest import backtest_signals, run_sweep
+
+MINUTE = 60_000
+
+def make_market(symbols: int, days: int, seed: int = 7):
+    """Случайное блуждание минутных свечей по нескольким инструментам"""
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    candles = {}
+    for i in range(symbols):
+        closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.0008, minutes)))
+        opens = np.concatenate(([closes[0]], closes[:-1]))
+        spread = np.abs(rng.normal(0, 0.0005, minutes)) * closes
+        candles[f"SYM{i}USDT"] = {
+            'ts': np.arange(minutes, dtype=np.int64) * MINUTE,
+            'open': opens,
+            'high': np.maximum(opens, closes) + spread,
+            'low': np.minimum(opens, closes) - spread,
+            'close': closes
+        }
+    return candles
+
+def make_signals(candles, count: int, seed: int = 11):
+    """Сигналы со случайным направлением и уровнями около текущей цены"""
+    rng = np.random.default_rng(seed)
+    symbols = np.array(sorted(candles))
+    picked = rng.choice(symbols, count)
+    ts = np.empty(count, dtype=np.int64)
+    price = np.empty(count)
+    for symbol in symbols:
+        mask = picked == symbol
+        series = candles[symbol]
+        index = rng.integers(0, len(series['ts']) - 1, mask.sum())
+        ts[mask] = series['ts'][index]
+        price[mask] = series['close'][index]
+    direction = np.where(rng.random(count) < 0.5, 1.0, -1.0)
+    return {
+        'ts': ts, 'symbol': picked, 'side': np.where(direction > 0, 'BUY', 'SELL'),
+        'entry_high': price * (1 + 0.002), 'entry_low': price * (1 - 0.002),
+        'tp1': price * (1 + direction * 0.01), 'tp2': price * (1 + direction * 0.02),
+        'tp3': price * (1 + direction * 0.03), 'sl': price * (1 - direction * 0.02),
+        'leverage': np.full(count, 10)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--signals', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--symbols', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    candles = make_market(args.symbols, args.days)
+    signals = make_signals(candles, args.signals)
+
+    started = time.perf_counter()
+    result = backtest_signals(signals, candles)
+    elapsed = time.perf_counter() - started
+    print(f"{args.signals} сигналов, {args.days} дней минутных свечей x {args.symbols} инструментов: {elapsed:.2f} с")
+    print(result['stats'])
+
+    grid = [{'entry_timeout': timeout} for timeout in (30, 60, 240, 720, 1440, 2880, 4320, 10080)]
+    started = time.perf_counter()
+    run_sweep(signals, candles, grid, processes=args.processes)
+    elapsed = time.perf_counter() - started
+    print(f"Перебор {len(grid)} наборов параметров на {args.processes} процессах: {elapsed:.2f} с")
+
+if __name__ == "__main__":
+    main()
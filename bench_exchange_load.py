@@ -0,0 +1,80 @@
+"""
+Нагрузочный прогон SignalExecutor против локальной имитации биржи (core.fake_exchange)
+
+Сигналы по нескольким инструментам исполняются подряд: план ордера, рыночный вход со
+стоп-лоссом и три тейк-профита. Время обработки запросов самой имитацией (включая
+заданную задержку) вычитается из общего, остаток - собственные накладные расходы
+клиента и исполнителя. Сбои (--error-rate) повторяются политикой повторов клиента.
+
+Запуск:
+    python bench_exchange_load.py [--signals 5000] [--latency-ms 0] [--error-rate 0] [--parallel]
+"""
+import argparse
+import time
+from loguru import logger
+from core.api_client import BybitClient
+from core.fake_exchange import FakeBybitExchange
+from core.rate_limiter import RequestScheduler, ENDPOINT_GROUPS
+from core.retry import RetryPolicy
+from core.tracing import tracer
+from core.wallet_state import WalletState
+from strategies.signals.signal_executor import SignalExecutor
+
+# Сигналы в зоне входа для цен имитации по умолчанию
+SIGNALS = [
+    {'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+     'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0},
+    {'symbol': "BTCUSDT", 'side': "SELL", 'entry_high': 60100.0, 'entry_low': 59900.0,
+     'tp1': 59000.0, 'tp2': 58000.0, 'tp3': 57000.0, 'sl': 61000.0},
+    {'symbol': "SOLUSDT", 'side': "BUY", 'entry_high': 151.0, 'entry_low': 149.0,
+     'tp1': 155.0, 'tp2': 160.0, 'tp3': 165.0, 'sl': 145.0}
+]
+
+def make_executor(exchange: FakeBybitExchange, parallel: bool):
+    policy = RetryPolicy(max_attempts=5, base_delay=0.0, max_delay=0.0)
+    client = BybitClient(http_client=exchange, retry_policy=policy)
+    # Лимиты Bybit здесь не проверяются: измеряется собственная скорость обработки
+    client.scheduler = RequestScheduler({name: (1e9, priority) for name, (_, priority) in ENDPOINT_GROUPS.items()},
+                                        ip_rate=1e9)
+    executor = SignalExecutor(client, parallel_take_profits=parallel, wallet=WalletState(max_age=3600))
+    return client, executor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--signals', type=int, default=5000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Задержка ответа имитации на запрос")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Доля запросов, отклоняемых кодом 10016")
+    parser.add_argument('--parallel', action='store_true', help="Тейк-профиты в пуле потоков")
+    args = parser.parse_args()
+
+    logger.remove()
+    exchange = FakeBybitExchange(balance=1e9, latency=args.latency_ms / 1000, error_rate=args.error_rate)
+    client, executor = make_executor(exchange, args.parallel)
+    tracer.reset()
+    failed = 0
+    started = time.perf_counter()
+    for message_id in range(args.signals):
+        signal = {**SIGNALS[message_id % len(SIGNALS)], 'channel': "load", 'message_id': message_id}
+        try:
+            executor.execute_signal(signal)
+        except Exception:
+            failed += 1
+    elapsed = time.perf_counter() - started
+    executor.close()
+    client.instruments.stop_auto_refresh()
+
+    stats = exchange.stats()
+    exchange_ms = sum(record.duration_ms for record in exchange.requests)
+    requests_count = sum(stats['requests'].values())
+    print(f"сигналов: {args.signals}, ошибок: {failed}, за {elapsed:.2f} с ({args.signals / elapsed:.0f} сигналов/с)")
+    print(f"запросов к бирже: {requests_count} ({requests_count / args.signals:.1f} на сигнал), отказов: {stats['errors']}")
+    print(f"на сигнал: всего {elapsed / args.signals * 1e6:.1f} мкс, "
+          f"из них имитация биржи {exchange_ms / args.signals * 1000:.1f} мкс, "
+          f"собственные накладные {(elapsed * 1000 - exchange_ms) / args.signals * 1000:.1f} мкс")
+    print(f"{'этап':<28} | {'p50, мкс':>9} | {'p99, мкс':>9}")
+    for name, summary in tracer.summary().items():
+        if name.startswith('execute.') or name.startswith('bybit.'):
+            print(f"{name:<28} | {summary['p50_ms'] * 1000:>9.1f} | {summary['p99_ms'] * 1000:>9.1f}")
+
+if __name__ == "__main__":
+    main()
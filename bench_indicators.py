@@ -0,0 +1,50 @@
+"""
+Бенчмарк обновления MovingAverageStrategy: тиков в секунду при разных sma_period
+
+Запуск:
+    python bench_indicators.py [--ticks 100000]
+"""
+import argparse
+import time
+import numpy as np
+from strategies.moving_average import MovingAverageStrategy
+
+class LegacyMovingAverage:
+    """Реализация MovingAverageStrategy до перехода на инкрементальный SMA"""
+    def __init__(self, sma_period: int):
+        self.sma_period = sma_period
+        self.prices = []
+
+    def update(self, data):
+        self.prices.append(float(data['close']))
+        if len(self.prices) > self.sma_period:
+            self.prices.pop(0)
+
+    def generate_signal(self, data):
+        if len(self.prices) < self.sma_period:
+            return None
+        return np.mean(self.prices)
+
+def measure(strategy, ticks):
+    started = time.perf_counter()
+    for tick in ticks:
+        strategy.update(tick)
+        strategy.generate_signal(tick)
+    return len(ticks) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ticks', type=int, default=100000)
+    args = parser.parse_args()
+
+    prices = 1000 + np.cumsum(np.random.default_rng(1).normal(0, 1, args.ticks))
+    ticks = [{'close': float(price)} for price in prices]
+
+    print(f"{'sma_period':>10} | {'до, тиков/с':>14} | {'после, тиков/с':>15}")
+    for period in (20, 200, 2000, 20000):
+        legacy = measure(LegacyMovingAverage(period), ticks)
+        current = measure(MovingAverageStrategy({'sma_period': period}), ticks)
+        print(f"{period:>10} | {legacy:>14,.0f} | {current:>15,.0f}")
+
+if __name__ == "__main__":
+    main()
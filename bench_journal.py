@@ -0,0 +1,69 @@
+"""
+Бенчмарк записи журнала сделок: commit на каждую строку против фонового JournalWriter
+
+Запуск:
+    python bench_journal.py [--rows 5000] [--batch-size 500]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from loguru import logger
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from db.journal import JournalWriter
+from db.models import Base, Trade
+
+def trade(i):
+    return {'symbol': "ETHUSDT", 'side': "buy", 'amount': 0.01, 'price': 2500.0 + i % 100, 'strategy': "bench"}
+
+def bench_per_row_commit(path, rows):
+    """Исходная схема TradeManager.log_trade: add + commit на каждую сделку"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    for i in range(rows):
+        session.add(Trade(timestamp=datetime.utcnow(), **trade(i)))
+        session.commit()
+    elapsed = time.perf_counter() - started
+    session.close()
+    engine.dispose()
+    return elapsed, elapsed
+
+def bench_journal(path, rows, batch_size):
+    """Фоновая запись: время постановки в очередь и время до записи последней строки"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    journal = JournalWriter(engine, batch_size=batch_size)
+    journal.start()
+    started = time.perf_counter()
+    for i in range(rows):
+        journal.log_trade(trade(i))
+    enqueued = time.perf_counter() - started
+    journal.stop()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return enqueued, elapsed, journal.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _, sync_elapsed = bench_per_row_commit(os.path.join(tmp, 'sync.db'), args.rows)
+        enqueued, journal_elapsed, stats = bench_journal(os.path.join(tmp, 'journal.db'), args.rows, args.batch_size)
+
+    print(f"commit на строку:  {args.rows / sync_elapsed:>12,.0f} строк/с, "
+          f"{sync_elapsed / args.rows * 1e6:.0f} мкс на сделку в торговом потоке")
+    print(f"JournalWriter:     {args.rows / journal_elapsed:>12,.0f} строк/с, "
+          f"{enqueued / args.rows * 1e6:.1f} мкс на сделку в торговом потоке")
+    print(f"пачек: {stats['batches']}, средний размер {stats['batch_size_avg']:.0f}, "
+          f"задержка записи: средняя {stats['latency_avg_ms']:.1f} мс, макс. {stats['latency_max_ms']:.1f} мс")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Бенчмарк накладных расходов логирования на один сигнал в разных режимах core.logger
+
+Исполняется SignalExecutor.execute_signal на клиенте без сети; накладные расходы -
+разница со временем исполнения без обработчиков логов. Измеряется время в торговом
+потоке: в режиме production запись в файл и консоль выполняется в фоновом потоке.
+
+Запуск:
+    python bench_logging.py [--signals 2000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from loguru import logger
+from core.api_client import BybitClient
+from core.logger import setup_logger
+from core.price_feed import PriceFeed, ReplayTickerSource
+from core.rate_limiter import RequestScheduler, ENDPOINT_GROUPS
+from core.wallet_state import WalletState
+from strategies.signals.signal_executor import SignalExecutor
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+class StaticHTTP:
+    """pybit HTTP с мгновенными успешными ответами"""
+    def _ok(self, result):
+        return {'retCode': 0, 'retMsg': "OK", 'result': result, 'time': int(time.time() * 1000)}, 0.0, {}
+
+    def get_instruments_info(self, **params):
+        item = {'symbol': "ETHUSDT", 'lotSizeFilter': {'minOrderQty': "0.01", 'qtyStep': "0.01"}}
+        return self._ok({'list': [item], 'nextPageCursor': ""})
+
+    def place_order(self, **params):
+        return self._ok({'orderId': "1", 'orderLinkId': params.get('orderLinkId', "")})
+
+    def set_trading_stop(self, **params):
+        return self._ok({})
+
+def make_executor():
+    client = BybitClient(http_client=StaticHTTP())
+    client.scheduler = RequestScheduler({name: (1e9, priority) for name, (_, priority) in ENDPOINT_GROUPS.items()},
+                                        ip_rate=1e9)
+    feed = PriceFeed(ReplayTickerSource(), max_age=3600)
+    feed.subscribe(["ETHUSDT"])
+    feed.source.push({'topic': "tickers.ETHUSDT", 'ts': 0, 'data': {'symbol': "ETHUSDT", 'lastPrice': "2490"}})
+    client.attach_price_feed(feed)
+    wallet = WalletState(max_age=3600)
+    response = {'result': {'list': [{'accountType': "UNIFIED", 'totalAvailableBalance': "10000"}]}}
+    executor = SignalExecutor(client, parallel_take_profits=False, wallet=wallet)
+    return executor, wallet, response
+
+def measure(signals):
+    executor, wallet, response = make_executor()
+    started = time.perf_counter()
+    for _ in range(signals):
+        wallet.update_from_rest(response)
+        executor.execute_signal(SIGNAL)
+    elapsed = (time.perf_counter() - started) / signals * 1e6
+    logger.complete()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--signals', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, 'w') as console:
+        logger.remove()
+        baseline = measure(args.signals)
+        modes = [
+            ("development (синхронно, DEBUG в файл)", dict(mode="development")),
+            ("production (фоновый поток, JSON, INFO)", dict(mode="production")),
+            ("production + DEBUG с прореживанием 1%", dict(mode="production", module_levels={"": "DEBUG"},
+                                                          sample_rates={'sizing': 0.01, 'tp_size': 0.01})),
+        ]
+        print(f"без логов: {baseline:.1f} мкс на сигнал")
+        print(f"{'режим':<42} | {'мкс на сигнал':>13} | {'накладные, мкс':>14}")
+        for name, options in modes:
+            setup_logger(stream=console, log_dir=log_dir, **options)
+            elapsed = measure(args.signals)
+            print(f"{name:<42} | {elapsed:>13.1f} | {elapsed - baseline:>14.1f}")
+        logger.remove()
+
+if __name__ == "__main__":
+    main()
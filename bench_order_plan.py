@@ -0,0 +1,93 @@
+"""
+Бенчмарк расчета плана ордера: время построения в микросекундах и число запросов REST
+
+Сравниваются прежняя схема (две конвертации USDT в контракты, каждая со своим запросом цены)
+и план ордера по кэшу спецификаций и потоку тикеров.
+
+Запуск:
+    python bench_order_plan.py [--iterations 20000]
+"""
+import argparse
+import time
+from loguru import logger
+from core.api_client import BybitClient
+from core.order_plan import build_order_plan
+from core.price_feed import PriceFeed, ReplayTickerSource
+from core.rate_limiter import RequestScheduler, ENDPOINT_GROUPS
+from core.wallet_state import WalletState
+from strategies.signals.signal_executor import SignalExecutor, TAKE_PROFIT_LADDER
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+class StaticHTTP:
+    """pybit HTTP с постоянными ответами и счетчиком запросов (без сетевой задержки)"""
+    def __init__(self):
+        self.calls = 0
+
+    def _ok(self, result):
+        self.calls += 1
+        return {'retCode': 0, 'retMsg': "OK", 'result': result}, 0.0, {}
+
+    def get_instruments_info(self, **params):
+        item = {'symbol': "ETHUSDT", 'lotSizeFilter': {'minOrderQty': "0.01", 'qtyStep': "0.01"}}
+        return self._ok({'list': [item], 'nextPageCursor': ""})
+
+    def get_kline(self, **params):
+        return self._ok({'list': [["1700000000000", "2490", "2495", "2485", "2490", "1", "2490"]]})
+
+def measure(function, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    logger.remove()
+
+    http = StaticHTTP()
+    client = BybitClient(http_client=http)
+    # Лимиты запросов сняты: измеряется только собственное время расчета
+    client.scheduler = RequestScheduler({name: (1e9, priority) for name, (_, priority) in ENDPOINT_GROUPS.items()},
+                                        ip_rate=1e9)
+    feed = PriceFeed(ReplayTickerSource())
+    wallet = WalletState(max_age=3600)
+    wallet.update_from_rest({'result': {'list': [{'accountType': "UNIFIED", 'totalAvailableBalance': "10000"}]}})
+    snapshot = wallet.get()
+    executor = SignalExecutor(client, wallet=wallet)
+    spec = client.get_instrument_spec("ETHUSDT")
+    ladder = [(name, SIGNAL[name], percentage) for name, percentage in TAKE_PROFIT_LADDER]
+
+    def legacy():
+        # Размер основного ордера и размер для тейк-профитов считались отдельно, каждый со своей ценой
+        client._convert_usdt_to_contracts("ETHUSDT", 100.0)
+        client._convert_usdt_to_contracts("ETHUSDT", 100.0)
+
+    def pure_plan():
+        build_order_plan("ETHUSDT", "BUY", 2490.0, 10000.0, spec, 2400.0, ladder, order_link_id="bench")
+
+    http.calls = 0
+    legacy_us = measure(legacy, args.iterations)
+    legacy_calls = http.calls / args.iterations
+
+    feed.subscribe(["ETHUSDT"])
+    feed.source.push({'topic': "tickers.ETHUSDT", 'ts': 1700000000000, 'data': {'symbol': "ETHUSDT", 'lastPrice': "2490"}})
+    feed.max_age = 3600
+    client.attach_price_feed(feed)
+    http.calls = 0
+    plan_us = measure(lambda: executor.plan_signal(SIGNAL, snapshot), args.iterations)
+    plan_calls = http.calls / args.iterations
+    pure_us = measure(pure_plan, args.iterations)
+
+    print(f"{'схема':<40} | {'мкс на сигнал':>13} | {'REST на сигнал':>14}")
+    print(f"{'две конвертации (цена через REST)':<40} | {legacy_us:>13.1f} | {legacy_calls:>14.1f}")
+    print(f"{'план ордера (кэш и поток тикеров)':<40} | {plan_us:>13.1f} | {plan_calls:>14.1f}")
+    print(f"{'build_order_plan без обращений к клиенту':<40} | {pure_us:>13.1f} | {0:>14.1f}")
+
+if __name__ == "__main__":
+    main()
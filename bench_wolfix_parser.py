@@ -0,0 +1,140 @@
+"""
+Микробенчмарк WolfixParser: сообщений в секунду на смешанном корпусе сигналов и обычных постов
+
+Запуск:
+    python bench_wolfix_parser.py [--messages 20000] [--signal-ratio 0.1] [--level INFO]
+"""
+import argparse
+import random
+import re
+import time
+from loguru import logger
+from strategies.signals.wolfix_parser import WolfixParser
+
+SIGNAL_TEMPLATE = """🔔CRYPTO VIP SIGNAL (https://wolfxsignals.com/plans-lp/)🔔
+
+{base}/USDT {arrow} {side}
+
+🔹Entry zone: {entry_high}-{entry_low}
+
+💰TP1 {tp1}
+💰TP2 {tp2}
+💰TP3 {tp3}
+🚫SL {sl}
+
+〽️Leverage {leverage}x"""
+
+NOISE_MESSAGES = [
+    "🔥 TP1 hit on ETH/USDT! Congratulations to all VIP members 🚀",
+    "Market update: BTC is consolidating below resistance, be patient and manage your risk.",
+    "📊 Weekly results: +34% on all signals. Join VIP: https://wolfxsignals.com/plans-lp/",
+    "Good morning traders ☀️ New signals coming soon, stay tuned!",
+    "SOL/USDT closed in profit ✅ All take profits reached.",
+    "Reminder: never risk more than 1-2% of your balance per trade.",
+]
+
+def make_corpus(count: int, signal_ratio: float, seed: int = 42):
+    """Корпус из реалистичных сигналов и обычных постов канала"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        if rng.random() < signal_ratio:
+            price = rng.uniform(0.5, 60000)
+            side = rng.choice(["BUY", "SELL"])
+            direction = 1 if side == "BUY" else -1
+            corpus.append(SIGNAL_TEMPLATE.format(
+                base=rng.choice(["BTC", "ETH", "SOL", "XRP", "DOGE", "ADA"]),
+                arrow=rng.choice(["📈", "📉"]),
+                side=side,
+                entry_high=f"{price * 1.005:.2f}",
+                entry_low=f"{price * 0.995:.2f}",
+                tp1=f"{price * (1 + direction * 0.02):.2f}",
+                tp2=f"{price * (1 + direction * 0.04):.2f}",
+                tp3=f"{price * (1 + direction * 0.06):.2f}",
+                sl=f"{price * (1 - direction * 0.03):.2f}",
+                leverage=rng.choice([5, 10, 20])
+            ))
+        else:
+            corpus.append(rng.choice(NOISE_MESSAGES))
+    return corpus
+
+def legacy_parse_signal(message: str):
+    """Реализация WolfixParser.parse_signal до перехода на однопроходную грамматику"""
+    try:
+        logger.debug(f"Начинаем парсинг сигнала Wolfix: {message}")
+        pair_match = re.search(r'([A-Z]+/[A-Z]+)\s*[📈📉]\s*(BUY|SELL)', message)
+        if not pair_match:
+            logger.error("Не удалось найти торговую пару и направление")
+            return None
+        symbol = pair_match.group(1).replace('/', '')
+        side = pair_match.group(2)
+        logger.debug(f"Найдена торговая пара: {symbol}, направление: {side}")
+        entry_match = re.search(r'Entry zone:\s*(\d+\.?\d*)-(\d+\.?\d*)', message)
+        if not entry_match:
+            logger.error("Не удалось найти зону входа")
+            logger.debug(f"Текст для поиска зоны входа: {message}")
+            return None
+        entry_high = float(entry_match.group(1))
+        entry_low = float(entry_match.group(2))
+        logger.debug(f"Найдена зона входа: {entry_low}-{entry_high}")
+        tp_matches = re.findall(r'TP\d+\s*(\d+\.?\d*)', message)
+        logger.debug(f"Найденные тейк-профиты: {tp_matches}")
+        if len(tp_matches) != 3:
+            logger.error(f"Не удалось найти все тейк-профиты. Найдено: {len(tp_matches)}")
+            logger.debug(f"Текст для поиска тейк-профитов: {message}")
+            return None
+        tp1, tp2, tp3 = map(float, tp_matches)
+        logger.debug(f"Распарсенные тейк-профиты: TP1={tp1}, TP2={tp2}, TP3={tp3}")
+        sl_match = re.search(r'SL\s*(\d+\.?\d*)', message)
+        if not sl_match:
+            logger.error("Не удалось найти стоп-лосс")
+            logger.debug(f"Текст для поиска стоп-лосса: {message}")
+            return None
+        sl = float(sl_match.group(1))
+        logger.debug(f"Найден стоп-лосс: {sl}")
+        leverage_match = re.search(r'Leverage\s*(\d+)x', message)
+        if not leverage_match:
+            logger.error("Не удалось найти плечо")
+            logger.debug(f"Текст для поиска плеча: {message}")
+            return None
+        leverage = int(leverage_match.group(1))
+        logger.debug(f"Найдено плечо: {leverage}x")
+        return {
+            'symbol': symbol, 'side': side, 'entry_high': entry_high, 'entry_low': entry_low,
+            'tp1': tp1, 'tp2': tp2, 'tp3': tp3, 'sl': sl, 'leverage': leverage, 'parser': "Wolfix"
+        }
+    except Exception as e:
+        logger.error(f"Ошибка при парсинге сигнала Wolfix: {e}")
+        return None
+
+def measure(parse, corpus):
+    started = time.perf_counter()
+    results = [parse(message) for message in corpus]
+    elapsed = time.perf_counter() - started
+    return len(corpus) / elapsed, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--signal-ratio', type=float, default=0.1)
+    parser.add_argument('--level', default="INFO", help="Уровень приемника логов (DEBUG/INFO/ERROR)")
+    args = parser.parse_args()
+
+    # Приемник без вывода: измеряем стоимость форматирования, а не терминала
+    logger.remove()
+    logger.add(lambda _: None, level=args.level)
+
+    corpus = make_corpus(args.messages, args.signal_ratio)
+    wolfix = WolfixParser(api_client=None)
+
+    legacy_rate, legacy_results = measure(legacy_parse_signal, corpus)
+    new_rate, new_results = measure(wolfix.parse_signal, corpus)
+    assert legacy_results == new_results, "Результаты парсеров расходятся"
+
+    signals = sum(1 for result in new_results if result)
+    print(f"Корпус: {len(corpus)} сообщений, сигналов: {signals}, уровень логов: {args.level}")
+    print(f"До:    {legacy_rate:>12,.0f} сообщений/с")
+    print(f"После: {new_rate:>12,.0f} сообщений/с ({new_rate / legacy_rate:.1f}x)")
+
+if __name__ == "__main__":
+    main()
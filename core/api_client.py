@@ -1,18 +1,202 @@
 import json
-from typing import Dict, Any
-from pybit.unified_trading import HTTP
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, Optional
+import requests
+from pybit.exceptions import InvalidRequestError, FailedRequestError
 from loguru import logger
+from core.order_plan import OrderPlan, usdt_to_contracts, take_profit_size
+from core.price_feed import PriceFeed
+from core.rate_limiter import RequestScheduler, RATE_LIMIT_CODE
+from core.retry import RetryPolicy, RETRYABLE_CODES, DUPLICATE_ORDER_LINK_ID_CODE
+from core.tracing import tracer
+
+if TYPE_CHECKING:
+    from pybit.unified_trading import HTTP
+
+# Ошибки, после которых неизвестно, исполнила ли биржа запрос
+AMBIGUOUS_ERRORS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError, FailedRequestError)
+
+def take_profit_params(symbol: str, tp_trigger_price: float, tp_quantity_percentage: int,
+                       total_position_size: float, qty_step: Optional[float], tp_size: Optional[str] = None) -> Dict[str, Any]:
+    """Параметры set_trading_stop для тейк-профита на часть позиции (tp_size - готовый размер из плана ордера)"""
+    if tp_size is None:
+        # Рассчитываем количество контрактов для тейк-профита и округляем до шага
+        tp_size = take_profit_size(total_position_size, tp_quantity_percentage, qty_step)
+        logger.debug("Размер тейк-профита {percentage}%: {tp_size}", event="tp_size",
+                     percentage=tp_quantity_percentage, tp_size=tp_size)
+    
+    return {
+        "category": "linear",
+        "symbol": symbol,
+        "takeProfit": str(tp_trigger_price),
+        "tpTriggerBy": "LastPrice",
+        "tpSize": tp_size,  # Используем tpSize вместо qty
+        "tpslMode": "Full" if tp_quantity_percentage == 100 else "Partial"  # Full для TP3, Partial для остальных
+    }
+
+class InstrumentCache:
+    """Кэш спецификаций инструментов (шаг и минимальный размер лота, шаг цены)"""
+
+    def __init__(self, loader: Optional[Callable[..., Dict[str, Any]]], ttl: float = 3600.0, category: str = "linear"):
+        """
+        Args:
+            loader: Функция запроса get_instruments_info (например, HTTP.get_instruments_info);
+                None, если кэш заполняется снаружи через replace/store
+            ttl: Время жизни кэша в секундах, после которого выполняется фоновое обновление
+            category: Категория инструментов Bybit
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self.category = category
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def parse_spec(item: Dict[str, Any]) -> Dict[str, Any]:
+        """Извлечение нужных полей из элемента ответа get_instruments_info"""
+        lot_filter = item['lotSizeFilter']
+        price_filter = item.get('priceFilter', {})
+        return {
+            'symbol': item['symbol'],
+            'min_qty': float(lot_filter['minOrderQty']),
+            'max_qty': float(lot_filter.get('maxOrderQty') or 0),
+            'qty_step': float(lot_filter['qtyStep']),
+            'tick_size': float(price_filter.get('tickSize') or 0)
+        }
+
+    def preload(self) -> int:
+        """Загрузка всех инструментов категории постраничным запросом"""
+        items = []
+        cursor = None
+        while True:
+            params = {'category': self.category, 'limit': 1000}
+            if cursor:
+                params['cursor'] = cursor
+            result = self._loader(**params)['result']
+            items.extend(result['list'])
+            cursor = result.get('nextPageCursor')
+            if not cursor:
+                break
+        return self.replace(items)
+
+    def replace(self, items: List[Dict[str, Any]]) -> int:
+        """Полная замена содержимого кэша элементами ответа get_instruments_info"""
+        # Подменяем словарь целиком, чтобы читатели не видели частично заполненный кэш
+        self._specs = {item['symbol']: self.parse_spec(item) for item in items}
+        self._loaded_at = time.monotonic()
+        logger.info(f"Загружены спецификации {len(self._specs)} инструментов ({self.category})")
+        return len(self._specs)
+
+    def lookup(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Поиск спецификации только в памяти"""
+        spec = self._specs.get(symbol)
+        if spec is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return spec
+
+    def store(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Добавление одного инструмента в кэш"""
+        spec = self.parse_spec(item)
+        self._specs[spec['symbol']] = spec
+        return spec
+
+    def get(self, symbol: str) -> Dict[str, Any]:
+        """Получение спецификации инструмента (при промахе - запрос к API)"""
+        spec = self.lookup(symbol)
+        if spec is not None:
+            return spec
+
+        items = self._loader(category=self.category, symbol=symbol)['result']['list']
+        if not items:
+            raise ValueError(f"Инструмент {symbol} не найден")
+        return self.store(items[0])
+
+    def is_stale(self) -> bool:
+        """Проверка устаревания кэша"""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl
+
+    def start_auto_refresh(self) -> None:
+        """Запуск фонового обновления кэша по TTL"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name="instrument-cache", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_auto_refresh(self) -> None:
+        """Остановка фонового обновления кэша"""
+        self._stop_event.set()
+        if self._refresh_thread:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self.ttl):
+            try:
+                self.preload()
+            except Exception as e:
+                # Старые данные остаются в кэше до следующей попытки
+                logger.warning(f"Не удалось обновить кэш инструментов: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика обращений к кэшу"""
+        return {
+            'size': len(self._specs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'age': None if self._loaded_at is None else time.monotonic() - self._loaded_at
+        }
 
 class BybitClient:
-    def __init__(self, config_path: str = 'config/keys.json'):
-        with open(config_path, 'r') as f:
-            self.config = json.load(f)
-        
+    def __init__(self, config_path: str = 'config/keys.json', preload_instruments: bool = True,
+                 instrument_ttl: float = 3600.0, http_client: Any = None, request_timeout: float = 5.0,
+                 retry_policy: Optional[RetryPolicy] = None):
+        """
+        Args:
+            http_client: Готовый клиент с интерфейсом pybit HTTP (например, локальная имитация биржи);
+                если указан, ключи из config_path не читаются
+            request_timeout: Таймаут одного HTTP-запроса, сек
+            retry_policy: Политика повторов запросов
+        """
         self.mode = 'mainnet'  # Используем mainnet для демо-трейдинга
-        logger.info(f"Загружены ключи для режима: {self.mode}")
-        self.client = self._init_client()
+        self.request_timeout = request_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.scheduler = RequestScheduler()
+        if http_client is None:
+            with open(config_path, 'r') as f:
+                self.config = json.load(f)
+            logger.info(f"Загружены ключи для режима: {self.mode}")
+            self.client = self._init_client()
+        else:
+            self.config = {}
+            self.client = http_client
+        self.instruments = InstrumentCache(self._get_instruments_info, ttl=instrument_ttl)
+        self.price_feed: Optional[PriceFeed] = None
+        # Снимок всех тикеров для get_last_prices: (time.monotonic(), {symbol: цена})
+        self.ticker_ttl = 2.0
+        self._tickers_snapshot = None
+        # Смещение часов биржи относительно локальных, мс (заполняется warm_up)
+        self.time_offset_ms = 0.0
+        if preload_instruments:
+            self._preload_instruments()
         # self._check_api_version()
     
+    def _preload_instruments(self):
+        """Предзагрузка спецификаций инструментов и запуск их фонового обновления"""
+        try:
+            self.instruments.preload()
+        except Exception as e:
+            # Без предзагрузки кэш заполняется по мере обращений
+            logger.warning(f"Не удалось предзагрузить спецификации инструментов: {e}")
+        self.instruments.start_auto_refresh()
+    
     def _check_api_version(self):
         """Проверка версии API"""
         try:
@@ -23,7 +207,7 @@ class BybitClient:
             logger.error(f"Ошибка при проверке версии API: {e}")
             raise
     
-    def _init_client(self) -> HTTP:
+    def _init_client(self) -> 'HTTP':
         """Инициализация клиента Bybit"""
         try:
             api_key = self.config[self.mode]['api_key']
@@ -32,11 +216,18 @@ class BybitClient:
             logger.info(f"API Key: {api_key[:5]}...{api_key[-5:] if len(api_key) > 10 else ''}")
             logger.info(f"API Secret: {api_secret[:5]}...{api_secret[-5:] if len(api_secret) > 10 else ''}")
             
+            # pybit.unified_trading загружает и WebSocket-клиент, поэтому импортируется только для реального подключения
+            from pybit.unified_trading import HTTP
             client = HTTP(
                 testnet=False,
                 demo=True,
                 api_key=api_key,
-                api_secret=api_secret
+                api_secret=api_secret,
+                timeout=self.request_timeout,
+                # Заголовки лимитов нужны планировщику запросов; повторы выполняет _call,
+                # код 0 в retry_codes отключает собственные повторы pybit
+                return_response_headers=True,
+                retry_codes={0}
             )
             logger.info("Базовый URL для запросов: https://api-demo.bybit.com")
             return client
@@ -44,24 +235,250 @@ class BybitClient:
             logger.error(f"Ошибка инициализации клиента Bybit: {e}")
             raise
     
-    def get_klines(self, symbol: str, interval: str, limit: int = 100) -> Dict[str, Any]:
-        """Получение исторических данных"""
+    def _call(self, group: str, method: Callable[..., Any], recover: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+              idempotent: bool = True, **params) -> Dict[str, Any]:
+        """
+        Запрос к API через планировщик лимитов с повторами по self.retry_policy
+        
+        Args:
+            group: Группа эндпоинтов (core.rate_limiter.ENDPOINT_GROUPS)
+            method: Метод pybit HTTP
+            recover: Поиск результата запроса на бирже перед повтором после ошибки с неизвестным
+                исходом или дубля orderLinkId; если результат найден, он возвращается без повтора
+            idempotent: Запрос можно повторять после ошибки с неизвестным исходом
+                (для неидемпотентных запросов без recover повторяются только отказы биржи)
+        """
+        policy = self.retry_policy
+        deadline_at = policy.start()
+        attempt = 0
+        # Спан охватывает ожидание лимита и все повторы: это полное время запроса для вызывающего
+        with tracer.span(f"bybit.{getattr(method, '__name__', group)}", group=group) as span:
+            while True:
+                self.scheduler.acquire(group)
+                try:
+                    sent_ms = time.time() * 1000
+                    response = method(**params)
+                    if isinstance(response, tuple):
+                        response, _, headers = response
+                        self.scheduler.update_from_headers(group, headers)
+                    tracer.observe_server_time(int(response.get('time') or 0), sent_ms, time.time() * 1000)
+                    span['attempts'] = attempt + 1
+                    return response
+                except InvalidRequestError as e:
+                    if e.status_code == RATE_LIMIT_CODE:
+                        self.scheduler.on_rate_limited(group, e.resp_headers)
+                    else:
+                        self.scheduler.update_from_headers(group, e.resp_headers)
+                        if e.status_code == DUPLICATE_ORDER_LINK_ID_CODE and recover is not None:
+                            existing = recover()
+                            if existing is not None:
+                                logger.warning(f"Запрос {group} уже исполнен биржей, повтор не нужен")
+                                return existing
+                        if e.status_code not in RETRYABLE_CODES:
+                            raise
+                    error = e
+                except AMBIGUOUS_ERRORS as e:
+                    if recover is not None:
+                        existing = recover()
+                        if existing is not None:
+                            logger.warning(f"Запрос {group} исполнен биржей несмотря на ошибку: {e}")
+                            return existing
+                    elif not idempotent:
+                        raise
+                    error = e
+            
+                attempt += 1
+                delay = policy.next_delay(attempt, deadline_at)
+                if delay is None:
+                    logger.error(f"Запрос {group} не выполнен после {attempt} попыток: {error}")
+                    raise error
+                logger.warning(f"Ошибка запроса {group} ({error}), повтор {attempt} через {delay * 1000:.0f} мс")
+                time.sleep(delay)
+    
+    def get_server_time(self) -> Dict[str, Any]:
+        """Время сервера Bybit"""
+        try:
+            return self._call('market', self.client.get_server_time)
+        except Exception as e:
+            logger.error(f"Ошибка при получении времени сервера: {e}")
+            raise
+
+    def warm_up(self) -> float:
+        """
+        Подготовка клиента к первому ордеру: открытие HTTPS-соединения, сверка часов с биржей
+        и загрузка спецификаций инструментов, если их еще нет в кэше
+
+        Returns:
+            float: Смещение часов биржи относительно локальных, мс
+        """
+        sent_ms = time.time() * 1000
+        response = self.get_server_time()
+        self.time_offset_ms = int(response['time']) - (sent_ms + time.time() * 1000) / 2
+        # Bybit отклоняет запросы с временем, опережающим часы биржи более чем на секунду
+        if abs(self.time_offset_ms) > 500:
+            logger.warning(f"Часы расходятся с биржей на {self.time_offset_ms:.0f} мс")
+        if self.instruments.is_stale():
+            self._preload_instruments()
+        logger.info(f"Клиент Bybit прогрет, смещение часов {self.time_offset_ms:.0f} мс")
+        return self.time_offset_ms
+
+    def _get_instruments_info(self, **params) -> Dict[str, Any]:
+        return self._call('market', self.client.get_instruments_info, **params)
+    
+    def find_order(self, symbol: str, order_link_id: str) -> Optional[Dict[str, Any]]:
+        """Поиск ордера по orderLinkId среди активных и недавно исполненных"""
+        for method in (self.client.get_open_orders, self.client.get_order_history):
+            response = self._call('account', method, category="linear", symbol=symbol, orderLinkId=order_link_id)
+            items = response['result']['list']
+            if items:
+                return items[0]
+        return None
+    
+    def find_take_profit(self, symbol: str, tp_trigger_price: float, tp_size: str) -> Optional[Dict[str, Any]]:
+        """Поиск уже выставленного тейк-профита с заданной ценой и размером"""
+        response = self._call('account', self.client.get_open_orders, category="linear", symbol=symbol,
+                              orderFilter="StopOrder")
+        for item in response['result']['list']:
+            if (item.get('stopOrderType') in ('TakeProfit', 'PartialTakeProfit')
+                    and float(item['triggerPrice']) == float(tp_trigger_price)
+                    and float(item['qty']) == float(tp_size)):
+                return item
+        return None
+    
+    def _paginate(self, group: str, method: Callable[..., Any], **params) -> List[Dict[str, Any]]:
+        """Все страницы списка с курсором nextPageCursor"""
+        items: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            result = self._call(group, method, **params)['result']
+            items.extend(result['list'])
+            cursor = result.get('nextPageCursor')
+            if not cursor or not result['list']:
+                return items
+    
+    def get_open_orders(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Активные ордера, включая условные (без symbol - по всем инструментам USDT)"""
+        try:
+            params = {'symbol': symbol} if symbol else {'settleCoin': "USDT"}
+            return self._paginate('account', self.client.get_open_orders, category="linear", limit=50, **params)
+        except Exception as e:
+            logger.error(f"Ошибка получения активных ордеров: {e}")
+            raise
+    
+    def get_positions(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Открытые позиции (без symbol - по всем инструментам USDT)"""
         try:
-            response = self.client.get_kline(
+            params = {'symbol': symbol} if symbol else {'settleCoin': "USDT"}
+            return self._paginate('position', self.client.get_positions, category="linear", limit=200, **params)
+        except Exception as e:
+            logger.error(f"Ошибка получения позиций: {e}")
+            raise
+    
+    def get_executions(self, start_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Исполнения начиная с start_time (миллисекунды)"""
+        try:
+            params = {'startTime': start_time} if start_time else {}
+            return self._paginate('account', self.client.get_executions, category="linear", limit=100, **params)
+        except Exception as e:
+            logger.error(f"Ошибка получения исполнений: {e}")
+            raise
+    
+    def get_klines(self, symbol: str, interval: str, limit: int = 100,
+                   start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Получение исторических данных
+        
+        Args:
+            start: Начало диапазона, мс (опционально)
+            end: Конец диапазона, мс (опционально)
+        """
+        try:
+            params = {}
+            if start is not None:
+                params['start'] = start
+            if end is not None:
+                params['end'] = end
+            response = self._call(
+                'market',
+                self.client.get_kline,
                 category="linear",
                 symbol=symbol,
                 interval=interval,
-                limit=limit
+                limit=limit,
+                **params
             )
             return response
         except Exception as e:
             logger.error(f"Ошибка получения исторических данных: {e}")
             raise
     
+    def attach_price_feed(self, price_feed: PriceFeed) -> None:
+        """Подключение потока цен для get_last_price"""
+        self.price_feed = price_feed
+    
+    def get_last_price(self, symbol: str) -> float:
+        """Получение текущей цены из потока тикеров (при устаревании - через REST)"""
+        if self.price_feed is not None:
+            price = self.price_feed.get_last_price(symbol)
+            if price is not None:
+                return price
+            if not self.price_feed.is_subscribed(symbol):
+                # Следующие запросы по этому инструменту будут обслуживаться потоком
+                try:
+                    self.price_feed.subscribe([symbol])
+                except Exception as e:
+                    logger.warning(f"Не удалось подписаться на тикер {symbol}: {e}")
+            logger.debug(f"Цена {symbol} в потоке отсутствует или устарела, запрашиваем через REST")
+        
+        klines = self.get_klines(symbol=symbol, interval="1", limit=1)
+        return float(klines['result']['list'][0][4])
+    
+    def get_tickers(self, symbol: Optional[str] = None) -> Dict[str, Any]:
+        """Получение тикеров (без symbol - всех инструментов категории одним запросом)"""
+        try:
+            params = {'symbol': symbol} if symbol else {}
+            return self._call('market', self.client.get_tickers, category="linear", **params)
+        except Exception as e:
+            logger.error(f"Ошибка получения тикеров: {e}")
+            raise
+    
+    def get_last_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Текущие цены нескольких инструментов
+        
+        Цены берутся из потока тикеров, а недостающие - из снимка всех тикеров, который
+        запрашивается не чаще одного раза в ticker_ttl секунд.
+        
+        Returns:
+            Dict[str, float]: Цены по инструментам; неизвестные бирже инструменты отсутствуют
+        """
+        prices: Dict[str, float] = {}
+        missing = []
+        for symbol in symbols:
+            price = self.price_feed.get_last_price(symbol) if self.price_feed is not None else None
+            if price is not None:
+                prices[symbol] = price
+            else:
+                missing.append(symbol)
+        if not missing:
+            return prices
+        
+        snapshot = self._tickers_snapshot
+        if snapshot is None or time.monotonic() - snapshot[0] > self.ticker_ttl:
+            items = self.get_tickers()['result']['list']
+            snapshot = (time.monotonic(), {item['symbol']: float(item['lastPrice']) for item in items if item.get('lastPrice')})
+            self._tickers_snapshot = snapshot
+        for symbol in missing:
+            if symbol in snapshot[1]:
+                prices[symbol] = snapshot[1][symbol]
+        return prices
+    
     def get_instrument_info(self, symbol: str) -> Dict[str, Any]:
         """Получение информации об инструменте"""
         try:
-            response = self.client.get_instruments_info(
+            response = self._get_instruments_info(
                 category="linear",
                 symbol=symbol
             )
@@ -70,36 +487,30 @@ class BybitClient:
             logger.error(f"Ошибка при получении информации об инструменте: {e}")
             raise
     
+    def get_instrument_spec(self, symbol: str) -> Dict[str, Any]:
+        """Получение спецификации инструмента из кэша"""
+        try:
+            return self.instruments.get(symbol)
+        except Exception as e:
+            logger.error(f"Ошибка при получении спецификации инструмента: {e}")
+            raise
+    
     def _convert_usdt_to_contracts(self, symbol: str, usdt_amount: float) -> float:
         """Конвертация USDT в количество контрактов"""
         try:
             # Получаем информацию об инструменте
-            instrument_info = self.get_instrument_info(symbol)
-            min_qty = float(instrument_info['result']['list'][0]['lotSizeFilter']['minOrderQty'])
-            qty_step = float(instrument_info['result']['list'][0]['lotSizeFilter']['qtyStep'])
-            logger.info(f"Минимальный размер ордера для {symbol}: {min_qty}, шаг: {qty_step}")
+            spec = self.get_instrument_spec(symbol)
+            min_qty = spec['min_qty']
+            qty_step = spec['qty_step']
             
             # Получаем текущую цену
-            klines = self.get_klines(symbol=symbol, interval="1", limit=1)
-            current_price = float(klines['result']['list'][0][4])
-            logger.info(f"Текущая цена {symbol}: {current_price}")
+            current_price = self.get_last_price(symbol)
             
             # Рассчитываем количество контрактов
-            contracts = usdt_amount / current_price
-            logger.info(f"Рассчитанное количество контрактов до округления: {contracts}")
-            
-            # Проверяем минимальный размер
-            if contracts < min_qty:
-                logger.warning(f"Количество контрактов ({contracts}) меньше минимального ({min_qty}). Увеличиваем до минимума.")
-                contracts = min_qty
-            
-            # Округляем до шага
-            contracts = round(contracts / qty_step) * qty_step
-            logger.info(f"Количество контрактов после округления: {contracts}")
-            
-            # Форматируем число с фиксированным количеством знаков после запятой
-            formatted_contracts = float(f"{contracts:.3f}")
-            logger.info(f"Отформатированное количество контрактов: {formatted_contracts}")
+            formatted_contracts = usdt_to_contracts(usdt_amount, current_price, min_qty, qty_step)
+            logger.debug("Конвертация {usdt} USDT в {contracts} контрактов {symbol} по цене {price}", event="sizing",
+                         symbol=symbol, usdt=usdt_amount, price=current_price, contracts=formatted_contracts,
+                         min_qty=min_qty, qty_step=qty_step)
             
             return formatted_contracts
         except Exception as e:
@@ -108,11 +519,21 @@ class BybitClient:
     
     def place_order(self, symbol: str, side: str, qty: float, take_profit: bool = False,
                    tp_trigger_price: float = None, tp_quantity_percentage: float = None,
-                   stop_loss: bool = False, sl_trigger_price: float = None, sl_quantity_percentage: float = None) -> Dict:
-        """Размещение ордера"""
+                   stop_loss: bool = False, sl_trigger_price: float = None, sl_quantity_percentage: float = None,
+                   contracts: float = None, order_link_id: Optional[str] = None) -> Dict:
+        """
+        Размещение ордера
+        
+        Args:
+            qty: Размер позиции в USDT
+            contracts: Готовое количество контрактов; если указано, qty не конвертируется
+            order_link_id: Клиентский идентификатор ордера. С ним запрос повторяется при сбоях:
+                биржа не примет второй ордер с тем же orderLinkId, а уже созданный будет найден
+        """
         try:
             # Конвертируем USDT в контракты
-            contracts = self._convert_usdt_to_contracts(symbol, qty)
+            if contracts is None:
+                contracts = self._convert_usdt_to_contracts(symbol, qty)
             contracts_str = f"{contracts:.3f}"
             
             # Форматируем сторону ордера (первая буква заглавная)
@@ -129,13 +550,15 @@ class BybitClient:
                 "timeInForce": "GTC",
                 "tpslMode": "Full"  # Изменено на Full
             }
+            if order_link_id:
+                params["orderLinkId"] = order_link_id
             
             # Добавляем тейк-профит если указан
             if take_profit and tp_trigger_price:
                 # Получаем информацию об инструменте для округления
-                instrument_info = self.get_instrument_info(symbol)
-                min_qty = float(instrument_info['minOrderQty'])
-                qty_step = float(instrument_info['qtyStep'])
+                spec = self.get_instrument_spec(symbol)
+                min_qty = spec['min_qty']
+                qty_step = spec['qty_step']
                 
                 # Рассчитываем размер в контрактах
                 tp_contracts = (contracts * tp_quantity_percentage / 100)
@@ -147,7 +570,8 @@ class BybitClient:
                     tp_contracts = min_qty
                 
                 tp_contracts_str = f"{tp_contracts:.3f}"
-                logger.info(f"Конвертация {tp_quantity_percentage}% в {tp_contracts_str} контрактов для тейк-профита")
+                logger.debug("Размер тейк-профита {percentage}%: {tp_size}", event="tp_size",
+                             percentage=tp_quantity_percentage, tp_size=tp_contracts_str)
                 
                 params.update({
                     "takeProfit": str(tp_trigger_price),
@@ -162,11 +586,23 @@ class BybitClient:
                     "slTriggerBy": "LastPrice"
                 })
             
-            logger.info(f"Параметры ордера: {params}")
+            logger.info("Размещение ордера {side} {qty} {symbol}", event="order_params", symbol=symbol, side=params["side"],
+                        qty=params["qty"], order_link_id=order_link_id, stop_loss=params.get("stopLoss"),
+                        take_profit=params.get("takeProfit"), tp_size=params.get("tpSize"))
             
-            response = self.client.place_order(**params)
+            if order_link_id:
+                def recover():
+                    order = self.find_order(symbol, order_link_id)
+                    if order is None:
+                        return None
+                    return {'retCode': 0, 'retMsg': "OK",
+                            'result': {'orderId': order['orderId'], 'orderLinkId': order['orderLinkId']}}
+                response = self._call('order', self.client.place_order, recover=recover, **params)
+            else:
+                response = self._call('order', self.client.place_order, idempotent=False, **params)
             if response['retCode'] == 0:
-                logger.info(f"Ордер успешно размещен: {response['result']}")
+                logger.info("Ордер размещен {order_id}", event="order_placed",
+                            order_id=response['result'].get('orderId'), order_link_id=order_link_id)
                 return response['result']
             else:
                 error_msg = f"Ошибка размещения ордера: {response['retMsg']} (ErrCode: {response['retCode']})"
@@ -177,44 +613,50 @@ class BybitClient:
             logger.error(f"Ошибка при размещении ордера: {e}")
             raise
     
+    def place_order_plan(self, plan: OrderPlan) -> Dict:
+        """Размещение основного ордера по готовому плану (со стоп-лоссом, без конвертации размера)"""
+        return self.place_order(
+            symbol=plan.symbol,
+            side=plan.side,
+            qty=plan.position_usdt,
+            stop_loss=True,
+            sl_trigger_price=plan.stop_loss,
+            sl_quantity_percentage=100,
+            contracts=plan.contracts,
+            order_link_id=plan.order_link_id or None
+        )
+    
     def get_balance(self) -> Dict[str, Any]:
         """Получение баланса"""
         try:
-            response = self.client.get_wallet_balance(
-                accountType="UNIFIED"
-            )
+            response = self._call('account', self.client.get_wallet_balance, accountType="UNIFIED")
             return response
         except Exception as e:
             logger.error(f"Ошибка получения баланса: {e}")
             raise
     
-    def place_take_profit(self, symbol: str, tp_trigger_price: float, tp_quantity_percentage: int, total_position_size: float) -> Dict[str, Any]:
-        """Добавление тейк-профита к существующей позиции"""
+    def place_take_profit(self, symbol: str, tp_trigger_price: float, tp_quantity_percentage: int, total_position_size: float,
+                          tp_size: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Добавление тейк-профита к существующей позиции
+        
+        Args:
+            tp_size: Готовый размер из плана ордера; без него размер рассчитывается по спецификации
+        """
         try:
-            # Получаем информацию об инструменте
-            instrument_info = self.get_instrument_info(symbol)
-            qty_step = float(instrument_info['result']['list'][0]['lotSizeFilter']['qtyStep'])
-            
-            # Рассчитываем количество контрактов для тейк-профита
-            tp_contracts = (total_position_size * tp_quantity_percentage / 100)
-            # Округляем до шага
-            tp_contracts = round(tp_contracts / qty_step) * qty_step
-            # Форматируем число
-            tp_contracts_str = f"{tp_contracts:.3f}"
-            
-            logger.info(f"Конвертация {tp_quantity_percentage}% в {tp_contracts_str} контрактов для тейк-профита")
+            # Получаем информацию об инструменте, если размер не рассчитан заранее
+            qty_step = self.get_instrument_spec(symbol)['qty_step'] if tp_size is None else None
             
-            params = {
-                "category": "linear",
-                "symbol": symbol,
-                "takeProfit": str(tp_trigger_price),
-                "tpTriggerBy": "LastPrice",
-                "tpSize": tp_contracts_str,  # Используем tpSize вместо qty
-                "tpslMode": "Full" if tp_quantity_percentage == 100 else "Partial"  # Full для TP3, Partial для остальных
-            }
+            params = take_profit_params(symbol, tp_trigger_price, tp_quantity_percentage, total_position_size,
+                                        qty_step, tp_size)
             
-            logger.info(f"Добавление тейк-профита: {params}")
-            response = self.client.set_trading_stop(**params)
+            logger.info("Добавление тейк-профита {symbol} {trigger_price} {tp_size}", event="take_profit",
+                        symbol=symbol, trigger_price=params['takeProfit'], tp_size=params['tpSize'],
+                        tpsl_mode=params['tpslMode'])
+            def recover():
+                order = self.find_take_profit(symbol, tp_trigger_price, params['tpSize'])
+                return None if order is None else {'retCode': 0, 'retMsg': "OK", 'result': {}}
+            response = self._call('position', self.client.set_trading_stop, recover=recover, **params)
             return response
         except Exception as e:
             logger.error(f"Ошибка добавления тейк-профита: {e}")
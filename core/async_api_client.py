@@ -0,0 +1,435 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Any, Optional, Awaitable, Callable, Mapping, Tuple
+from urllib.parse import urlencode
+import aiohttp
+from loguru import logger
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+from core.api_client import InstrumentCache, usdt_to_contracts, take_profit_params
+from core.order_plan import OrderPlan
+from core.price_feed import PriceFeed
+from core.rate_limiter import RequestScheduler, RATE_LIMIT_CODE
+from core.retry import RetryPolicy, RETRYABLE_CODES, DUPLICATE_ORDER_LINK_ID_CODE
+from core.tracing import tracer
+
+# Ошибки, после которых неизвестно, исполнила ли биржа запрос
+AMBIGUOUS_ERRORS = (asyncio.TimeoutError, aiohttp.ClientError, FailedRequestError)
+
+class AsyncBybitClient:
+    """Асинхронный клиент Bybit v5 на пуле keep-alive соединений aiohttp"""
+
+    DEMO_URL = "https://api-demo.bybit.com"
+
+    def __init__(self, config_path: str = 'config/keys.json', base_url: str = DEMO_URL,
+                 api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                 recv_window: int = 5000, timeout: float = 10.0, pool_size: int = 10,
+                 retry_policy: Optional[RetryPolicy] = None, scheduler: Optional[RequestScheduler] = None):
+        """
+        Args:
+            config_path: Путь к файлу ключей (не читается, если ключи переданы явно)
+            base_url: Адрес REST API
+            api_key: API ключ
+            api_secret: API секрет
+            recv_window: Окно приема запроса на стороне биржи в миллисекундах
+            timeout: Таймаут запроса в секундах
+            pool_size: Максимальное количество одновременных соединений
+            retry_policy: Политика повторов запросов
+            scheduler: Планировщик лимитов; общий с BybitClient, чтобы клиенты делили лимиты биржи
+        """
+        if api_key is None or api_secret is None:
+            with open(config_path, 'r') as f:
+                config = json.load(f)
+            self.mode = 'mainnet'  # Используем mainnet для демо-трейдинга
+            api_key = config[self.mode]['api_key']
+            api_secret = config[self.mode]['api_secret']
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip('/')
+        # Демо-ключи действуют и в приватных потоках только на демо-адресе
+        self.demo = self.base_url == self.DEMO_URL
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.scheduler = scheduler or RequestScheduler()
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.instruments = InstrumentCache(loader=None)
+        self.price_feed: Optional[PriceFeed] = None
+        # Смещение часов биржи относительно локальных, мс: учитывается в X-BAPI-TIMESTAMP
+        self.time_offset_ms = 0.0
+
+    async def open(self) -> None:
+        """Создание пула соединений"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Content-Type": "application/json", "Accept": "application/json"}
+            )
+            logger.info(f"Открыт пул соединений к {self.base_url}")
+
+    async def close(self) -> None:
+        """Закрытие пула соединений"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _sign(self, payload: str, timestamp: int) -> str:
+        """Подпись запроса HMAC-SHA256 по спецификации Bybit v5"""
+        param_str = f"{timestamp}{self.api_key}{self.recv_window}{payload}"
+        return hmac.new(self.api_secret.encode('utf-8'), param_str.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    async def _send(self, method: str, path: str, params: Dict[str, Any], auth: bool,
+                    timeout: float) -> Tuple[Dict[str, Any], Mapping[str, str]]:
+        """
+        Одна попытка запроса к REST API (подпись заново на каждую попытку)
+
+        Returns:
+            Tuple[Dict[str, Any], Mapping[str, str]]: Ответ и заголовки (в них лимиты X-Bapi-Limit)
+        """
+        if method == "GET":
+            payload = urlencode(sorted((k, v) for k, v in params.items() if v is not None))
+            url = f"{self.base_url}{path}?{payload}" if payload else f"{self.base_url}{path}"
+            body = None
+        else:
+            payload = json.dumps(params)
+            url = f"{self.base_url}{path}"
+            body = payload
+
+        headers = {}
+        if auth:
+            timestamp = int(time.time() * 1000 + self.time_offset_ms)
+            headers = {
+                "X-BAPI-API-KEY": self.api_key,
+                "X-BAPI-SIGN": self._sign(payload, timestamp),
+                "X-BAPI-SIGN-TYPE": "2",
+                "X-BAPI-TIMESTAMP": str(timestamp),
+                "X-BAPI-RECV-WINDOW": str(self.recv_window)
+            }
+
+        sent_ms = time.time() * 1000
+        async with self.session.request(method, url, data=body, headers=headers,
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise FailedRequestError(request=f"{method} {path}", message=f"HTTP {response.status}",
+                                         status_code=response.status, time=int(sent_ms),
+                                         resp_headers=response.headers)
+            data = await response.json(content_type=None)
+            response_headers = response.headers
+        tracer.observe_server_time(int(data.get('time') or 0), sent_ms, time.time() * 1000)
+
+        if data.get('retCode'):
+            raise InvalidRequestError(request=f"{method} {path}", message=data.get('retMsg'),
+                                      status_code=data['retCode'], time=data.get('time'),
+                                      resp_headers=response_headers)
+        return data, response_headers
+
+    async def _request(self, group: str, method: str, path: str, params: Dict[str, Any], auth: bool = False,
+                       recover: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None,
+                       idempotent: bool = True) -> Dict[str, Any]:
+        """
+        Запрос к REST API через планировщик лимитов с повторами по self.retry_policy
+
+        Args:
+            group: Группа эндпоинтов (core.rate_limiter.ENDPOINT_GROUPS)
+            recover: Поиск результата запроса на бирже перед повтором после ошибки с неизвестным
+                исходом или дубля orderLinkId; если результат найден, он возвращается без повтора
+            idempotent: Запрос можно повторять после ошибки с неизвестным исходом
+                (для неидемпотентных запросов без recover повторяются только отказы биржи)
+        """
+        if self.session is None:
+            await self.open()
+
+        policy = self.retry_policy
+        deadline_at = policy.start()
+        attempt = 0
+        # Спан охватывает ожидание лимита и все повторы: это полное время запроса для вызывающего
+        with tracer.span(f"bybit{path}", method=method, group=group) as span:
+            while True:
+                await self.scheduler.acquire_async(group)
+                # Попытка не выходит за общий срок запроса
+                timeout = min(self.timeout, max(deadline_at - time.monotonic(), 0.001))
+                try:
+                    data, headers = await self._send(method, path, params, auth, timeout)
+                    self.scheduler.update_from_headers(group, headers)
+                    span['attempts'] = attempt + 1
+                    return data
+                except InvalidRequestError as e:
+                    if e.status_code == RATE_LIMIT_CODE:
+                        self.scheduler.on_rate_limited(group, e.resp_headers)
+                    else:
+                        self.scheduler.update_from_headers(group, e.resp_headers)
+                        if e.status_code == DUPLICATE_ORDER_LINK_ID_CODE and recover is not None:
+                            existing = await recover()
+                            if existing is not None:
+                                logger.warning(f"Запрос {path} уже исполнен биржей, повтор не нужен")
+                                return existing
+                        if e.status_code not in RETRYABLE_CODES:
+                            raise
+                    error = e
+                except AMBIGUOUS_ERRORS as e:
+                    if recover is not None:
+                        existing = await recover()
+                        if existing is not None:
+                            logger.warning(f"Запрос {path} исполнен биржей несмотря на ошибку: {e!r}")
+                            return existing
+                    elif not idempotent:
+                        raise
+                    error = e
+
+                attempt += 1
+                delay = policy.next_delay(attempt, deadline_at)
+                if delay is None:
+                    logger.error(f"Запрос {path} не выполнен после {attempt} попыток: {error!r}")
+                    raise error
+                logger.warning(f"Ошибка запроса {path} ({error!r}), повтор {attempt} через {delay * 1000:.0f} мс")
+                await asyncio.sleep(delay)
+
+    async def sync_time(self) -> float:
+        """
+        Сверка часов с биржей по /v5/market/time
+
+        Returns:
+            float: Смещение часов биржи относительно локальных, мс
+        """
+        sent_ms = time.time() * 1000
+        data = await self._request('market', "GET", "/v5/market/time", {})
+        self.time_offset_ms = int(data['time']) - (sent_ms + time.time() * 1000) / 2
+        return self.time_offset_ms
+
+    async def warm_up(self, connections: int = 2) -> None:
+        """
+        Подготовка к первому ордеру: открытие соединений пула, сверка часов и загрузка спецификаций
+
+        Args:
+            connections: Сколько соединений открыть заранее (одновременные запросы не делят соединение)
+        """
+        await self.open()
+        await asyncio.gather(*(self.sync_time() for _ in range(min(connections, self.pool_size))))
+        if abs(self.time_offset_ms) > 500:
+            logger.warning(f"Часы расходятся с биржей на {self.time_offset_ms:.0f} мс")
+        if self.instruments.is_stale():
+            await self.preload_instruments()
+        logger.info(f"Пул соединений прогрет, смещение часов {self.time_offset_ms:.0f} мс")
+
+    async def keep_alive(self, interval: float = 30.0) -> None:
+        """Периодическая сверка часов, чтобы соединения пула не закрывались по простою"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sync_time()
+            except Exception as e:
+                logger.warning(f"Ошибка запроса поддержания соединения: {e}")
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 100) -> Dict[str, Any]:
+        """Получение исторических данных"""
+        try:
+            return await self._request('market', "GET", "/v5/market/kline", {
+                "category": "linear",
+                "symbol": symbol,
+                "interval": interval,
+                "limit": limit
+            })
+        except Exception as e:
+            logger.error(f"Ошибка получения исторических данных: {e}")
+            raise
+
+    async def get_instrument_info(self, symbol: str) -> Dict[str, Any]:
+        """Получение информации об инструменте"""
+        try:
+            return await self._request('market', "GET", "/v5/market/instruments-info", {
+                "category": "linear",
+                "symbol": symbol
+            })
+        except Exception as e:
+            logger.error(f"Ошибка при получении информации об инструменте: {e}")
+            raise
+
+    async def preload_instruments(self) -> int:
+        """Загрузка спецификаций всех линейных инструментов"""
+        items = []
+        cursor = None
+        while True:
+            params = {"category": "linear", "limit": 1000, "cursor": cursor}
+            result = (await self._request('market', "GET", "/v5/market/instruments-info", params))['result']
+            items.extend(result['list'])
+            cursor = result.get('nextPageCursor')
+            if not cursor:
+                break
+        return self.instruments.replace(items)
+
+    async def get_instrument_spec(self, symbol: str) -> Dict[str, Any]:
+        """Получение спецификации инструмента из кэша"""
+        spec = self.instruments.lookup(symbol)
+        if spec is not None:
+            return spec
+        items = (await self.get_instrument_info(symbol))['result']['list']
+        if not items:
+            raise ValueError(f"Инструмент {symbol} не найден")
+        return self.instruments.store(items[0])
+
+    async def find_order(self, symbol: str, order_link_id: str) -> Optional[Dict[str, Any]]:
+        """Поиск ордера по orderLinkId среди активных и недавно исполненных"""
+        for path in ("/v5/order/realtime", "/v5/order/history"):
+            params = {"category": "linear", "symbol": symbol, "orderLinkId": order_link_id}
+            items = (await self._request('account', "GET", path, params, auth=True))['result']['list']
+            if items:
+                return items[0]
+        return None
+
+    async def find_take_profit(self, symbol: str, tp_trigger_price: float, tp_size: str) -> Optional[Dict[str, Any]]:
+        """Поиск уже выставленного тейк-профита с заданной ценой и размером"""
+        params = {"category": "linear", "symbol": symbol, "orderFilter": "StopOrder"}
+        items = (await self._request('account', "GET", "/v5/order/realtime", params, auth=True))['result']['list']
+        for item in items:
+            if (item.get('stopOrderType') in ('TakeProfit', 'PartialTakeProfit')
+                    and float(item['triggerPrice']) == float(tp_trigger_price)
+                    and float(item['qty']) == float(tp_size)):
+                return item
+        return None
+
+    def attach_price_feed(self, price_feed: PriceFeed) -> None:
+        """Подключение потока цен для get_last_price"""
+        self.price_feed = price_feed
+
+    async def get_last_price(self, symbol: str) -> float:
+        """Получение текущей цены из потока тикеров (при устаревании - через REST)"""
+        if self.price_feed is not None:
+            price = self.price_feed.get_last_price(symbol)
+            if price is not None:
+                return price
+            if not self.price_feed.is_subscribed(symbol):
+                try:
+                    self.price_feed.subscribe([symbol])
+                except Exception as e:
+                    logger.warning(f"Не удалось подписаться на тикер {symbol}: {e}")
+        klines = await self.get_klines(symbol=symbol, interval="1", limit=1)
+        return float(klines['result']['list'][0][4])
+
+    async def get_balance(self) -> Dict[str, Any]:
+        """Получение баланса"""
+        try:
+            return await self._request('account', "GET", "/v5/account/wallet-balance", {"accountType": "UNIFIED"}, auth=True)
+        except Exception as e:
+            logger.error(f"Ошибка получения баланса: {e}")
+            raise
+
+    async def _convert_usdt_to_contracts(self, symbol: str, usdt_amount: float) -> float:
+        """Конвертация USDT в количество контрактов"""
+        try:
+            spec = await self.get_instrument_spec(symbol)
+            current_price = await self.get_last_price(symbol)
+            contracts = usdt_to_contracts(usdt_amount, current_price, spec['min_qty'], spec['qty_step'])
+            logger.debug("Конвертация {usdt} USDT в {contracts} контрактов {symbol} по цене {price}", event="sizing",
+                         symbol=symbol, usdt=usdt_amount, price=current_price, contracts=contracts)
+            return contracts
+        except Exception as e:
+            logger.error(f"Ошибка при конвертации USDT в контракты: {e}")
+            raise
+
+    async def place_order(self, symbol: str, side: str, qty: float, take_profit: bool = False,
+                          tp_trigger_price: float = None, tp_quantity_percentage: float = None,
+                          stop_loss: bool = False, sl_trigger_price: float = None, sl_quantity_percentage: float = None,
+                          contracts: float = None, order_link_id: Optional[str] = None) -> Dict:
+        """
+        Размещение рыночного ордера
+
+        Args:
+            qty: Размер позиции в USDT
+            contracts: Готовое количество контрактов; если указано, qty не конвертируется
+            order_link_id: Клиентский идентификатор ордера (повторная отправка не создаст дубль)
+        """
+        try:
+            if contracts is None:
+                contracts = await self._convert_usdt_to_contracts(symbol, qty)
+
+            params = {
+                "category": "linear",
+                "symbol": symbol,
+                "side": side.capitalize(),
+                "qty": f"{contracts:.3f}",
+                "orderType": "MARKET",
+                "positionIdx": 0,
+                "timeInForce": "GTC",
+                "tpslMode": "Full"
+            }
+            if order_link_id:
+                params["orderLinkId"] = order_link_id
+
+            if take_profit and tp_trigger_price:
+                spec = await self.get_instrument_spec(symbol)
+                tp_size = take_profit_params(symbol, tp_trigger_price, tp_quantity_percentage or 100,
+                                             contracts, spec['qty_step'])['tpSize']
+                params.update({
+                    "takeProfit": str(tp_trigger_price),
+                    "tpTriggerBy": "LastPrice",
+                    "tpSize": tp_size
+                })
+
+            if stop_loss and sl_trigger_price:
+                params.update({
+                    "stopLoss": str(sl_trigger_price),
+                    "slTriggerBy": "LastPrice"
+                })
+
+            logger.info("Размещение ордера {side} {qty} {symbol}", event="order_params", symbol=symbol, side=params["side"],
+                        qty=params["qty"], order_link_id=order_link_id, stop_loss=params.get("stopLoss"),
+                        take_profit=params.get("takeProfit"), tp_size=params.get("tpSize"))
+            if order_link_id:
+                async def recover():
+                    order = await self.find_order(symbol, order_link_id)
+                    if order is None:
+                        return None
+                    return {'retCode': 0, 'retMsg': "OK",
+                            'result': {'orderId': order['orderId'], 'orderLinkId': order['orderLinkId']}}
+                response = await self._request('order', "POST", "/v5/order/create", params, auth=True, recover=recover)
+            else:
+                response = await self._request('order', "POST", "/v5/order/create", params, auth=True, idempotent=False)
+            logger.info("Ордер размещен {order_id}", event="order_placed",
+                        order_id=response['result'].get('orderId'), order_link_id=order_link_id)
+            return response['result']
+        except Exception as e:
+            logger.error(f"Ошибка при размещении ордера: {e}")
+            raise
+
+    async def place_order_plan(self, plan: OrderPlan) -> Dict:
+        """Размещение основного ордера по готовому плану (со стоп-лоссом, без конвертации размера)"""
+        return await self.place_order(
+            symbol=plan.symbol,
+            side=plan.side,
+            qty=plan.position_usdt,
+            stop_loss=True,
+            sl_trigger_price=plan.stop_loss,
+            sl_quantity_percentage=100,
+            contracts=plan.contracts,
+            order_link_id=plan.order_link_id or None
+        )
+
+    async def place_take_profit(self, symbol: str, tp_trigger_price: float, tp_quantity_percentage: int,
+                                total_position_size: float, tp_size: Optional[str] = None) -> Dict[str, Any]:
+        """Добавление тейк-профита к существующей позиции (tp_size - готовый размер из плана ордера)"""
+        try:
+            qty_step = (await self.get_instrument_spec(symbol))['qty_step'] if tp_size is None else None
+            params = take_profit_params(symbol, tp_trigger_price, tp_quantity_percentage,
+                                        total_position_size, qty_step, tp_size)
+            logger.info("Добавление тейк-профита {symbol} {trigger_price} {tp_size}", event="take_profit",
+                        symbol=symbol, trigger_price=params['takeProfit'], tp_size=params['tpSize'],
+                        tpsl_mode=params['tpslMode'])
+            async def recover():
+                order = await self.find_take_profit(symbol, tp_trigger_price, params['tpSize'])
+                return None if order is None else {'retCode': 0, 'retMsg': "OK", 'result': {}}
+            return await self._request('position', "POST", "/v5/position/trading-stop", params, auth=True, recover=recover)
+        except Exception as e:
+            logger.error(f"Ошибка добавления тейк-профита: {e}")
+            raise
@@ -0,0 +1,599 @@
+"""
+Локальная имитация биржи Bybit v5 для офлайн-интеграционных и нагрузочных тестов
+
+FakeBybitExchange реализует методы pybit HTTP, которые использует BybitClient
+(get_kline, get_instruments_info, get_wallet_balance, place_order, set_trading_stop,
+get_tickers и запросы ордеров, позиций и исполнений), поверх простого движка
+сопоставления: рыночные ордера исполняются по последней цене, лимитные ждут
+пересечения цены, тейк-профиты и стоп-лоссы срабатывают при set_price.
+Задержка и сбои задаются параметрами, все запросы записываются в журнал.
+FakeExchangeServer отдает ту же биржу по HTTP для AsyncBybitClient.
+"""
+import collections
+import itertools
+import json
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Any, Callable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import requests
+from pybit.exceptions import InvalidRequestError
+from loguru import logger
+from core.retry import DUPLICATE_ORDER_LINK_ID_CODE
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Инструменты по умолчанию: минимальный размер и шаг лота, шаг цены, начальная цена
+DEFAULT_INSTRUMENTS = {
+    'BTCUSDT': {'min_qty': 0.001, 'qty_step': 0.001, 'tick_size': 0.1, 'price': 60000.0},
+    'ETHUSDT': {'min_qty': 0.01, 'qty_step': 0.01, 'tick_size': 0.01, 'price': 2490.0},
+    'SOLUSDT': {'min_qty': 0.1, 'qty_step': 0.1, 'tick_size': 0.001, 'price': 150.0}
+}
+
+INVALID_REQUEST_CODE = 10001
+SERVICE_RESTARTING_CODE = 10016
+INSUFFICIENT_BALANCE_CODE = 110007
+
+# Пути REST API Bybit v5 и соответствующие методы имитации
+HTTP_ROUTES = {
+    ('GET', '/v5/market/time'): 'get_server_time',
+    ('GET', '/v5/market/kline'): 'get_kline',
+    ('GET', '/v5/market/instruments-info'): 'get_instruments_info',
+    ('GET', '/v5/market/tickers'): 'get_tickers',
+    ('GET', '/v5/account/wallet-balance'): 'get_wallet_balance',
+    ('GET', '/v5/order/realtime'): 'get_open_orders',
+    ('GET', '/v5/order/history'): 'get_order_history',
+    ('GET', '/v5/position/list'): 'get_positions',
+    ('GET', '/v5/execution/list'): 'get_executions',
+    ('POST', '/v5/order/create'): 'place_order',
+    ('POST', '/v5/position/trading-stop'): 'set_trading_stop'
+}
+
+class RequestRecord(NamedTuple):
+    """Запрос к имитации биржи"""
+    ts: float                    # time.time() получения запроса
+    method: str
+    params: Dict[str, Any]
+    ret_code: Optional[int]      # None - ответ не получен (внедренный таймаут)
+    duration_ms: float           # Время обработки, включая внедренную задержку
+
+def _ok(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {'retCode': 0, 'retMsg': "OK", 'result': result, 'time': int(time.time() * 1000)}
+
+def _fmt(value: float) -> str:
+    return f"{value:.10g}"
+
+class FakeBybitExchange:
+    """
+    Имитация pybit HTTP с движком сопоставления, задержками и сбоями
+
+    faults[метод] - очередь сбоев для следующих вызовов метода:
+        'lost_request' - таймаут, запрос до биржи не дошел
+        'lost_response' - таймаут, запрос исполнен, но ответ потерян
+        int - отказ биржи с этим кодом
+    """
+
+    def __init__(self, instruments: Optional[Dict[str, Dict[str, float]]] = None, balance: float = 10_000.0,
+                 leverage: float = 10.0, fee_rate: float = 0.00055, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0, log_size: int = 100_000):
+        """
+        Args:
+            instruments: Спецификации и начальные цены инструментов (по умолчанию DEFAULT_INSTRUMENTS)
+            balance: Начальный баланс USDT
+            leverage: Плечо для расчета маржи позиций
+            fee_rate: Комиссия тейкера от объема сделки
+            latency: Задержка ответа на каждый запрос, сек
+            jitter: Случайная добавка к задержке (равномерно от 0 до jitter), сек
+            error_rate: Доля запросов, отклоняемых кодом 10016 (запрос не исполнен, можно повторить)
+            seed: Зерно генератора сбоев и задержек
+            log_size: Сколько последних запросов хранить в журнале
+        """
+        instruments = instruments or DEFAULT_INSTRUMENTS
+        self.instruments = {symbol: dict(spec) for symbol, spec in instruments.items()}
+        self.prices = {symbol: float(spec['price']) for symbol, spec in self.instruments.items()}
+        self.balance = balance
+        self.leverage = leverage
+        self.fee_rate = fee_rate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.faults: Dict[str, List[Any]] = {}
+        self.requests = collections.deque(maxlen=log_size)
+        self.calls = collections.Counter()
+        self.orders: Dict[str, Dict[str, Any]] = {}            # orderId -> ордер
+        # Активные ордера по инструментам и Full тейк-профит/стоп-лосс позиции: без перебора всей истории
+        self._active: Dict[str, Dict[str, Dict[str, Any]]] = {symbol: {} for symbol in self.instruments}
+        self._full_protection: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.positions: Dict[str, Dict[str, float]] = {}       # symbol -> {'size' (со знаком), 'entry_price'}
+        self.executions: List[Dict[str, Any]] = []
+        self.candles: Dict[str, List[List[float]]] = {symbol: [] for symbol in self.instruments}
+        self.listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+        self._link_ids: Dict[str, str] = {}                    # orderLinkId -> orderId
+        self._ids = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        for symbol, price in self.prices.items():
+            self._update_candle(symbol, price, time.time())
+
+    # Внедрение задержек и сбоев
+
+    def _request(self, method: str, params: Dict[str, Any], handler: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Выполнение запроса с задержкой, сбоями и записью в журнал"""
+        started_at = time.time()
+        start = time.perf_counter()
+        self.calls[method] += 1
+        ret_code = None
+        try:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay:
+                time.sleep(delay)
+            queue = self.faults.get(method)
+            fault = queue.pop(0) if queue else None
+            if fault is None and self.error_rate and self._random.random() < self.error_rate:
+                fault = SERVICE_RESTARTING_CODE
+            if fault == 'lost_request':
+                raise requests.exceptions.ReadTimeout("Read timed out")
+            if isinstance(fault, int):
+                self._reject(method, fault, "Injected error")
+            with self._lock:
+                response = handler()
+            if fault == 'lost_response':
+                raise requests.exceptions.ReadTimeout("Read timed out")
+            ret_code = 0
+            return response
+        except InvalidRequestError as e:
+            ret_code = e.status_code
+            raise
+        finally:
+            self.requests.append(RequestRecord(started_at, method, params, ret_code,
+                                               (time.perf_counter() - start) * 1000))
+
+    @staticmethod
+    def _reject(method: str, code: int, message: str) -> None:
+        raise InvalidRequestError(request=method, message=message, status_code=code, time="", resp_headers={})
+
+    def _spec(self, method: str, symbol: str) -> Dict[str, float]:
+        spec = self.instruments.get(symbol)
+        if spec is None:
+            self._reject(method, INVALID_REQUEST_CODE, f"symbol invalid: {symbol}")
+        return spec
+
+    # Рыночные данные
+
+    def _update_candle(self, symbol: str, price: float, now: float) -> None:
+        """Минутные свечи [start_ms, open, high, low, close, volume, turnover] по изменениям цены"""
+        start_ms = int(now // 60) * 60_000
+        candles = self.candles[symbol]
+        if candles and candles[-1][0] == start_ms:
+            candle = candles[-1]
+            candle[2] = max(candle[2], price)
+            candle[3] = min(candle[3], price)
+            candle[4] = price
+        else:
+            candles.append([start_ms, price, price, price, price, 0.0, 0.0])
+            del candles[:-1000]
+
+    def get_server_time(self, **params) -> Dict[str, Any]:
+        def handler():
+            now = time.time()
+            return _ok({'timeSecond': str(int(now)), 'timeNano': str(int(now * 1e9))})
+        return self._request('get_server_time', params, handler)
+
+    def get_kline(self, category: str = "linear", symbol: str = "", interval: str = "1", limit: int = 200,
+                  **params) -> Dict[str, Any]:
+        """Минутные свечи (interval не учитывается), новые первыми, как в Bybit"""
+        def handler():
+            self._spec('get_kline', symbol)
+            candles = self.candles[symbol][-int(limit):]
+            items = [[str(candle[0])] + [_fmt(value) for value in candle[1:]] for candle in reversed(candles)]
+            return _ok({'category': category, 'symbol': symbol, 'list': items})
+        return self._request('get_kline', {'symbol': symbol, 'interval': interval, 'limit': limit, **params}, handler)
+
+    def get_instruments_info(self, category: str = "linear", symbol: Optional[str] = None, limit: int = 500,
+                             cursor: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            symbols = [symbol] if symbol else sorted(self.instruments)
+            offset = int(cursor or 0)
+            page = symbols[offset:offset + int(limit)]
+            items = [{
+                'symbol': name,
+                'status': "Trading",
+                'lotSizeFilter': {'minOrderQty': _fmt(self.instruments[name]['min_qty']), 'maxOrderQty': "1000000",
+                                  'qtyStep': _fmt(self.instruments[name]['qty_step'])},
+                'priceFilter': {'tickSize': _fmt(self.instruments[name]['tick_size'])}
+            } for name in page if name in self.instruments]
+            next_offset = offset + len(page)
+            return _ok({'category': category, 'list': items,
+                        'nextPageCursor': str(next_offset) if next_offset < len(symbols) else ""})
+        return self._request('get_instruments_info', {'symbol': symbol, 'limit': limit, 'cursor': cursor}, handler)
+
+    def get_tickers(self, category: str = "linear", symbol: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            symbols = [symbol] if symbol else sorted(self.prices)
+            items = [{'symbol': name, 'lastPrice': _fmt(self.prices[name])} for name in symbols if name in self.prices]
+            return _ok({'category': category, 'list': items})
+        return self._request('get_tickers', {'symbol': symbol}, handler)
+
+    def set_price(self, symbol: str, price: float) -> None:
+        """Изменение последней цены: исполнение лимитных ордеров, тейк-профитов и стоп-лоссов"""
+        with self._lock:
+            self._spec('set_price', symbol)
+            previous = self.prices[symbol]
+            self.prices[symbol] = price
+            self._update_candle(symbol, price, time.time())
+            # Ордера срабатывают в том порядке, в котором цена проходила их уровни
+            orders = sorted(self._active[symbol].values(),
+                            key=lambda order: abs(float(order['triggerPrice'] if order['stopOrderType'] else order['price'])
+                                                  - previous))
+            for order in orders:
+                if order['orderStatus'] == "New" and self._crosses(order['side'], price, float(order['price'])):
+                    self._fill(order, float(order['price']))
+                elif order['orderStatus'] == "Untriggered" and self._triggered(order, price):
+                    self._trigger(order, price)
+
+    @staticmethod
+    def _crosses(side: str, price: float, limit_price: float) -> bool:
+        return price <= limit_price if side == "Buy" else price >= limit_price
+
+    @staticmethod
+    def _triggered(order: Dict[str, Any], price: float) -> bool:
+        trigger = float(order['triggerPrice'])
+        # Закрывающий ордер длинной позиции - продажа: тейк-профит выше цены, стоп-лосс ниже
+        if order['stopOrderType'] == "StopLoss":
+            return price <= trigger if order['side'] == "Sell" else price >= trigger
+        return price >= trigger if order['side'] == "Sell" else price <= trigger
+
+    # Счет и позиции
+
+    def _used_margin(self) -> float:
+        return sum(abs(position['size']) * position['entry_price'] for position in self.positions.values()) / self.leverage
+
+    def _unrealised_pnl(self) -> float:
+        return sum(position['size'] * (self.prices[symbol] - position['entry_price'])
+                   for symbol, position in self.positions.items())
+
+    def get_wallet_balance(self, accountType: str = "UNIFIED", **params) -> Dict[str, Any]:
+        def handler():
+            equity = self.balance + self._unrealised_pnl()
+            account = {
+                'accountType': accountType,
+                'totalEquity': _fmt(equity),
+                'totalWalletBalance': _fmt(self.balance),
+                'totalAvailableBalance': _fmt(equity - self._used_margin()),
+                'coin': [{'coin': "USDT", 'walletBalance': _fmt(self.balance), 'equity': _fmt(equity)}]
+            }
+            return _ok({'list': [account]})
+        return self._request('get_wallet_balance', {'accountType': accountType}, handler)
+
+    def _position_item(self, symbol: str) -> Dict[str, Any]:
+        position = self.positions[symbol]
+        size = position['size']
+        return {
+            'symbol': symbol,
+            'side': "Buy" if size > 0 else "Sell",
+            'size': _fmt(abs(size)),
+            'avgPrice': _fmt(position['entry_price']),
+            'markPrice': _fmt(self.prices[symbol]),
+            'unrealisedPnl': _fmt(size * (self.prices[symbol] - position['entry_price'])),
+            'leverage': _fmt(self.leverage),
+            'updatedTime': str(position['updated_time'])
+        }
+
+    def get_positions(self, category: str = "linear", symbol: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            items = [self._position_item(name) for name in sorted(self.positions) if symbol is None or name == symbol]
+            return _ok({'category': category, 'list': items, 'nextPageCursor': ""})
+        return self._request('get_positions', {'symbol': symbol, **params}, handler)
+
+    # Ордера
+
+    def _new_order(self, symbol: str, side: str, qty: float, order_type: str, price: float = 0.0,
+                   order_link_id: str = "", stop_order_type: str = "", trigger_price: float = 0.0) -> Dict[str, Any]:
+        now_ms = int(time.time() * 1000)
+        order = {
+            'orderId': str(next(self._ids)),
+            'orderLinkId': order_link_id,
+            'symbol': symbol,
+            'side': side,
+            'orderType': order_type,
+            'qty': _fmt(qty),
+            'price': _fmt(price),
+            'stopOrderType': stop_order_type,
+            'triggerPrice': _fmt(trigger_price),
+            'orderStatus': "Untriggered" if stop_order_type else "New",
+            'cumExecQty': "0",
+            'avgPrice': "0",
+            'createdTime': str(now_ms),
+            'updatedTime': str(now_ms)
+        }
+        self.orders[order['orderId']] = order
+        self._active[symbol][order['orderId']] = order
+        if order_link_id:
+            self._link_ids[order_link_id] = order['orderId']
+        return order
+
+    def _set_status(self, order: Dict[str, Any], status: str) -> None:
+        order['orderStatus'] = status
+        if status not in ("New", "Untriggered"):
+            self._active[order['symbol']].pop(order['orderId'], None)
+        order['updatedTime'] = str(int(time.time() * 1000))
+        self._emit('order', [dict(order)])
+
+    def place_order(self, category: str = "linear", symbol: str = "", side: str = "", orderType: str = "Market",
+                    qty: str = "0", price: Optional[str] = None, orderLinkId: Optional[str] = None,
+                    stopLoss: Optional[str] = None, takeProfit: Optional[str] = None, tpSize: Optional[str] = None,
+                    reduceOnly: bool = False, **params) -> Dict[str, Any]:
+        request = {'symbol': symbol, 'side': side, 'orderType': orderType, 'qty': qty, 'price': price,
+                   'orderLinkId': orderLinkId, 'stopLoss': stopLoss, 'takeProfit': takeProfit, **params}
+
+        def handler():
+            spec = self._spec('place_order', symbol)
+            if orderLinkId and orderLinkId in self._link_ids:
+                self._reject('place_order', DUPLICATE_ORDER_LINK_ID_CODE, "OrderLinkedID is duplicate")
+            order_qty = float(qty)
+            steps = order_qty / spec['qty_step']
+            if order_qty < spec['min_qty'] or abs(steps - round(steps)) > 1e-6:
+                self._reject('place_order', INVALID_REQUEST_CODE, f"Qty invalid: {qty}")
+            market = orderType.lower() == "market"
+            fill_price = self.prices[symbol] if market else float(price)
+            position = self.positions.get(symbol)
+            opening = position is None or (position['size'] > 0) == (side.capitalize() == "Buy")
+            if opening and not reduceOnly:
+                equity = self.balance + self._unrealised_pnl()
+                if order_qty * fill_price / self.leverage > equity - self._used_margin():
+                    self._reject('place_order', INSUFFICIENT_BALANCE_CODE, "ab not enough for new order")
+            order = self._new_order(symbol, side.capitalize(), order_qty, "Market" if market else "Limit",
+                                    0.0 if market else fill_price, orderLinkId or "")
+            self._emit('order', [dict(order)])
+            if market or self._crosses(order['side'], self.prices[symbol], fill_price):
+                self._fill(order, fill_price)
+            if symbol in self.positions:
+                if stopLoss:
+                    self._protect(symbol, "StopLoss", float(stopLoss), None)
+                if takeProfit:
+                    self._protect(symbol, "PartialTakeProfit" if tpSize else "TakeProfit", float(takeProfit),
+                                  float(tpSize) if tpSize else None)
+            return _ok({'orderId': order['orderId'], 'orderLinkId': order['orderLinkId']})
+        return self._request('place_order', request, handler)
+
+    def _protect(self, symbol: str, stop_order_type: str, trigger_price: float, qty: Optional[float]) -> None:
+        """Условный закрывающий ордер позиции (qty=None - на всю позицию)"""
+        size = self.positions[symbol]['size']
+        order = self._new_order(symbol, "Sell" if size > 0 else "Buy", abs(size) if qty is None else qty, "Market",
+                                stop_order_type=stop_order_type, trigger_price=trigger_price)
+        if qty is None:
+            # Full-режим: новый тейк-профит или стоп-лосс заменяет предыдущий
+            previous = self._full_protection.get((symbol, stop_order_type))
+            if previous is not None and previous['orderStatus'] == "Untriggered":
+                self._set_status(previous, "Deactivated")
+            self._full_protection[(symbol, stop_order_type)] = order
+        self._emit('order', [dict(order)])
+
+    def set_trading_stop(self, category: str = "linear", symbol: str = "", takeProfit: Optional[str] = None,
+                         stopLoss: Optional[str] = None, tpslMode: str = "Full", tpSize: Optional[str] = None,
+                         slSize: Optional[str] = None, **params) -> Dict[str, Any]:
+        request = {'symbol': symbol, 'takeProfit': takeProfit, 'stopLoss': stopLoss, 'tpslMode': tpslMode,
+                   'tpSize': tpSize, **params}
+
+        def handler():
+            self._spec('set_trading_stop', symbol)
+            if symbol not in self.positions:
+                self._reject('set_trading_stop', INVALID_REQUEST_CODE, "can not set tp/sl/ts for zero position")
+            partial = tpslMode == "Partial"
+            if takeProfit:
+                self._protect(symbol, "PartialTakeProfit" if partial else "TakeProfit", float(takeProfit),
+                              float(tpSize) if partial and tpSize else None)
+            if stopLoss:
+                self._protect(symbol, "StopLoss", float(stopLoss), float(slSize) if partial and slSize else None)
+            return _ok({})
+        return self._request('set_trading_stop', request, handler)
+
+    def get_open_orders(self, category: str = "linear", symbol: Optional[str] = None, orderLinkId: Optional[str] = None,
+                        orderFilter: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            items = []
+            symbols = [symbol] if symbol is not None else sorted(self._active)
+            for order in (order for name in symbols for order in self._active.get(name, {}).values()):
+                if orderLinkId is not None and order['orderLinkId'] != orderLinkId:
+                    continue
+                if orderFilter == "StopOrder" and not order['stopOrderType']:
+                    continue
+                items.append(dict(order))
+            return _ok({'category': category, 'list': items, 'nextPageCursor': ""})
+        return self._request('get_open_orders', {'symbol': symbol, 'orderLinkId': orderLinkId,
+                                                 'orderFilter': orderFilter}, handler)
+
+    def get_order_history(self, category: str = "linear", symbol: Optional[str] = None,
+                          orderLinkId: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            if orderLinkId is not None:
+                order_id = self._link_ids.get(orderLinkId)
+                orders = [self.orders[order_id]] if order_id else []
+            else:
+                orders = [order for order in self.orders.values() if symbol is None or order['symbol'] == symbol]
+            return _ok({'category': category, 'list': [dict(order) for order in orders], 'nextPageCursor': ""})
+        return self._request('get_order_history', {'symbol': symbol, 'orderLinkId': orderLinkId}, handler)
+
+    def get_executions(self, category: str = "linear", startTime: Optional[int] = None, limit: int = 100,
+                       cursor: Optional[str] = None, **params) -> Dict[str, Any]:
+        def handler():
+            items = [fill for fill in self.executions if startTime is None or int(fill['execTime']) >= int(startTime)]
+            offset = int(cursor or 0)
+            page = items[offset:offset + int(limit)]
+            next_offset = offset + len(page)
+            return _ok({'category': category, 'list': [dict(fill) for fill in page],
+                        'nextPageCursor': str(next_offset) if next_offset < len(items) else ""})
+        return self._request('get_executions', {'startTime': startTime, 'cursor': cursor}, handler)
+
+    # Движок сопоставления
+
+    def _trigger(self, order: Dict[str, Any], price: float) -> None:
+        position = self.positions.get(order['symbol'])
+        if position is None:
+            self._set_status(order, "Deactivated")
+            return
+        # Закрывающий ордер не может быть больше оставшейся позиции
+        order['qty'] = _fmt(min(float(order['qty']), abs(position['size'])))
+        self._set_status(order, "Triggered")
+        self._fill(order, price)
+
+    def _fill(self, order: Dict[str, Any], price: float) -> None:
+        """Полное исполнение ордера: позиция, баланс, исполнение и события потоков"""
+        symbol = order['symbol']
+        qty = float(order['qty'])
+        signed = qty if order['side'] == "Buy" else -qty
+        now_ms = int(time.time() * 1000)
+        position = self.positions.get(symbol)
+        closed = 0.0
+        if position is None:
+            position = self.positions[symbol] = {'size': 0.0, 'entry_price': price, 'updated_time': now_ms}
+        if position['size'] and (position['size'] > 0) != (signed > 0):
+            closed = min(qty, abs(position['size']))
+            direction = 1 if position['size'] > 0 else -1
+            self.balance += closed * (price - position['entry_price']) * direction
+        new_size = position['size'] + signed
+        if abs(new_size) < 1e-12:
+            del self.positions[symbol]
+        else:
+            if closed < qty:
+                # Увеличение позиции (или разворот) пересчитывает среднюю цену входа
+                opened = qty - closed
+                base = abs(position['size']) if not closed else 0.0
+                position['entry_price'] = (base * position['entry_price'] + opened * price) / (base + opened)
+            position['size'] = new_size
+            position['updated_time'] = now_ms
+        self.balance -= qty * price * self.fee_rate
+
+        order['cumExecQty'] = order['qty']
+        order['avgPrice'] = _fmt(price)
+        fill = {
+            'execId': f"e{next(self._ids)}",
+            'orderId': order['orderId'],
+            'orderLinkId': order['orderLinkId'],
+            'symbol': symbol,
+            'side': order['side'],
+            'execPrice': _fmt(price),
+            'execQty': order['qty'],
+            'execFee': _fmt(qty * price * self.fee_rate),
+            'execTime': str(now_ms),
+            'closedSize': _fmt(closed),
+            'stopOrderType': order['stopOrderType']
+        }
+        self.executions.append(fill)
+        self._set_status(order, "Filled")
+        self._emit('execution', [dict(fill)])
+        if symbol in self.positions:
+            self._emit('position', [self._position_item(symbol)])
+        else:
+            self._emit('position', [{'symbol': symbol, 'side': "", 'size': "0", 'updatedTime': str(now_ms)}])
+            # Закрытие позиции снимает оставшиеся тейк-профиты и стоп-лоссы
+            for other in list(self._active[symbol].values()):
+                if other['orderStatus'] == "Untriggered":
+                    self._set_status(other, "Deactivated")
+
+    # Приватные потоки
+
+    def add_listener(self, callback: Callable[[str, List[Dict[str, Any]]], None]) -> None:
+        """Подписка на события order, execution и position (например, ReplayPrivateSource.push)"""
+        self.listeners.append(callback)
+
+    def _emit(self, topic: str, data: List[Dict[str, Any]]) -> None:
+        for callback in self.listeners:
+            try:
+                callback(topic, data)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика события {topic} имитации биржи: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Количество запросов по методам, отказы и время обработки"""
+        durations = sorted(record.duration_ms for record in self.requests)
+        return {
+            'requests': dict(self.calls),
+            'errors': sum(1 for record in self.requests if record.ret_code != 0),
+            'avg_ms': sum(durations) / len(durations) if durations else 0.0,
+            'p99_ms': durations[int(round(0.99 * (len(durations) - 1)))] if durations else 0.0,
+            'positions': {symbol: position['size'] for symbol, position in self.positions.items()},
+            'balance': self.balance
+        }
+
+class FakeExchangeServer:
+    """
+    HTTP-доступ к FakeBybitExchange по путям REST API Bybit v5
+
+    Подпись запросов не проверяется. Ошибки биржи возвращаются как retCode в JSON,
+    внедренный таймаут - обрывом соединения без ответа.
+    """
+
+    def __init__(self, exchange: FakeBybitExchange, host: str = "127.0.0.1", port: int = 0):
+        self.exchange = exchange
+        self.host = host
+        self.port = port
+        self._server: Optional['ThreadingHTTPServer'] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def handle(self, method: str, path: str, params: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Ответ на запрос: (HTTP-статус, тело); тело None - соединение обрывается"""
+        name = HTTP_ROUTES.get((method, path))
+        if name is None:
+            return 404, {'retCode': 404, 'retMsg': f"Unknown path {path}"}
+        try:
+            return 200, getattr(self.exchange, name)(**params)
+        except InvalidRequestError as e:
+            return 200, {'retCode': e.status_code, 'retMsg': e.message, 'result': {}, 'time': int(time.time() * 1000)}
+        except requests.exceptions.Timeout:
+            return 200, None
+
+    def start(self) -> str:
+        """Запуск сервера в фоновом потоке; возвращает базовый URL"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, method: str, params: Dict[str, Any]) -> None:
+                status, body = server.handle(method, urlsplit(self.path).path, params)
+                if body is None:
+                    self.close_connection = True
+                    return
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._respond("GET", dict(parse_qsl(urlsplit(self.path).query)))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self._respond("POST", json.loads(self.rfile.read(length) or b"{}"))
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-bybit-http", daemon=True).start()
+        logger.info(f"Имитация Bybit доступна на {self.url}")
+        return self.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
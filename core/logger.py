@@ -1,24 +1,215 @@
+import atexit
+import glob
+import itertools
+import json
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, TextIO
 from loguru import logger
 
-def setup_logger():
-    """Настройка логгера"""
+# Уровни по умолчанию для режима production: шумные модули только с предупреждениями
+PRODUCTION_MODULE_LEVELS = {
+    "": "INFO",
+    "pybit": "WARNING",
+    "telethon": "WARNING"
+}
+
+class LogFilter:
+    """
+    Фильтр записей: уровень по модулю и прореживание частых событий
+
+    Уровень берется по самому длинному совпадающему префиксу имени модуля
+    ("" - для всех модулей). Прореживание задается по имени события
+    (logger.debug("...", event="sizing")): при доле 0.01 пропускается каждая сотая запись.
+    """
+
+    def __init__(self, module_levels: Optional[Dict[str, str]] = None,
+                 sample_rates: Optional[Dict[str, float]] = None):
+        module_levels = dict(module_levels or {"": "DEBUG"})
+        module_levels.setdefault("", "DEBUG")
+        # Самые длинные префиксы проверяются первыми
+        self.levels = sorted(((module, logger.level(level).no) for module, level in module_levels.items()),
+                             key=lambda item: len(item[0]), reverse=True)
+        self.every = {event: max(1, round(1 / rate)) for event, rate in (sample_rates or {}).items() if rate > 0}
+        self.dropped = set(event for event, rate in (sample_rates or {}).items() if rate <= 0)
+        self._counters: Dict[str, itertools.count] = {}
+        self._cache: Dict[str, int] = {}
+
+    def min_level(self, name: str) -> int:
+        level = self._cache.get(name)
+        if level is None:
+            for module, level in self.levels:
+                if not module or name == module or name.startswith(module + "."):
+                    break
+            self._cache[name] = level
+        return level
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        if record["level"].no < self.min_level(record["name"] or ""):
+            return False
+        event = record["extra"].get("event")
+        if event is None:
+            return True
+        if event in self.dropped:
+            return False
+        every = self.every.get(event)
+        if every is None:
+            return True
+        counter = self._counters.get(event)
+        if counter is None:
+            counter = self._counters[event] = itertools.count()
+        return next(counter) % every == 0
+
+def _json_record(record: Dict[str, Any]) -> str:
+    """Компактная JSON-строка записи: время, уровень, место вызова, сообщение и поля extra"""
+    entry = {
+        "ts": record["time"].timestamp(),
+        "lvl": record["level"].name,
+        "mod": record["name"],
+        "fn": record["function"],
+        "line": record["line"],
+        "msg": record["message"]
+    }
+    if record["extra"]:
+        entry.update(record["extra"])
+    if record["exception"] is not None:
+        entry["exc"] = repr(record["exception"].value)
+    return json.dumps(entry, ensure_ascii=False, default=str, separators=(",", ":"))
+
+class BackgroundJsonSink:
+    """
+    Запись логов JSON-строками в фоновом потоке
+
+    Торговый поток только кладет запись loguru в очередь: сериализация и ввод-вывод
+    выполняются в фоне (enqueue=True у loguru сериализует запись pickle в вызывающем потоке).
+    Файлы журнала ротируются по дням и хранятся retention_days дней.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, log_dir: Optional[str] = None,
+                 retention_days: int = 7, queue_size: int = 100_000):
+        self.stream = stream
+        self.log_dir = log_dir
+        self.retention_days = retention_days
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file: Optional[TextIO] = None
+        self._file_day: Optional[str] = None
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message) -> None:
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            # Логи не должны задерживать торговлю: при переполнении запись теряется
+            self.dropped += 1
+
+    def _open_file(self, day: str) -> TextIO:
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.log_dir, f"trading_bot_{day}.jsonl"), 'a', encoding='utf-8')
+        self._file_day = day
+        cutoff = time.time() - self.retention_days * 86400
+        for path in glob.glob(os.path.join(self.log_dir, "trading_bot_*.jsonl")):
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        return self._file
+
+    def _run(self) -> None:
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                line = _json_record(record) + "\n"
+                if self.stream is not None:
+                    self.stream.write(line)
+                if self.log_dir is not None:
+                    day = datetime.now().strftime("%Y-%m-%d")
+                    target = self._file if day == self._file_day else self._open_file(day)
+                    target.write(line)
+                # Сброс буферов, когда очередь опустела
+                if self._queue.empty():
+                    if self.stream is not None:
+                        self.stream.flush()
+                    if self._file is not None:
+                        self._file.flush()
+            except Exception as e:
+                sys.stderr.write(f"Ошибка записи лога: {e}\n")
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Ожидание записи всех поставленных в очередь записей"""
+        self._queue.join()
+
+    def stop(self) -> None:
+        """Запись оставшихся записей и остановка потока (вызывается loguru при logger.remove())"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# atexit-обработчик регистрируется один раз, сколько бы раз ни вызывалась setup_logger
+_atexit_registered = False
+
+def setup_logger(mode: str = "development", stream=sys.stdout, log_dir: Optional[str] = "logs",
+                 module_levels: Optional[Dict[str, str]] = None,
+                 sample_rates: Optional[Dict[str, float]] = None):
+    """
+    Настройка логгера
+
+    Args:
+        mode: 'development' - текстовый вывод в консоль (INFO) и файл (DEBUG) в вызывающем потоке;
+            'production' - JSON-записи, запись в фоновом потоке (BackgroundJsonSink), уровни по модулям
+        stream: Поток для консольного вывода (None - без консоли)
+        log_dir: Каталог файлов журнала (None - без файла)
+        module_levels: Уровни по модулям для режима production, например {'core.api_client': 'WARNING'}
+            (по умолчанию PRODUCTION_MODULE_LEVELS)
+        sample_rates: Доли сохраняемых записей по событиям, например {'sizing': 0.01}
+    """
+    global _atexit_registered
     logger.remove()  # Удаляем стандартный обработчик
-    
+
+    if mode == "production":
+        levels = dict(PRODUCTION_MODULE_LEVELS)
+        levels.update(module_levels or {})
+        log_filter = LogFilter(levels, sample_rates)
+        # Записи ниже минимального уровня отсекаются loguru до создания записи
+        min_level = min(levels.values(), key=lambda level: logger.level(level).no)
+        # Сериализация и запись выполняются в фоновом потоке, торговый поток только ставит запись в очередь
+        if stream is not None or log_dir is not None:
+            sink = BackgroundJsonSink(stream, log_dir)
+            logger.add(sink, format="{message}", filter=log_filter, level=min_level, catch=False)
+            # Записи из очереди сохраняются и при обычном завершении процесса
+            if not _atexit_registered:
+                atexit.register(logger.remove)
+                _atexit_registered = True
+        return logger
+    if mode != "development":
+        raise ValueError(f"Неизвестный режим логирования: {mode}")
+
     # Добавляем вывод в консоль
-    logger.add(
-        sys.stdout,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level="INFO"
-    )
-    
+    if stream is not None:
+        logger.add(
+            stream,
+            format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+            level="INFO"
+        )
+
     # Добавляем запись в файл
-    logger.add(
-        "logs/trading_bot_{time}.log",
-        rotation="1 day",
-        retention="7 days",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level="DEBUG"
-    )
-    
-    return logger 
\ No newline at end of file
+    if log_dir is not None:
+        logger.add(
+            f"{log_dir}/trading_bot_{{time}}.log",
+            rotation="1 day",
+            retention="7 days",
+            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+            level="DEBUG"
+        )
+
+    return logger
@@ -0,0 +1,71 @@
+from typing import Dict, Any, NamedTuple, Sequence, Tuple
+from loguru import logger
+
+def usdt_to_contracts(usdt_amount: float, price: float, min_qty: float, qty_step: float) -> float:
+    """Перевод суммы в USDT в количество контрактов с учетом минимального размера и шага лота"""
+    contracts = usdt_amount / price
+
+    # Проверяем минимальный размер
+    if contracts < min_qty:
+        logger.warning(f"Количество контрактов ({contracts}) меньше минимального ({min_qty}). Увеличиваем до минимума.")
+        contracts = min_qty
+
+    # Округляем до шага и форматируем число с фиксированным количеством знаков после запятой
+    contracts = round(contracts / qty_step) * qty_step
+    return float(f"{contracts:.3f}")
+
+def take_profit_size(total_position_size: float, tp_quantity_percentage: int, qty_step: float) -> str:
+    """Размер тейк-профита (tpSize) на долю позиции в процентах, округленный до шага лота"""
+    tp_contracts = (total_position_size * tp_quantity_percentage / 100)
+    tp_contracts = round(tp_contracts / qty_step) * qty_step
+    return f"{tp_contracts:.3f}"
+
+class TakeProfitSlice(NamedTuple):
+    """Один тейк-профит лестницы"""
+    name: str                    # tp1, tp2, tp3
+    trigger_price: float
+    percentage: int              # Доля позиции в процентах
+    size: str                    # tpSize для set_trading_stop
+
+class OrderPlan(NamedTuple):
+    """
+    Неизменяемый план ордера сигнала: все размеры рассчитаны один раз по одной цене
+
+    План передается в размещение ордера и тейк-профитов как есть, поэтому основной ордер
+    и лестница тейк-профитов всегда согласованы между собой.
+    """
+    symbol: str
+    side: str                    # Buy или Sell
+    order_link_id: str
+    price: float                 # Цена, по которой рассчитан размер
+    position_usdt: float         # Размер позиции в USDT
+    contracts: float
+    stop_loss: float
+    take_profits: Tuple[TakeProfitSlice, ...]
+    balance_version: int         # Версия снимка счета, по которому рассчитан размер
+
+    @property
+    def contracts_str(self) -> str:
+        return f"{self.contracts:.3f}"
+
+def build_order_plan(symbol: str, side: str, price: float, available_balance: float, spec: Dict[str, Any],
+                     stop_loss: float, ladder: Sequence[Tuple[str, float, int]], risk_fraction: float = 0.01,
+                     order_link_id: str = "", balance_version: int = 0) -> OrderPlan:
+    """
+    Расчет плана ордера без обращений к бирже
+
+    Args:
+        price: Текущая цена инструмента
+        available_balance: Доступный баланс, USDT
+        spec: Спецификация инструмента (min_qty, qty_step) из InstrumentCache
+        ladder: Тейк-профиты (имя, цена срабатывания, доля позиции в процентах)
+        risk_fraction: Доля баланса на позицию
+    """
+    position_usdt = available_balance * risk_fraction
+    contracts = usdt_to_contracts(position_usdt, price, spec['min_qty'], spec['qty_step'])
+    take_profits = tuple(
+        TakeProfitSlice(name, trigger_price, percentage, take_profit_size(contracts, percentage, spec['qty_step']))
+        for name, trigger_price, percentage in ladder
+    )
+    return OrderPlan(symbol, side.capitalize(), order_link_id, price, position_usdt, contracts,
+                     stop_loss, take_profits, balance_version)
@@ -0,0 +1,419 @@
+import collections
+import threading
+import time
+from typing import Dict, Any, Callable, List, NamedTuple, Optional
+from loguru import logger
+from core.private_stream import private_ws_url, connect_private
+
+# Статусы, после которых ордер больше не меняется
+FINAL_STATUSES = frozenset({'Filled', 'Cancelled', 'Rejected', 'Deactivated', 'PartiallyFilledCanceled'})
+
+# Типы условных ордеров тейк-профита и стоп-лосса
+PROTECTION_ORDER_TYPES = frozenset({'TakeProfit', 'PartialTakeProfit', 'StopLoss', 'PartialStopLoss', 'TrailingStop'})
+
+class OrderRecord(NamedTuple):
+    """Последнее известное состояние ордера"""
+    key: str                     # orderLinkId, а для ордеров биржи без него (TP/SL позиции) - orderId
+    order_id: str
+    order_link_id: str
+    symbol: str
+    side: str
+    order_type: str
+    stop_order_type: str         # TakeProfit, StopLoss и т.п.; пусто для обычных ордеров
+    qty: float
+    price: float
+    trigger_price: float
+    cum_exec_qty: float
+    avg_price: float
+    status: str
+    updated_time: int            # Время биржи в миллисекундах
+
+class PositionRecord(NamedTuple):
+    """Последнее известное состояние позиции"""
+    symbol: str
+    side: str
+    size: float
+    entry_price: float
+    unrealised_pnl: float
+    updated_time: int
+
+def is_protection(order: OrderRecord) -> bool:
+    """Ордер является тейк-профитом или стоп-лоссом позиции"""
+    return order.stop_order_type in PROTECTION_ORDER_TYPES
+
+def _float(value) -> float:
+    return float(value) if value not in (None, "") else 0.0
+
+def parse_order(item: Dict[str, Any]) -> OrderRecord:
+    """Ордер из потока order или ответа get_open_orders"""
+    return OrderRecord(
+        key=item.get('orderLinkId') or item['orderId'],
+        order_id=item['orderId'],
+        order_link_id=item.get('orderLinkId', ""),
+        symbol=item['symbol'],
+        side=item.get('side', ""),
+        order_type=item.get('orderType', ""),
+        stop_order_type=item.get('stopOrderType', ""),
+        qty=_float(item.get('qty')),
+        price=_float(item.get('price')),
+        trigger_price=_float(item.get('triggerPrice')),
+        cum_exec_qty=_float(item.get('cumExecQty')),
+        avg_price=_float(item.get('avgPrice')),
+        status=item.get('orderStatus', ""),
+        updated_time=int(item.get('updatedTime') or 0)
+    )
+
+def parse_position(item: Dict[str, Any]) -> PositionRecord:
+    """Позиция из потока position или ответа get_positions"""
+    return PositionRecord(
+        symbol=item['symbol'],
+        side=item.get('side', ""),
+        size=_float(item.get('size')),
+        entry_price=_float(item.get('entryPrice') or item.get('avgPrice')),
+        unrealised_pnl=_float(item.get('unrealisedPnl')),
+        updated_time=int(item.get('updatedTime') or 0)
+    )
+
+class BybitPrivateSource:
+    """Потоки order, execution и position из приватного WebSocket Bybit"""
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False, demo: bool = False,
+                 check_interval: float = 1.0):
+        """
+        Args:
+            api_key: API ключ
+            api_secret: API секрет
+            testnet: Тестовая сеть
+            demo: Демо-счет (ключи от api-demo.bybit.com)
+            check_interval: Период проверки переподключения потока в секундах
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.demo = demo
+        self.endpoint = private_ws_url(testnet, demo)
+        self.check_interval = check_interval
+        self.ws = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def subscribe(self, on_order: Callable, on_execution: Callable, on_position: Callable,
+                  on_connect: Optional[Callable[[], None]] = None) -> None:
+        if self.ws is None:
+            self.ws = connect_private(self.api_key, self.api_secret, self.testnet, self.demo)
+        self.ws.order_stream(callback=on_order)
+        self.ws.execution_stream(callback=on_execution)
+        self.ws.position_stream(callback=on_position)
+        if on_connect is not None and self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(on_connect,),
+                                             name="private-stream-watch", daemon=True)
+            self._watcher.start()
+
+    def _watch(self, on_connect: Callable[[], None]) -> None:
+        """
+        Вызов on_connect после каждого переподключения
+
+        pybit переподключается сам, создавая новое соединение, и заново авторизуется:
+        новое авторизованное соединение означает, что события за время разрыва могли быть пропущены.
+        """
+        ws = self.ws
+        connection = ws.ws if ws is not None else None
+        while not self._stop.wait(self.check_interval):
+            ws = self.ws
+            if ws is None or not ws.auth or ws.ws is connection:
+                continue
+            connection = ws.ws
+            logger.info(f"Приватный WebSocket {self.endpoint} переподключен, сверка состояния")
+            try:
+                on_connect()
+            except Exception as e:
+                logger.error(f"Ошибка сверки после переподключения: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(self.check_interval + 1)
+            self._watcher = None
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+class ReplayPrivateSource:
+    """Источник событий ордеров и позиций для офлайн-тестов"""
+
+    def __init__(self):
+        self.handlers: Dict[str, Callable] = {}
+
+    def subscribe(self, on_order: Callable, on_execution: Callable, on_position: Callable,
+                  on_connect: Optional[Callable[[], None]] = None) -> None:
+        self.handlers = {'order': on_order, 'execution': on_execution, 'position': on_position}
+        if on_connect is not None:
+            self.handlers['connect'] = on_connect
+
+    def push(self, topic: str, data: List[Dict[str, Any]]) -> None:
+        if topic in self.handlers:
+            self.handlers[topic]({'topic': topic, 'creationTime': int(time.time() * 1000), 'data': data})
+
+    def reconnect(self) -> None:
+        if 'connect' in self.handlers:
+            self.handlers['connect']()
+
+    def stop(self) -> None:
+        self.handlers = {}
+
+class OrderState:
+    """
+    Книга ордеров и позиций счета по приватным потокам Bybit
+
+    Ордера хранятся по orderLinkId (ордера биржи без него - по orderId) и обновляются
+    событиями order; исполнения записываются в журнал и передаются подписчикам, поэтому
+    исполнение тейк-профита или стоп-лосса видно сразу, без опроса статуса.
+    При старте и после переподключения состояние сверяется со снимками REST, а
+    исполнения за время разрыва догружаются по времени последнего известного исполнения.
+    """
+
+    def __init__(self, api_client=None, source=None, journal=None, strategy: str = "signals",
+                 seen_executions: int = 10_000):
+        """
+        Args:
+            api_client: BybitClient для сверки через REST (None - только потоки)
+            source: Источник событий (BybitPrivateSource, ReplayPrivateSource или None)
+            journal: JournalWriter для записи исполнений (None - не записывать)
+            strategy: Имя стратегии в записях журнала
+            seen_executions: Сколько последних execId помнить для отсева повторов
+        """
+        self.api_client = api_client
+        self.source = source
+        self.journal = journal
+        self.strategy = strategy
+        self.orders: Dict[str, OrderRecord] = {}
+        self.positions: Dict[str, PositionRecord] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._listeners: List[Callable[[Optional[OrderRecord], Dict[str, Any]], None]] = []
+        self._seen = collections.deque(maxlen=seen_executions)
+        self._seen_ids = set()
+        self._last_exec_time: Optional[int] = None
+        # Открытый объем по инструментам (одна позиция на инструмент): при нуле сделки в журнале закрываются
+        self._open_qty: Dict[str, float] = {}
+        self._metrics = {'orders': 0, 'executions': 0, 'duplicates': 0, 'positions': 0, 'reconciles': 0}
+
+    def start(self) -> None:
+        """Подписка на потоки и начальная сверка с REST"""
+        if self._last_exec_time is None:
+            # Исполнения до запуска уже учтены прошлым сеансом и в журнал не попадают
+            self._last_exec_time = int(time.time() * 1000)
+        if self.source is not None:
+            self.source.subscribe(self.on_order, self.on_execution, self.on_position, on_connect=self.reconcile)
+            logger.info("Подписка на потоки ордеров, исполнений и позиций")
+        self.reconcile()
+
+    def add_listener(self, callback: Callable[[Optional[OrderRecord], Dict[str, Any]], None]) -> None:
+        """Подписка на исполнения: callback(ордер или None, исполнение из потока execution)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Optional[OrderRecord], Dict[str, Any]], None]) -> None:
+        """Отписка от исполнений"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def track(self, order_link_id: str, order_id: str, symbol: str, side: str, qty: float) -> OrderRecord:
+        """Регистрация только что размещенного ордера до первого события из потока"""
+        order = OrderRecord(order_link_id or order_id, order_id, order_link_id, symbol, side, "", "",
+                            float(qty), 0.0, 0.0, 0.0, 0.0, 'Created', 0)
+        with self._changed:
+            # Событие из потока могло прийти раньше ответа REST
+            if order.key not in self.orders:
+                self.orders[order.key] = order
+            return self.orders[order.key]
+
+    def _update_order(self, order: OrderRecord) -> None:
+        current = self.orders.get(order.key)
+        # События могут приходить не по порядку: более старое состояние не затирает новое
+        if current is not None and order.updated_time and order.updated_time < current.updated_time:
+            return
+        self.orders[order.key] = order
+
+    def on_order(self, message: Dict[str, Any]) -> None:
+        """Обработка сообщения потока order"""
+        with self._changed:
+            for item in message.get('data', []):
+                self._update_order(parse_order(item))
+                self._metrics['orders'] += 1
+            self._changed.notify_all()
+
+    def on_position(self, message: Dict[str, Any]) -> None:
+        """Обработка сообщения потока position"""
+        with self._lock:
+            for item in message.get('data', []):
+                position = parse_position(item)
+                if position.size:
+                    self.positions[position.symbol] = position
+                else:
+                    self.positions.pop(position.symbol, None)
+                self._metrics['positions'] += 1
+
+    def on_execution(self, message: Dict[str, Any]) -> None:
+        """Обработка сообщения потока execution"""
+        for fill in message.get('data', []):
+            self._apply_execution(fill)
+
+    def _apply_execution(self, fill: Dict[str, Any]) -> None:
+        if fill.get('execType', 'Trade') != 'Trade':
+            return
+        with self._lock:
+            exec_id = fill['execId']
+            if exec_id in self._seen_ids:
+                self._metrics['duplicates'] += 1
+                return
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_ids.discard(self._seen[0])
+            self._seen.append(exec_id)
+            self._seen_ids.add(exec_id)
+            self._metrics['executions'] += 1
+            exec_time = int(fill.get('execTime') or 0)
+            if exec_time > (self._last_exec_time or 0):
+                self._last_exec_time = exec_time
+            order = self.orders.get(fill.get('orderLinkId') or fill['orderId'])
+
+            stop_order_type = fill.get('stopOrderType') or (order.stop_order_type if order else "")
+            closing = stop_order_type in PROTECTION_ORDER_TYPES or _float(fill.get('closedSize')) > 0
+            flat = self._track_open_qty(fill['symbol'], _float(fill.get('execQty')), closing)
+        logger.info(f"Исполнение {fill['symbol']} {fill.get('side')} {fill.get('execQty')} по {fill.get('execPrice')}"
+                    f"{f' ({stop_order_type})' if stop_order_type else ''}")
+        if self.journal is not None:
+            self.journal.log_trade({
+                'symbol': fill['symbol'],
+                'side': fill.get('side', "").lower(),
+                'amount': _float(fill.get('execQty')),
+                'price': _float(fill.get('execPrice')),
+                'fee': _float(fill.get('execFee')),
+                'strategy': self.strategy,
+                'status': 'closed' if closing else 'open'
+            })
+            if flat:
+                self.journal.close_trades(fill['symbol'])
+        for callback in self._listeners:
+            try:
+                callback(order, fill)
+            except Exception as e:
+                logger.error(f"Ошибка обработчика исполнения: {e}")
+
+    def _track_open_qty(self, symbol: str, qty: float, closing: bool) -> bool:
+        """
+        Учет открытого объема по исполнению (под self._lock)
+
+        Returns:
+            bool: Закрывающее исполнение закрыло позицию полностью
+        """
+        if not closing:
+            self._open_qty[symbol] = self._open_qty.get(symbol, 0.0) + qty
+            return False
+        remaining = self._open_qty.get(symbol, 0.0) - qty
+        if remaining > 1e-9:
+            self._open_qty[symbol] = remaining
+            return False
+        self._open_qty.pop(symbol, None)
+        return True
+
+    def reconcile(self) -> None:
+        """Сверка ордеров, позиций и исполнений со снимками REST"""
+        if self.api_client is None:
+            return
+        try:
+            started = time.perf_counter()
+            # Исполнения за время разрыва догружаются первыми: они же объясняют пропавшие ордера
+            for fill in sorted(self.api_client.get_executions(self._last_exec_time),
+                               key=lambda item: int(item.get('execTime') or 0)):
+                self._apply_execution(fill)
+
+            with self._lock:
+                tracked = dict(self._open_qty)
+            open_orders = [parse_order(item) for item in self.api_client.get_open_orders()]
+            positions = [parse_position(item) for item in self.api_client.get_positions()]
+            with self._changed:
+                active = {order.key for order in open_orders}
+                for order in open_orders:
+                    self._update_order(order)
+                # Ордера, завершившиеся без события (например, во время разрыва соединения)
+                for key, order in list(self.orders.items()):
+                    if key not in active and order.status not in FINAL_STATUSES:
+                        self.orders[key] = self._find_final(order)
+                self.positions = {position.symbol: position for position in positions if position.size}
+                closed = self._sync_open_qty(tracked)
+                self._metrics['reconciles'] += 1
+                self._changed.notify_all()
+            if self.journal is not None:
+                for symbol in closed:
+                    self.journal.close_trades(symbol)
+            logger.info(f"Сверка состояния: {len(open_orders)} активных ордеров, {len(self.positions)} позиций "
+                        f"за {(time.perf_counter() - started) * 1000:.0f} мс")
+        except Exception as e:
+            logger.error(f"Ошибка сверки состояния ордеров: {e}")
+            raise
+
+    def _sync_open_qty(self, tracked: Dict[str, float]) -> List[str]:
+        """
+        Открытый объем по снимку позиций (под self._lock)
+
+        Инструменты, по которым поток прислал исполнения во время запроса снимка (объем
+        изменился относительно tracked), не трогаются: снимок по ним мог устареть.
+
+        Returns:
+            List[str]: Инструменты, позиции по которым закрылись без исполнений в потоке и догрузке
+        """
+        closed = []
+        for symbol in set(tracked) | set(self.positions):
+            if self._open_qty.get(symbol) != tracked.get(symbol):
+                continue
+            position = self.positions.get(symbol)
+            if position is not None:
+                self._open_qty[symbol] = position.size
+            elif self._open_qty.pop(symbol, None) is not None:
+                closed.append(symbol)
+        return closed
+
+    def _find_final(self, order: OrderRecord) -> OrderRecord:
+        """Итоговое состояние ордера, пропавшего из активных"""
+        if order.order_link_id:
+            item = self.api_client.find_order(order.symbol, order.order_link_id)
+            if item is not None:
+                return parse_order(item)
+        # Без истории ордер считаем снятым, исполнения (если были) уже учтены по потоку execution
+        return order._replace(status='Deactivated')
+
+    def get_order(self, key: str) -> Optional[OrderRecord]:
+        return self.orders.get(key)
+
+    def get_position(self, symbol: str) -> Optional[PositionRecord]:
+        return self.positions.get(symbol)
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[OrderRecord]:
+        """Незавершенные ордера (по инструменту или все)"""
+        with self._lock:
+            return [order for order in self.orders.values()
+                    if order.status not in FINAL_STATUSES and (symbol is None or order.symbol == symbol)]
+
+    def wait_for(self, key: str, statuses=FINAL_STATUSES, timeout: float = 10.0) -> Optional[OrderRecord]:
+        """Ожидание перехода ордера в один из статусов; None, если не дождались"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                order = self.orders.get(key)
+                if order is not None and order.status in statuses:
+                    return order
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def stop(self) -> None:
+        if self.source is not None:
+            self.source.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = dict(self._metrics)
+        metrics['tracked_orders'] = len(self.orders)
+        metrics['open_positions'] = len(self.positions)
+        return metrics
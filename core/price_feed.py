@@ -0,0 +1,124 @@
+import time
+from typing import Dict, Any, Callable, Iterable, List, NamedTuple, Optional
+from loguru import logger
+
+class Quote(NamedTuple):
+    """Последняя котировка инструмента"""
+    symbol: str
+    last: float
+    bid: float
+    ask: float
+    exchange_ts: int  # Время биржи в миллисекундах
+    received: float   # time.monotonic() в момент получения
+
+class BybitTickerSource:
+    """Источник тикеров из публичного WebSocket Bybit"""
+
+    def __init__(self, testnet: bool = False, channel_type: str = "linear"):
+        self.testnet = testnet
+        self.channel_type = channel_type
+        self.ws = None
+
+    def subscribe(self, symbols: List[str], callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Подписка на поток tickers.{symbol}"""
+        if self.ws is None:
+            # Импорт здесь, чтобы фейковые источники не требовали websocket-клиента
+            from pybit.unified_trading import WebSocket
+            self.ws = WebSocket(testnet=self.testnet, channel_type=self.channel_type)
+        self.ws.ticker_stream(symbol=symbols, callback=callback)
+
+    def stop(self) -> None:
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+class ReplayTickerSource:
+    """Источник тикеров для офлайн-тестов: воспроизводит заранее записанные сообщения"""
+
+    def __init__(self, messages: Optional[Iterable[Dict[str, Any]]] = None):
+        self.messages = list(messages or [])
+        self.symbols: set = set()
+        self.callback: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def subscribe(self, symbols: List[str], callback: Callable[[Dict[str, Any]], None]) -> None:
+        self.symbols.update(symbols)
+        self.callback = callback
+
+    def push(self, message: Dict[str, Any]) -> None:
+        """Передача одного сообщения подписчику"""
+        if self.callback and message['data']['symbol'] in self.symbols:
+            self.callback(message)
+
+    def replay(self) -> int:
+        """Воспроизведение всех сообщений"""
+        for message in self.messages:
+            self.push(message)
+        return len(self.messages)
+
+    def stop(self) -> None:
+        self.callback = None
+
+class PriceFeed:
+    """Таблица последних цен, обновляемая потоком тикеров"""
+
+    def __init__(self, source=None, max_age: float = 5.0):
+        """
+        Args:
+            source: Источник тикеров (BybitTickerSource, ReplayTickerSource или совместимый)
+            max_age: Максимальный возраст котировки в секундах, после которого она считается устаревшей
+        """
+        self.source = source if source is not None else BybitTickerSource()
+        self.max_age = max_age
+        # Котировки неизменяемы и заменяются целиком, поэтому читатели обходятся без блокировок
+        self._quotes: Dict[str, Quote] = {}
+        self._subscribed: set = set()
+
+    def subscribe(self, symbols: Iterable[str]) -> None:
+        """Подписка на тикеры инструментов"""
+        new_symbols = [symbol for symbol in symbols if symbol not in self._subscribed]
+        if not new_symbols:
+            return
+        self._subscribed.update(new_symbols)
+        self.source.subscribe(new_symbols, self.on_ticker)
+        logger.info(f"Подписка на тикеры: {new_symbols}")
+
+    def is_subscribed(self, symbol: str) -> bool:
+        return symbol in self._subscribed
+
+    def on_ticker(self, message: Dict[str, Any]) -> None:
+        """Обработка сообщения потока tickers"""
+        data = message['data']
+        symbol = data['symbol']
+        previous = self._quotes.get(symbol)
+        # Дельта-сообщения содержат только изменившиеся поля
+        self._quotes[symbol] = Quote(
+            symbol=symbol,
+            last=float(data['lastPrice']) if data.get('lastPrice') else (previous.last if previous else 0.0),
+            bid=float(data['bid1Price']) if data.get('bid1Price') else (previous.bid if previous else 0.0),
+            ask=float(data['ask1Price']) if data.get('ask1Price') else (previous.ask if previous else 0.0),
+            exchange_ts=int(message.get('ts', 0)),
+            received=time.monotonic()
+        )
+
+    def get_quote(self, symbol: str, max_age: Optional[float] = None) -> Optional[Quote]:
+        """Получение котировки, если она не устарела"""
+        quote = self._quotes.get(symbol)
+        if quote is None or not quote.last:
+            return None
+        if time.monotonic() - quote.received > (self.max_age if max_age is None else max_age):
+            return None
+        return quote
+
+    def get_last_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Получение последней цены, если она не устарела"""
+        quote = self.get_quote(symbol, max_age)
+        return quote.last if quote else None
+
+    def snapshot(self) -> Dict[str, Quote]:
+        """Копия таблицы котировок"""
+        return dict(self._quotes)
+
+    def stop(self) -> None:
+        """Остановка источника тикеров"""
+        self.source.stop()
+        self._subscribed.clear()
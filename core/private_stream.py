@@ -0,0 +1,53 @@
+import time
+from loguru import logger
+
+MAINNET_PRIVATE_WSS = "wss://stream.bybit.com/v5/private"
+TESTNET_PRIVATE_WSS = "wss://stream-testnet.bybit.com/v5/private"
+# Демо-счет принимает ключи только на своем адресе, pybit 5.5 этот адрес не знает
+DEMO_PRIVATE_WSS = "wss://stream-demo.bybit.com/v5/private"
+
+def private_ws_url(testnet: bool = False, demo: bool = False) -> str:
+    """Адрес приватного WebSocket для режима счета"""
+    if demo:
+        return DEMO_PRIVATE_WSS
+    return TESTNET_PRIVATE_WSS if testnet else MAINNET_PRIVATE_WSS
+
+def connect_private(api_key: str, api_secret: str, testnet: bool = False, demo: bool = False,
+                    auth_timeout: float = 10.0):
+    """
+    Подключение к приватному WebSocket Bybit с ожиданием авторизации
+
+    Args:
+        api_key: API ключ
+        api_secret: API секрет
+        testnet: Тестовая сеть
+        demo: Демо-счет (ключи от api-demo.bybit.com)
+        auth_timeout: Сколько секунд ждать подтверждения авторизации
+
+    Returns:
+        WebSocket pybit с пройденной авторизацией
+
+    Raises:
+        ConnectionError: Биржа отклонила ключи или не ответила за auth_timeout
+    """
+    # Импорт здесь, чтобы фейковые источники не требовали websocket-клиента
+    from pybit.unified_trading import WebSocket
+    url = private_ws_url(testnet, demo)
+
+    class PrivateWebSocket(WebSocket):
+        # pybit собирает адрес из поддомена stream/stream-testnet, поэтому адрес задается
+        # при каждом подключении, в том числе при переподключениях
+        def _connect(self, _url):
+            super()._connect(url)
+
+    ws = PrivateWebSocket(testnet=testnet, channel_type="private", api_key=api_key, api_secret=api_secret)
+    deadline = time.monotonic() + auth_timeout
+    # При отказе pybit закрывает соединение в своем потоке, и флаг auth остается False
+    while not ws.auth and not ws.exited and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if not ws.auth:
+        ws.exit()
+        logger.error(f"Ошибка авторизации приватного WebSocket {url}")
+        raise ConnectionError(f"Приватный WebSocket {url} не авторизован, проверьте ключи и режим счета")
+    logger.info(f"Приватный WebSocket {url} авторизован")
+    return ws
@@ -0,0 +1,281 @@
+"""
+Клиентское ограничение частоты запросов к Bybit
+
+Лимиты Bybit считаются по группам эндпоинтов, поэтому у каждой группы свое ведро токенов,
+а общее ведро ограничивает суммарную частоту запросов с IP. Скорость ведер подстраивается
+по заголовкам ответа X-Bapi-Limit, X-Bapi-Limit-Status и X-Bapi-Limit-Reset-Timestamp.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Any, Mapping, Optional
+from loguru import logger
+
+class TokenBucket:
+    """Потокобезопасное ведро токенов: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now < self.updated:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Попытка взять токены без ожидания
+
+        Returns:
+            float: 0, если токены выданы, иначе время в секундах до их появления
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Ожидание и получение токенов
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        waited = 0.0
+        while True:
+            delay = self.try_acquire(tokens)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Время в секундах до появления токенов (без их получения)"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            return 0.0 if self.tokens >= tokens else (tokens - self.tokens) / self.rate
+
+    def configure(self, rate: float) -> None:
+        """Смена скорости пополнения (и емкости) ведра"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = rate
+            self.tokens = min(self.tokens, self.capacity)
+
+    def sync(self, remaining: float, reset_in: float = 0.0) -> None:
+        """
+        Подстройка под остаток лимита, сообщенный биржей
+
+        Args:
+            remaining: Сколько запросов осталось в текущем окне
+            reset_in: Через сколько секунд окно сбросится (учитывается, если остаток исчерпан)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset_in > 0:
+                self._block(reset_in, now)
+
+    def block(self, seconds: float) -> None:
+        """Запрет выдачи токенов на seconds секунд; после паузы ведро начинает наполняться с нуля"""
+        with self._lock:
+            self._block(seconds, time.monotonic())
+
+    def _block(self, seconds: float, now: float) -> None:
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.updated = self.blocked_until
+
+# Приоритеты запросов: меньше - важнее
+PRIORITY_TRADE = 0
+PRIORITY_INFO = 1
+
+# Группы эндпоинтов: (запросов в секунду, приоритет). Значения по умолчанию консервативные,
+# точные лимиты аккаунта приходят в заголовке X-Bapi-Limit
+ENDPOINT_GROUPS = {
+    'order': (10.0, PRIORITY_TRADE),      # place_order, amend_order, cancel_order
+    'position': (10.0, PRIORITY_TRADE),   # set_trading_stop
+    'account': (10.0, PRIORITY_INFO),     # get_wallet_balance
+    'market': (20.0, PRIORITY_INFO)       # get_kline, get_instruments_info, get_tickers
+}
+
+# Общий лимит Bybit на IP: 600 запросов за 5 секунд
+IP_RATE = 120.0
+
+# Код ответа Bybit при превышении лимита
+RATE_LIMIT_CODE = 10006
+
+class RequestScheduler:
+    """
+    Выдача разрешений на запросы по группам эндпоинтов с приоритетом торговых запросов
+
+    Пока ждет хотя бы один запрос с более высоким приоритетом, запросы с низким
+    приоритетом не получают токены, даже если в их группе лимит не исчерпан.
+    """
+
+    def __init__(self, groups: Optional[Mapping[str, tuple]] = None, ip_rate: float = IP_RATE):
+        """
+        Args:
+            groups: {группа: (запросов в секунду, приоритет)}, по умолчанию ENDPOINT_GROUPS
+            ip_rate: Общий лимит запросов в секунду
+        """
+        groups = ENDPOINT_GROUPS if groups is None else groups
+        self.buckets = {name: TokenBucket(rate) for name, (rate, _) in groups.items()}
+        self.priorities = {name: priority for name, (_, priority) in groups.items()}
+        self.ip_bucket = TokenBucket(ip_rate)
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._metrics = {name: {'calls': 0, 'waited': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0,
+                                'queue_depth': 0, 'rate_limited': 0}
+                         for name in groups}
+
+    def acquire(self, group: str, priority: Optional[int] = None) -> float:
+        """
+        Ожидание разрешения на запрос группы
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        bucket = self.buckets[group]
+        priority = self.priorities[group] if priority is None else priority
+        started = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            self._enqueue(group, entry)
+            try:
+                while True:
+                    delay = self._try_take(bucket, priority)
+                    if not delay:
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._dequeue(group, entry, started)
+        return time.monotonic() - started
+
+    async def acquire_async(self, group: str, priority: Optional[int] = None) -> float:
+        """
+        Ожидание разрешения на запрос из цикла событий asyncio
+
+        Очередь и ведра общие с acquire, поэтому синхронный и асинхронный клиенты делят
+        лимиты и приоритеты; ожидание не блокирует цикл событий.
+
+        Returns:
+            float: Время ожидания в секундах
+        """
+        bucket = self.buckets[group]
+        priority = self.priorities[group] if priority is None else priority
+        started = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            self._enqueue(group, entry)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(bucket, priority)
+                if not delay:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            with self._cond:
+                self._dequeue(group, entry, started)
+        return time.monotonic() - started
+
+    def _try_take(self, bucket: TokenBucket, priority: int) -> float:
+        """Выдача токена группы и общего ведра (под self._cond): 0 или время до следующей проверки"""
+        # Очередь за запросами с более высоким приоритетом
+        if self._waiting[0][0] < priority:
+            return 0.05
+        delay = max(bucket.wait_time(), self.ip_bucket.wait_time())
+        if not delay:
+            bucket.try_acquire()
+            self.ip_bucket.try_acquire()
+        return delay
+
+    def _enqueue(self, group: str, entry: tuple) -> None:
+        heapq.heappush(self._waiting, entry)
+        self._metrics[group]['queue_depth'] += 1
+
+    def _dequeue(self, group: str, entry: tuple, started: float) -> None:
+        self._waiting.remove(entry)
+        heapq.heapify(self._waiting)
+        metrics = self._metrics[group]
+        metrics['queue_depth'] -= 1
+        self._cond.notify_all()
+
+        waited = time.monotonic() - started
+        metrics['calls'] += 1
+        if waited > 0.001:
+            metrics['waited'] += 1
+        metrics['wait_total_ms'] += waited * 1000
+        metrics['wait_max_ms'] = max(metrics['wait_max_ms'], waited * 1000)
+
+    def update_from_headers(self, group: str, headers: Optional[Mapping[str, Any]]) -> None:
+        """Подстройка ведра группы по заголовкам лимитов из ответа Bybit"""
+        if not headers:
+            return
+        bucket = self.buckets[group]
+        limit = headers.get('X-Bapi-Limit')
+        status = headers.get('X-Bapi-Limit-Status')
+        reset = headers.get('X-Bapi-Limit-Reset-Timestamp')
+        try:
+            if limit is not None and float(limit) > 0 and float(limit) != bucket.rate:
+                bucket.configure(float(limit))
+                logger.info(f"Лимит группы {group} по данным биржи: {limit} запросов/с")
+            if status is not None:
+                reset_in = max(int(reset) / 1000 - time.time(), 0.0) if reset is not None else 1.0
+                bucket.sync(float(status), reset_in)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Не удалось разобрать заголовки лимитов {group}: {e}")
+
+    def on_rate_limited(self, group: str, headers: Optional[Mapping[str, Any]] = None) -> float:
+        """
+        Реакция на ответ 10006: запрет запросов группы до сброса окна лимита
+
+        Returns:
+            float: Длительность паузы в секундах
+        """
+        self._metrics[group]['rate_limited'] += 1
+        pause = 1.0
+        reset = (headers or {}).get('X-Bapi-Limit-Reset-Timestamp')
+        if reset is not None:
+            try:
+                pause = max(int(reset) / 1000 - time.time(), 0.0) or pause
+            except (TypeError, ValueError):
+                pass
+        self.buckets[group].block(pause)
+        logger.warning(f"Превышен лимит запросов группы {group}, пауза {pause:.3f} с")
+        return pause
+
+    def queue_depth(self, group: Optional[str] = None) -> int:
+        """Количество ожидающих запросов (всего или в группе)"""
+        if group is not None:
+            return self._metrics[group]['queue_depth']
+        return len(self._waiting)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Метрики по группам: вызовы, ожидания, глубина очереди, текущий лимит"""
+        result = {}
+        for name, metrics in self._metrics.items():
+            result[name] = dict(metrics)
+            result[name]['rate'] = self.buckets[name].rate
+            result[name]['wait_avg_ms'] = metrics['wait_total_ms'] / metrics['calls'] if metrics['calls'] else 0.0
+        return result
@@ -0,0 +1,62 @@
+"""
+Политика повторов запросов к Bybit
+
+Повторяются только запросы, которые биржа гарантированно не исполнила (коды из
+RETRYABLE_CODES), и запросы с неизвестным исходом (таймаут, обрыв соединения, ответ не 200).
+Перед повтором запроса с неизвестным исходом вызывающий код проверяет на бирже, не был ли
+он уже исполнен, чтобы повтор не открыл позицию дважды.
+"""
+import random
+import time
+from typing import Optional
+
+# Коды Bybit, при которых запрос не был исполнен и его можно повторить
+RETRYABLE_CODES = {
+    10000,  # Таймаут на стороне сервера
+    10002,  # Время запроса вне recv_window
+    10016,  # Внутренняя ошибка / перезапуск сервиса
+    10429   # Системная защита от частых запросов
+}
+
+# Ордер с таким orderLinkId уже существует: предыдущая попытка дошла до биржи
+DUPLICATE_ORDER_LINK_ID_CODE = 110072
+
+class RetryPolicy:
+    """Ограниченные повторы с экспоненциальной задержкой и случайным разбросом"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0,
+                 deadline: float = 10.0):
+        """
+        Args:
+            max_attempts: Максимальное количество попыток, включая первую
+            base_delay: Базовая задержка перед повтором, сек
+            max_delay: Верхняя граница задержки, сек
+            deadline: Общее время на все попытки запроса, сек
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Задержка перед попыткой номер attempt (1 - первый повтор): full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def start(self) -> float:
+        """Момент (time.monotonic), после которого новые попытки не начинаются"""
+        return time.monotonic() + self.deadline
+
+    def next_delay(self, attempt: int, deadline_at: float) -> Optional[float]:
+        """
+        Задержка перед следующей попыткой
+
+        Returns:
+            Optional[float]: Задержка в секундах или None, если попытки или время исчерпаны
+        """
+        if attempt >= self.max_attempts:
+            return None
+        remaining = deadline_at - time.monotonic()
+        delay = self.backoff(attempt)
+        if delay >= remaining:
+            return None
+        return delay
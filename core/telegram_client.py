@@ -1,10 +1,13 @@
 from telethon import TelegramClient, events
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, List, Set
 from loguru import logger
 import asyncio
 import os
 
 class TelegramBot:
+    # Сколько id, полученных с разрывом после непрерывно обработанного, хранится на канал
+    MAX_PENDING_IDS = 1000
+
     def __init__(self, api_id: str, api_hash: str, phone: str):
         self.api_id = api_id
         self.api_hash = api_hash
@@ -14,6 +17,14 @@ class TelegramBot:
         # Включаем режим userbot
         self.client = TelegramClient(session_name, api_id, api_hash, device_model="Trading Bot", system_version="1.0")
         self.message_handler: Optional[Callable] = None
+        # Обработчик с указанием канала: handler(channel_username, message)
+        self.channel_message_handler: Optional[Callable] = None
+        # Последний id по каждому каналу, до которого все сообщения обработаны без пропусков
+        self.last_message_ids: Dict[str, int] = {}
+        # Обработанные id выше last_message_ids (пришли раньше пропущенных)
+        self.pending_message_ids: Dict[str, Set[int]] = {}
+        # Выставляется в stop(): мониторинг завершается, а не переподключается
+        self.stopping = False
         
     async def start(self):
         """Запуск бота"""
@@ -37,6 +48,7 @@ class TelegramBot:
         
     async def stop(self):
         """Остановка бота"""
+        self.stopping = True
         await self.client.disconnect()
         logger.info("Telegram бот остановлен")
         
@@ -44,6 +56,10 @@ class TelegramBot:
         """Установка обработчика сообщений"""
         self.message_handler = handler
         
+    def set_channel_message_handler(self, handler: Callable):
+        """Установка обработчика сообщений, получающего имя канала и объект сообщения"""
+        self.channel_message_handler = handler
+        
     async def monitor_channel(self, channel_username: str, interval: int = 5):
         """
         Мониторинг канала
@@ -52,20 +68,23 @@ class TelegramBot:
             channel_username: Имя канала (например, 'channel_name')
             interval: Интервал проверки в секундах
         """
-        if not self.message_handler:
+        if not self.message_handler and not self.channel_message_handler:
             raise ValueError("Обработчик сообщений не установлен")
             
         logger.info(f"Начинаем мониторинг канала {channel_username}")
         
-        while True:
+        while not self.stopping:
             try:
                 # Получаем последние сообщения
                 messages = await self.client.get_messages(channel_username, limit=1)
                 
                 if messages:
                     latest_message = messages[0]
-                    # Передаем сообщение в обработчик
-                    await self.message_handler(latest_message.text)
+                    # Передаем сообщение в обработчик (повторы одного сообщения отсекает обработчик)
+                    if self.channel_message_handler:
+                        await self.channel_message_handler(channel_username, latest_message)
+                    else:
+                        await self.message_handler(latest_message.text)
                     
                 await asyncio.sleep(interval)
                 
@@ -73,7 +92,158 @@ class TelegramBot:
                 logger.error(f"Ошибка при мониторинге канала: {e}")
                 await asyncio.sleep(interval)
                 
-    async def run(self, channel_username: str, interval: int = 5):
-        """Запуск бота с мониторингом канала"""
+    async def monitor_channel_events(self, channel_username: str, queue_size: int = 100, reconnect_delay: int = 5):
+        """
+        Мониторинг канала по событиям NewMessage
+        
+        Args:
+            channel_username: Имя канала (например, 'channel_name')
+            queue_size: Максимальный размер очереди необработанных сообщений
+            reconnect_delay: Пауза перед повторной попыткой подключения в секундах
+        """
+        await self.monitor_channels_events([channel_username], queue_size, reconnect_delay)
+        
+    async def monitor_channels_events(self, channel_usernames: List[str], queue_size: int = 100, reconnect_delay: int = 5,
+                                      catch_up_interval: float = 30.0):
+        """
+        Мониторинг нескольких каналов по событиям NewMessage через одно подключение
+        
+        Новые сообщения попадают в ограниченную очередь и передаются обработчику по порядку.
+        Пропущенные сообщения догружаются по min_id после переподключения и периодически:
+        Telethon переподключается и сам, не сообщая об этом, и события за время разрыва теряются.
+        Мониторинг завершается после stop().
+        
+        Args:
+            channel_usernames: Имена каналов
+            queue_size: Максимальный размер очереди необработанных сообщений
+            reconnect_delay: Пауза перед повторной попыткой подключения в секундах
+            catch_up_interval: Период догрузки пропущенных сообщений в секундах
+        """
+        if not self.message_handler and not self.channel_message_handler:
+            raise ValueError("Обработчик сообщений не установлен")
+            
+        logger.info(f"Начинаем мониторинг каналов {channel_usernames} по событиям")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        entities = {}
+        handlers = []
+        
+        for channel_username in channel_usernames:
+            entity = await self.client.get_entity(channel_username)
+            entities[channel_username] = entity
+            
+            # Начинаем с последнего сообщения канала, историю не обрабатываем
+            if channel_username not in self.last_message_ids:
+                latest = await self.client.get_messages(entity, limit=1)
+                self.last_message_ids[channel_username] = latest[0].id if latest else 0
+            
+            async def on_new_message(event, channel_username=channel_username):
+                await self._enqueue_message(channel_username, event.message, queue)
+                
+            self.client.add_event_handler(on_new_message, events.NewMessage(chats=entity))
+            handlers.append(on_new_message)
+            
+        consumer = asyncio.create_task(self._consume_messages(queue))
+        poller = asyncio.create_task(self._poll_catch_up(entities, queue, catch_up_interval))
+        
+        try:
+            while not self.stopping:
+                await self.client.run_until_disconnected()
+                if self.stopping:
+                    break
+                logger.warning(f"Соединение с Telegram потеряно, переподключаемся через {reconnect_delay} с")
+                await asyncio.sleep(reconnect_delay)
+                try:
+                    await self.client.connect()
+                    for channel_username, entity in entities.items():
+                        await self._catch_up(channel_username, entity, queue)
+                except Exception as e:
+                    logger.error(f"Ошибка при переподключении к Telegram: {e}")
+        finally:
+            for handler in handlers:
+                self.client.remove_event_handler(handler)
+            poller.cancel()
+            consumer.cancel()
+            
+    async def _enqueue_message(self, channel_username: str, message, queue: asyncio.Queue) -> bool:
+        """
+        Постановка сообщения в очередь с отсечением уже обработанных id
+
+        Returns:
+            bool: Сообщение поставлено в очередь (не повтор)
+        """
+        pending = self.pending_message_ids.setdefault(channel_username, set())
+        if message.id <= self.last_message_ids.get(channel_username, 0) or message.id in pending:
+            return False
+        pending.add(message.id)
+        self._advance_watermark(channel_username, self.last_message_ids.get(channel_username, 0))
+        if len(pending) > self.MAX_PENDING_IDS:
+            # Разрыв не закрылся догрузкой: пропускаем его, чтобы не копить id без ограничения
+            skipped_to = min(pending)
+            logger.warning(f"Сообщения {channel_username} до {skipped_to} не догружены, разрыв пропущен")
+            self._advance_watermark(channel_username, skipped_to)
+        # При заполненной очереди ожидаем обработчик, а не теряем сообщения
+        await queue.put((channel_username, message))
+        return True
+
+    def _advance_watermark(self, channel_username: str, watermark: int) -> None:
+        """Сдвиг непрерывно обработанного id до watermark и далее по полученным подряд id"""
+        pending = self.pending_message_ids.setdefault(channel_username, set())
+        watermark = max(watermark, self.last_message_ids.get(channel_username, 0))
+        pending.difference_update([message_id for message_id in pending if message_id <= watermark])
+        while watermark + 1 in pending:
+            watermark += 1
+            pending.remove(watermark)
+        self.last_message_ids[channel_username] = watermark
+
+    async def _catch_up(self, channel_username: str, entity, queue: asyncio.Queue):
+        """Догрузка сообщений после непрерывно обработанного id (пропущенных за время отключения)"""
+        min_id = self.last_message_ids.get(channel_username, 0)
+        count = 0
+        newest = min_id
+        async for message in self.client.iter_messages(entity, min_id=min_id, reverse=True):
+            if await self._enqueue_message(channel_username, message, queue):
+                count += 1
+            newest = max(newest, message.id)
+        # История до newest получена целиком: отсутствующие в ней id удалены из канала
+        self._advance_watermark(channel_username, newest)
+        if count:
+            logger.info(f"Догружено {count} пропущенных сообщений из {channel_username}")
+
+    async def _poll_catch_up(self, entities: Dict[str, object], queue: asyncio.Queue, interval: float):
+        """Периодическая догрузка сообщений, пропущенных при внутренних переподключениях Telethon"""
+        while not self.stopping:
+            await asyncio.sleep(interval)
+            for channel_username, entity in entities.items():
+                try:
+                    await self._catch_up(channel_username, entity, queue)
+                except Exception as e:
+                    logger.warning(f"Не удалось догрузить сообщения {channel_username}: {e}")
+            
+    async def _consume_messages(self, queue: asyncio.Queue):
+        """Передача сообщений из очереди в обработчик"""
+        while True:
+            channel_username, message = await queue.get()
+            try:
+                if self.channel_message_handler:
+                    await self.channel_message_handler(channel_username, message)
+                else:
+                    await self.message_handler(message.text)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке сообщения {message.id} из {channel_username}: {e}")
+            finally:
+                queue.task_done()
+                
+    async def run(self, channel_username: str, interval: int = 5, mode: str = "events"):
+        """
+        Запуск бота с мониторингом канала
+        
+        Args:
+            channel_username: Имя канала
+            interval: Интервал проверки в секундах (только для режима polling)
+            mode: 'events' - получение сообщений по событиям, 'polling' - периодический опрос
+        """
         await self.start()
-        await self.monitor_channel(channel_username, interval) 
\ No newline at end of file
+        if mode == "polling":
+            await self.monitor_channel(channel_username, interval)
+        else:
+            await self.monitor_channel_events(channel_username) 
\ No newline at end of file
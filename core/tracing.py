@@ -0,0 +1,208 @@
+"""
+Трассировка задержек от сообщения Telegram до подтверждения биржи
+
+Каждое сообщение канала получает trace id, который через contextvars доступен всем
+этапам обработки (парсинг, проверка входа, исполнение, запросы к Bybit). Этапы
+записываются спанами с временем time.monotonic_ns(); длительности собираются в
+гистограммы по этапам с p50/p99, которые можно сохранить в файл или отдать по HTTP.
+"""
+import collections
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, NamedTuple, Optional
+from loguru import logger
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('trace_id', default=None)
+
+class Span(NamedTuple):
+    """Завершенный этап обработки"""
+    trace_id: Optional[str]
+    name: str
+    start_ns: int                # time.monotonic_ns() начала
+    end_ns: int
+    attrs: Dict[str, Any]
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+class StageHistogram:
+    """Распределение длительностей одного этапа по последним window значениям"""
+
+    def __init__(self, window: int = 10_000):
+        self.values = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = float('-inf')
+
+    def add(self, value_ms: float) -> None:
+        self.values.append(value_ms)
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def summary(self) -> Dict[str, float]:
+        values = sorted(self.values)
+        if not values:
+            return {'count': 0}
+        last = len(values) - 1
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count,
+            'p50_ms': values[int(round(0.5 * last))],
+            'p99_ms': values[int(round(0.99 * last))],
+            'max_ms': self.max
+        }
+
+class Tracer:
+    """Сборщик спанов и гистограмм этапов"""
+
+    def __init__(self, window: int = 10_000, keep_spans: int = 2_000):
+        """
+        Args:
+            window: Сколько последних значений каждого этапа учитывать в перцентилях
+            keep_spans: Сколько последних спанов хранить для выгрузки
+        """
+        self.window = window
+        self.spans = collections.deque(maxlen=keep_spans)
+        self.stages: Dict[str, StageHistogram] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._prefix = f"{int(time.time()):x}"
+        self._server: Optional['ThreadingHTTPServer'] = None
+
+    def new_trace_id(self) -> str:
+        return f"{self._prefix}-{next(self._ids):06x}"
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return _current_trace.get()
+
+    def record(self, name: str, value_ms: float) -> None:
+        """Добавление значения этапа, измеренного снаружи (например, задержки доставки Telegram)"""
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = StageHistogram(self.window)
+            stage.add(value_ms)
+
+    def _finish(self, span: Span) -> None:
+        self.spans.append(span)
+        self.record(span.name, span.duration_ms)
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, **attrs) -> Iterator[str]:
+        """Корневой спан обработки одного сообщения; внутри него спаны получают его trace id"""
+        trace_id = trace_id or self.new_trace_id()
+        token = _current_trace.set(trace_id)
+        start_ns = time.monotonic_ns()
+        try:
+            yield trace_id
+        finally:
+            self._finish(Span(trace_id, name, start_ns, time.monotonic_ns(), attrs))
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """Спан этапа текущей трассы; в словарь атрибутов можно дописывать результаты этапа"""
+        start_ns = time.monotonic_ns()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs['error'] = type(e).__name__
+            raise
+        finally:
+            self._finish(Span(_current_trace.get(), name, start_ns, time.monotonic_ns(), attrs))
+
+    def observe_server_time(self, server_ms: int, sent_ms: float, received_ms: float) -> None:
+        """
+        Сравнение времени биржи с локальным
+
+        Смещение считается относительно середины запроса (sent_ms и received_ms - time.time() * 1000):
+        положительное значение - часы биржи впереди локальных.
+        """
+        if server_ms:
+            self.record('clock.server_offset', server_ms - (sent_ms + received_ms) / 2)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p99, среднее и максимум по каждому этапу"""
+        with self._lock:
+            stages = list(self.stages.items())
+        return {name: stage.summary() for name, stage in sorted(stages)}
+
+    def recent(self, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Последние спаны (все или одной трассы)"""
+        return [
+            {'trace_id': span.trace_id, 'name': span.name, 'start_ns': span.start_ns,
+             'duration_ms': span.duration_ms, **span.attrs}
+            for span in list(self.spans) if trace_id is None or span.trace_id == trace_id
+        ]
+
+    def dump(self, path: str) -> None:
+        """Сохранение гистограмм этапов и последних спанов в JSON"""
+        # Каталог logs/ не хранится в репозитории и может еще не существовать
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.summary(), 'spans': self.recent()}, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"Статистика задержек сохранена в {path}")
+
+    def serve(self, port: int = 9108, host: str = "127.0.0.1") -> int:
+        """
+        Локальный HTTP-эндпоинт: GET /metrics - гистограммы этапов, GET /traces - последние спаны
+
+        Returns:
+            int: Порт сервера (при port=0 выбирается свободный)
+        """
+        # HTTP-сервер нужен только при включенном эндпоинте метрик
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = tracer.summary()
+                elif self.path == "/traces":
+                    body = tracer.recent()
+                else:
+                    self.send_error(404)
+                    return
+                payload = json.dumps(body, ensure_ascii=False, default=str).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="tracing-http", daemon=True).start()
+        port = self._server.server_address[1]
+        logger.info(f"Метрики задержек доступны на http://{host}:{port}/metrics")
+        return port
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans.clear()
+            self.stages.clear()
+
+# Трассировщик процесса
+tracer = Tracer()
@@ -1,16 +1,35 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
+import numpy as np
 from loguru import logger
+from sqlalchemy import select, update
 from db.models import Trade, BalanceSnapshot, Session
+from db.journal import JournalWriter
+from db.queries import TradeQueries
 from core.api_client import BybitClient
 
 class TradeManager:
-    def __init__(self, api_client: BybitClient):
+    def __init__(self, api_client: BybitClient, journal: Optional[JournalWriter] = None):
+        """
+        Args:
+            api_client: Клиент Bybit
+            journal: Фоновый журнал; если указан, сделки и снимки баланса записываются
+                через него без commit в вызывающем потоке
+        """
         self.api_client = api_client
         self.session = Session()
+        self.journal = journal
+        # Отчеты по истории сделок (агрегация в SQL)
+        self.queries = TradeQueries()
     
     def log_trade(self, trade_data: Dict[str, Any]) -> None:
         """Логирование сделки в БД"""
+        if self.journal is not None:
+            self.journal.log_trade(trade_data)
+            # Поля подставляются в сообщение, только если уровень DEBUG включен
+            logger.debug("Сделка поставлена в журнал {symbol} {side} {amount}", event="trade_queued",
+                         symbol=trade_data['symbol'], side=trade_data['side'], amount=trade_data['amount'])
+            return
         try:
             trade = Trade(
                 symbol=trade_data['symbol'],
@@ -23,7 +42,8 @@ class TradeManager:
             )
             self.session.add(trade)
             self.session.commit()
-            logger.info(f"Сделка залогирована: {trade_data}")
+            logger.info("Сделка залогирована {symbol} {side} {amount}", event="trade_logged",
+                        symbol=trade_data['symbol'], side=trade_data['side'], amount=trade_data['amount'])
         except Exception as e:
             self.session.rollback()
             logger.error(f"Ошибка логирования сделки: {e}")
@@ -34,13 +54,18 @@ class TradeManager:
         try:
             balance_data = self.api_client.get_balance()
             
-            snapshot = BalanceSnapshot(
-                balance=float(balance_data['totalWalletBalance']),
-                equity=float(balance_data['totalEquity']),
-                margin=float(balance_data['totalInitialMargin']),
-                free_margin=float(balance_data['availableToWithdraw'])
-            )
+            values = {
+                'balance': float(balance_data['totalWalletBalance']),
+                'equity': float(balance_data['totalEquity']),
+                'margin': float(balance_data['totalInitialMargin']),
+                'free_margin': float(balance_data['availableToWithdraw'])
+            }
+            if self.journal is not None:
+                self.journal.log_balance_snapshot(values)
+                logger.info("Снимок баланса поставлен в журнал")
+                return
             
+            snapshot = BalanceSnapshot(**values)
             self.session.add(snapshot)
             self.session.commit()
             logger.info("Снимок баланса создан")
@@ -52,16 +77,12 @@ class TradeManager:
     def calculate_pnl(self, trade_id: int) -> float:
         """Расчет PnL для сделки"""
         try:
-            trade = self.session.query(Trade).get(trade_id)
+            trade = self.session.get(Trade, trade_id)
             if not trade:
                 raise ValueError(f"Сделка {trade_id} не найдена")
             
             # Получаем текущую цену
-            current_price = float(self.api_client.get_klines(
-                symbol=trade.symbol,
-                interval="1",
-                limit=1
-            )['result']['list'][0][4])
+            current_price = self.api_client.get_last_price(trade.symbol)
             
             # Рассчитываем PnL
             if trade.side == 'buy':
@@ -79,10 +100,76 @@ class TradeManager:
             logger.error(f"Ошибка расчета PnL: {e}")
             raise
     
+    def revalue_open_trades(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Переоценка всех открытых сделок по текущим ценам
+        
+        Открытые сделки загружаются одним запросом, цена запрашивается один раз на инструмент,
+        PnL считается векторно и записывается одной транзакцией.
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: Экспозиция по инструментам
+            {
+                symbol: {
+                    'trades': int,
+                    'net_amount': float,  # Покупки со знаком плюс, продажи - минус
+                    'notional': float,    # Сумма |amount| * текущая цена
+                    'price': float,
+                    'pnl': float
+                }
+            }
+        """
+        try:
+            rows = self.session.execute(
+                select(Trade.id, Trade.symbol, Trade.side, Trade.amount, Trade.price).where(Trade.status == 'open')
+            ).all()
+            if not rows:
+                return {}
+            
+            ids = np.array([row.id for row in rows], dtype=np.int64)
+            symbols = np.array([row.symbol for row in rows])
+            direction = np.array([1.0 if (row.side or '').lower() == 'buy' else -1.0 for row in rows])
+            amount = np.array([row.amount or 0.0 for row in rows], dtype=np.float64)
+            entry = np.array([row.price or 0.0 for row in rows], dtype=np.float64)
+            
+            unique_symbols, symbol_index = np.unique(symbols, return_inverse=True)
+            prices = self.api_client.get_last_prices(list(unique_symbols))
+            symbol_prices = np.array([prices.get(symbol, np.nan) for symbol in unique_symbols])
+            current = symbol_prices[symbol_index]
+            priced = ~np.isnan(current)
+            if not priced.all():
+                logger.warning(f"Нет цены для {sorted(set(unique_symbols[np.isnan(symbol_prices)]))}, сделки не переоценены")
+            
+            pnl = (current - entry) * amount * direction
+            self.session.execute(
+                update(Trade),
+                [{'id': int(trade_id), 'pnl': float(value)} for trade_id, value in zip(ids[priced], pnl[priced])]
+            )
+            self.session.commit()
+            
+            exposure = {}
+            for i, symbol in enumerate(unique_symbols):
+                mask = (symbol_index == i) & priced
+                if not mask.any():
+                    continue
+                exposure[str(symbol)] = {
+                    'trades': int(mask.sum()),
+                    'net_amount': float((amount[mask] * direction[mask]).sum()),
+                    'notional': float((np.abs(amount[mask]) * current[mask]).sum()),
+                    'price': float(symbol_prices[i]),
+                    'pnl': float(pnl[mask].sum())
+                }
+            logger.info(f"Переоценено {int(priced.sum())} открытых сделок по {len(exposure)} инструментам")
+            return exposure
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"Ошибка переоценки открытых сделок: {e}")
+            raise
+    
     def close_position(self, trade_id: int) -> None:
         """Закрытие позиции"""
         try:
-            trade = self.session.query(Trade).get(trade_id)
+            trade = self.session.get(Trade, trade_id)
             if not trade:
                 raise ValueError(f"Сделка {trade_id} не найдена")
             
@@ -0,0 +1,158 @@
+import itertools
+import time
+from typing import Dict, Any, Callable, Iterable, List, NamedTuple, Optional
+from loguru import logger
+from core.private_stream import private_ws_url, connect_private
+
+class WalletSnapshot(NamedTuple):
+    """Состояние счета на момент получения"""
+    version: int                 # Порядковый номер снимка
+    available_balance: float     # totalAvailableBalance, USDT
+    equity: float                # totalEquity, USDT
+    source: str                  # 'rest' или 'stream'
+    exchange_ts: int             # Время биржи в миллисекундах (0, если неизвестно)
+    received: float              # time.monotonic() в момент получения
+
+class BybitWalletSource:
+    """Источник обновлений счета из приватного WebSocket Bybit (топик wallet)"""
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False, demo: bool = False):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.demo = demo
+        self.endpoint = private_ws_url(testnet, demo)
+        self.ws = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        if self.ws is None:
+            self.ws = connect_private(self.api_key, self.api_secret, self.testnet, self.demo)
+        self.ws.wallet_stream(callback=callback)
+
+    def stop(self) -> None:
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+class ReplayWalletSource:
+    """Источник обновлений счета для офлайн-тестов"""
+
+    def __init__(self, messages: Optional[Iterable[Dict[str, Any]]] = None):
+        self.messages = list(messages or [])
+        self.callback: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        self.callback = callback
+
+    def push(self, message: Dict[str, Any]) -> None:
+        if self.callback:
+            self.callback(message)
+
+    def replay(self) -> int:
+        for message in self.messages:
+            self.push(message)
+        return len(self.messages)
+
+    def stop(self) -> None:
+        self.callback = None
+
+class WalletState:
+    """
+    Кэш состояния счета для расчета размера позиции без запроса к REST
+
+    Снимок заполняется ответом get_wallet_balance при старте и обновляется потоком wallet.
+    После собственных сделок снимок помечается недействительным до следующего обновления
+    из потока или REST. Устаревший или недействительный снимок get() не возвращает.
+    """
+
+    def __init__(self, source=None, max_age: float = 60.0, account_type: str = "UNIFIED"):
+        """
+        Args:
+            source: Источник обновлений (BybitWalletSource, ReplayWalletSource или None - только REST)
+            max_age: Максимальный возраст снимка в секундах
+            account_type: Тип счета Bybit
+        """
+        self.source = source
+        self.max_age = max_age
+        self.account_type = account_type
+        # Снимки неизменяемы и заменяются целиком, поэтому читатели обходятся без блокировок
+        self._snapshot: Optional[WalletSnapshot] = None
+        self._invalidated_at = 0.0
+        self._versions = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+
+    def start(self) -> None:
+        """Подписка на поток обновлений счета"""
+        if self.source is not None:
+            self.source.subscribe(self.on_wallet)
+            logger.info("Подписка на обновления счета")
+
+    def _account(self, accounts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        for account in accounts:
+            if account.get('accountType', self.account_type) == self.account_type:
+                return account
+        return None
+
+    def _store(self, account: Dict[str, Any], source: str, exchange_ts: int) -> WalletSnapshot:
+        snapshot = WalletSnapshot(
+            version=next(self._versions),
+            available_balance=float(account.get('totalAvailableBalance') or 0),
+            equity=float(account.get('totalEquity') or 0),
+            source=source,
+            exchange_ts=exchange_ts,
+            received=time.monotonic()
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def update_from_rest(self, response: Dict[str, Any]) -> WalletSnapshot:
+        """Обновление снимка ответом get_wallet_balance"""
+        account = self._account(response['result']['list'])
+        if account is None:
+            raise ValueError(f"В ответе get_wallet_balance нет счета {self.account_type}")
+        return self._store(account, 'rest', int(response.get('time', 0)))
+
+    def on_wallet(self, message: Dict[str, Any]) -> None:
+        """Обработка сообщения потока wallet"""
+        account = self._account(message.get('data', []))
+        if account is not None:
+            self._store(account, 'stream', int(message.get('creationTime', 0)))
+
+    def invalidate(self) -> None:
+        """Пометка снимка недействительным (например, после исполнения собственного ордера)"""
+        self._invalidated_at = time.monotonic()
+
+    def get(self, max_age: Optional[float] = None) -> Optional[WalletSnapshot]:
+        """Снимок счета, если он свежий и получен после последней пометки недействительным"""
+        snapshot = self._snapshot
+        if (snapshot is None or snapshot.received <= self._invalidated_at
+                or time.monotonic() - snapshot.received > (self.max_age if max_age is None else max_age)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return snapshot
+
+    def stop(self) -> None:
+        if self.source is not None:
+            self.source.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'version': snapshot.version if snapshot else None,
+            'source': snapshot.source if snapshot else None,
+            'age': time.monotonic() - snapshot.received if snapshot else None
+        }
+
+def describe_snapshot(snapshot: WalletSnapshot) -> Dict[str, Any]:
+    """Сведения о снимке для записи вместе с решением о размере позиции"""
+    return {
+        'version': snapshot.version,
+        'source': snapshot.source,
+        'available_balance': snapshot.available_balance,
+        'exchange_ts': snapshot.exchange_ts,
+        'age_ms': (time.monotonic() - snapshot.received) * 1000
+    }
@@ -0,0 +1,217 @@
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+# Формат записи свечи на диске: плоский бинарный файл фиксированных записей, читается через memmap
+CANDLE_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('turnover', '<f8')
+])
+
+# Длительность интервалов Bybit в миллисекундах
+INTERVAL_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000, '720': 43_200_000,
+    'D': 86_400_000, 'W': 604_800_000
+}
+
+# Смещение начала свечи от кратного интервалу времени: недельные свечи Bybit открываются
+# в понедельник 00:00 UTC, а 1970-01-01 - четверг (первый понедельник - 1970-01-05)
+INTERVAL_OFFSET_MS = {'W': 4 * 86_400_000}
+
+# Таймфреймы стратегий в обозначениях Bybit
+TIMEFRAME_ALIASES = {
+    '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
+    '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720', '1d': 'D', '1w': 'W'
+}
+
+# Максимальный размер страницы запроса get_kline
+PAGE_LIMIT = 1000
+
+def normalize_interval(interval: str) -> str:
+    """Приведение таймфрейма ('1h', '60') к интервалу Bybit"""
+    interval = TIMEFRAME_ALIASES.get(interval, interval)
+    if interval in ('M', '1M'):
+        # У месячных свечей нет постоянной длительности, шаг по INTERVAL_MS к ним неприменим
+        raise ValueError("Месячный интервал не поддерживается")
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Неподдерживаемый интервал: {interval}")
+    return interval
+
+def bar_open(ts: int, interval: str) -> int:
+    """Время открытия свечи интервала, в которую попадает ts (мс)"""
+    interval = normalize_interval(interval)
+    step = INTERVAL_MS[interval]
+    offset = INTERVAL_OFFSET_MS.get(interval, 0)
+    return (ts - offset) // step * step + offset
+
+class CandleStore:
+    """Локальное хранилище свечей по (инструмент, интервал) с инкрементальной синхронизацией"""
+
+    def __init__(self, api_client=None, root: str = 'data/candles'):
+        """
+        Args:
+            api_client: Клиент Bybit с методом get_klines (нужен только для синхронизации)
+            root: Каталог файлов хранилища
+        """
+        self.api_client = api_client
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # Открытые memmap по ключу вместе с размером файла на момент открытия
+        self._maps: Dict[Tuple[str, str], Tuple[int, np.ndarray]] = {}
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"{symbol}_{interval}.bin")
+
+    def load(self, symbol: str, interval: str) -> np.ndarray:
+        """Все свечи инструмента (memmap только для чтения)"""
+        interval = normalize_interval(interval)
+        path = self._path(symbol, interval)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            return np.zeros(0, dtype=CANDLE_DTYPE)
+        cached = self._maps.get((symbol, interval))
+        if cached is not None and cached[0] == size:
+            return cached[1]
+        candles = np.memmap(path, dtype=CANDLE_DTYPE, mode='r')
+        self._maps[(symbol, interval)] = (size, candles)
+        return candles
+
+    def get_range(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Свечи с ts в [start, end] без копирования данных"""
+        candles = self.load(symbol, interval)
+        ts = candles['ts']
+        left = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        right = len(candles) if end is None else int(np.searchsorted(ts, end, side='right'))
+        return candles[left:right]
+
+    def get_ohlc(self, symbol: str, interval: str, start: Optional[int] = None,
+                 end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Колонки свечей в формате backtest.backtest_signals (представления без копирования)"""
+        candles = self.get_range(symbol, interval, start, end)
+        return {name: candles[name] for name in ('ts', 'open', 'high', 'low', 'close', 'volume')}
+
+    def last_ts(self, symbol: str, interval: str) -> Optional[int]:
+        candles = self.load(symbol, interval)
+        return int(candles['ts'][-1]) if len(candles) else None
+
+    def append(self, symbol: str, interval: str, rows: np.ndarray) -> int:
+        """Дозапись свечей новее последней сохраненной"""
+        interval = normalize_interval(interval)
+        last = self.last_ts(symbol, interval)
+        if last is not None:
+            rows = rows[rows['ts'] > last]
+        if not len(rows):
+            return 0
+        with open(self._path(symbol, interval), 'ab') as f:
+            f.write(np.ascontiguousarray(rows, dtype=CANDLE_DTYPE).tobytes())
+        return len(rows)
+
+    def _rewrite(self, symbol: str, interval: str, rows: np.ndarray) -> None:
+        """Атомарная перезапись файла (нужна при дозагрузке в начало или середину истории)"""
+        path = self._path(symbol, interval)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(rows, dtype=CANDLE_DTYPE).tobytes())
+        self._maps.pop((symbol, interval), None)
+        os.replace(tmp_path, path)
+
+    def _merge(self, symbol: str, interval: str, rows: np.ndarray) -> int:
+        """Слияние свечей с сохраненными с сортировкой и удалением дублей"""
+        existing = np.array(self.load(symbol, interval))
+        merged = np.concatenate([existing, rows])
+        _, unique_index = np.unique(merged['ts'], return_index=True)
+        merged = merged[unique_index]
+        self._rewrite(symbol, interval, merged)
+        return len(merged) - len(existing)
+
+    def fetch(self, symbol: str, interval: str, start: int, end: int) -> np.ndarray:
+        """Постраничная загрузка закрытых свечей в диапазоне [start, end]"""
+        interval = normalize_interval(interval)
+        pages: List[np.ndarray] = []
+        cursor_end = end
+        while cursor_end >= start:
+            response = self.api_client.get_klines(symbol=symbol, interval=interval, limit=PAGE_LIMIT,
+                                                  start=start, end=cursor_end)
+            items = response['result']['list']
+            if not items:
+                break
+            page = np.array([tuple(float(value) if i else int(value) for i, value in enumerate(item[:7]))
+                             for item in items], dtype=CANDLE_DTYPE)
+            pages.append(page)
+            oldest = int(page['ts'].min())
+            if len(items) < PAGE_LIMIT or oldest <= start:
+                break
+            # Bybit отдает свечи от новых к старым, следующая страница заканчивается перед самой старой
+            cursor_end = oldest - 1
+
+        if not pages:
+            return np.zeros(0, dtype=CANDLE_DTYPE)
+        rows = np.concatenate(pages)
+        _, unique_index = np.unique(rows['ts'], return_index=True)
+        rows = rows[unique_index]
+        return rows[(rows['ts'] >= start) & (rows['ts'] <= end)]
+
+    def sync(self, symbol: str, interval: str, start: Optional[int] = None, now: Optional[int] = None) -> int:
+        """
+        Синхронизация с биржей: дозагрузка новых свечей и истории до start
+
+        Args:
+            start: Начало требуемой истории, мс. Для пустого хранилища обязателен
+            now: Текущее время, мс (по умолчанию - системное)
+
+        Returns:
+            int: Количество добавленных свечей
+        """
+        interval = normalize_interval(interval)
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000) if now is None else now
+        # Последняя закрытая свеча открылась не позже чем за интервал до текущего момента
+        last_closed = bar_open(now, interval) - step
+        candles = self.load(symbol, interval)
+        added = 0
+
+        if not len(candles):
+            if start is None:
+                raise ValueError(f"Для первой синхронизации {symbol} {interval} нужно указать start")
+            added = self.append(symbol, interval, self.fetch(symbol, interval, start, last_closed))
+        else:
+            first, last = int(candles['ts'][0]), int(candles['ts'][-1])
+            if last < last_closed:
+                added += self.append(symbol, interval, self.fetch(symbol, interval, last + step, last_closed))
+            if start is not None and start < first:
+                added += self._merge(symbol, interval, self.fetch(symbol, interval, start, first - step))
+
+        if added:
+            logger.info(f"Свечи {symbol} {interval}: добавлено {added}")
+        return added
+
+    def find_gaps(self, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        """Пропуски в сохраненной истории: список диапазонов (start, end) отсутствующих свечей"""
+        interval = normalize_interval(interval)
+        step = INTERVAL_MS[interval]
+        ts = self.load(symbol, interval)['ts']
+        if len(ts) < 2:
+            return []
+        breaks = np.flatnonzero(np.diff(ts) > step)
+        return [(int(ts[i]) + step, int(ts[i + 1]) - step) for i in breaks]
+
+    def fill_gaps(self, symbol: str, interval: str) -> int:
+        """Дозагрузка пропусков внутри сохраненной истории"""
+        pages = [self.fetch(symbol, interval, gap_start, gap_end) for gap_start, gap_end in self.find_gaps(symbol, interval)]
+        pages = [page for page in pages if len(page)]
+        if not pages:
+            return 0
+        return self._merge(symbol, normalize_interval(interval), np.concatenate(pages))
+
+    def to_backtest_candles(self, symbols: List[str], interval: str = '1', start: Optional[int] = None,
+                            end: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Свечи нескольких инструментов в формате backtest.backtest_signals"""
+        return {symbol: self.get_ohlc(symbol, interval, start, end) for symbol in symbols}
@@ -0,0 +1,212 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import sessionmaker
+from db.models import Trade, BalanceSnapshot, engine as default_engine
+
+# Таблицы журнала по виду записи
+JOURNAL_TABLES = {
+    'trade': Trade,
+    'balance': BalanceSnapshot
+}
+
+# Вид записи, закрывающий открытые сделки инструмента (UPDATE вместо вставки)
+CLOSE_TRADES = 'close_trades'
+
+# Сколько раз повторять запись пачки при ошибке базы данных
+COMMIT_ATTEMPTS = 3
+
+_STOP = object()
+
+def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+def enable_wal(engine) -> None:
+    """
+    Перевод SQLite в режим WAL для всех соединений движка
+
+    В WAL запись не блокирует читателей, а synchronous=NORMAL убирает fsync на каждую
+    транзакцию (fsync выполняется при контрольных точках).
+    """
+    if engine.dialect.name != 'sqlite' or event.contains(engine, "connect", _set_sqlite_pragma):
+        return
+    event.listen(engine, "connect", _set_sqlite_pragma)
+    # Соединения, открытые до подписки, пересоздаются уже с нужными настройками
+    engine.dispose()
+
+class JournalWriter:
+    """Фоновая запись журнала сделок и снимков баланса пачками в одной транзакции"""
+
+    def __init__(self, engine=None, batch_size: int = 500, flush_interval: float = 0.05,
+                 queue_size: int = 100_000):
+        """
+        Args:
+            engine: Движок SQLAlchemy (по умолчанию - db.models.engine)
+            batch_size: Максимальное количество записей в одной транзакции
+            flush_interval: Сколько ждать накопления пачки после первой записи, сек
+            queue_size: Размер очереди; при переполнении submit ждет освобождения места
+        """
+        self.engine = engine if engine is not None else default_engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._session_factory = sessionmaker(bind=self.engine)
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            'rows': 0, 'batches': 0, 'errors': 0, 'dropped': 0, 'batch_size_max': 0,
+            'latency_total_ms': 0.0, 'latency_max_ms': 0.0, 'commit_total_ms': 0.0
+        }
+
+    def start(self) -> None:
+        """Включение WAL и запуск фонового потока записи"""
+        if self._thread and self._thread.is_alive():
+            return
+        enable_wal(self.engine)
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+        # Записи из очереди сохраняются и при обычном завершении процесса
+        atexit.register(self.stop)
+        logger.info(f"Журнал запущен: пачки до {self.batch_size} записей, интервал {self.flush_interval * 1000:.0f} мс")
+
+    def submit(self, kind: str, row: Dict[str, Any]) -> None:
+        """Постановка записи в очередь (kind - ключ JOURNAL_TABLES или CLOSE_TRADES)"""
+        if kind not in JOURNAL_TABLES and kind != CLOSE_TRADES:
+            raise ValueError(f"Неизвестный вид записи журнала: {kind}")
+        self._queue.put((kind, row, time.perf_counter()))
+
+    def log_trade(self, trade_data: Dict[str, Any]) -> None:
+        """Запись сделки в формате TradeManager.log_trade"""
+        self.submit('trade', {
+            'symbol': trade_data['symbol'],
+            'side': trade_data['side'],
+            'amount': trade_data['amount'],
+            'price': trade_data['price'],
+            'fee': trade_data.get('fee', 0.0),
+            'strategy': trade_data.get('strategy', 'unknown'),
+            'status': trade_data.get('status', 'open'),
+            # Время фиксируется при постановке в очередь, а не при записи пачки
+            'timestamp': trade_data.get('timestamp') or datetime.utcnow()
+        })
+
+    def close_trades(self, symbol: str) -> None:
+        """Закрытие открытых сделок инструмента (позиция по нему закрыта полностью)"""
+        self.submit(CLOSE_TRADES, {'symbol': symbol})
+
+    def log_balance_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Запись снимка баланса (balance, equity, margin, free_margin)"""
+        row = dict(snapshot)
+        row.setdefault('timestamp', datetime.utcnow())
+        self.submit('balance', row)
+
+    def _collect(self) -> Tuple[List[Tuple[str, Dict[str, Any], float]], bool]:
+        """Ожидание первой записи и добор пачки в пределах flush_interval"""
+        batch = []
+        item = self._queue.get()
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch: List[Tuple[str, Dict[str, Any], float]]) -> None:
+        """Запись пачки одной транзакцией (executemany по каждой серии записей одного вида)"""
+        # Порядок видов сохраняется: закрытие относится только к сделкам, записанным до него
+        runs: List[Tuple[str, List[Dict[str, Any]]]] = []
+        for kind, row, _ in batch:
+            if runs and runs[-1][0] == kind:
+                runs[-1][1].append(row)
+            else:
+                runs.append((kind, [row]))
+
+        for attempt in range(1, COMMIT_ATTEMPTS + 1):
+            started = time.perf_counter()
+            session = self._session_factory()
+            try:
+                for kind, rows in runs:
+                    if kind == CLOSE_TRADES:
+                        symbols = {row['symbol'] for row in rows}
+                        session.execute(update(Trade)
+                                        .where(Trade.symbol.in_(symbols), Trade.status == 'open')
+                                        .values(status='closed'))
+                    else:
+                        session.execute(insert(JOURNAL_TABLES[kind]), rows)
+                session.commit()
+                break
+            except Exception as e:
+                session.rollback()
+                self._metrics['errors'] += 1
+                if attempt == COMMIT_ATTEMPTS:
+                    # Записи остаются в логе, чтобы их можно было восстановить вручную
+                    self._metrics['dropped'] += len(batch)
+                    logger.error(f"Ошибка записи журнала, потеряно {len(batch)} записей: {e}; {runs}")
+                    return
+                logger.warning(f"Ошибка записи журнала (попытка {attempt}): {e}")
+                time.sleep(0.1 * attempt)
+            finally:
+                session.close()
+
+        finished = time.perf_counter()
+        metrics = self._metrics
+        metrics['rows'] += len(batch)
+        metrics['batches'] += 1
+        metrics['batch_size_max'] = max(metrics['batch_size_max'], len(batch))
+        metrics['commit_total_ms'] += (finished - started) * 1000
+        for _, _, enqueued in batch:
+            latency = (finished - enqueued) * 1000
+            metrics['latency_total_ms'] += latency
+            if latency > metrics['latency_max_ms']:
+                metrics['latency_max_ms'] = latency
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+        # Маркер остановки
+        self._queue.task_done()
+
+    def flush(self) -> None:
+        """Ожидание записи всех поставленных в очередь записей"""
+        self._queue.join()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Запись оставшихся записей и остановка потока"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Журнал не остановился за {timeout} с, в очереди {self._queue.qsize()} записей")
+        else:
+            logger.info(f"Журнал остановлен: {self.stats()}")
+        self._thread = None
+        atexit.unregister(self.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики записи: строки, пачки, размер пачки, задержка от постановки до commit"""
+        metrics = dict(self._metrics)
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['batch_size_avg'] = metrics['rows'] / metrics['batches'] if metrics['batches'] else 0.0
+        metrics['latency_avg_ms'] = metrics['latency_total_ms'] / metrics['rows'] if metrics['rows'] else 0.0
+        metrics['commit_avg_ms'] = metrics['commit_total_ms'] / metrics['batches'] if metrics['batches'] else 0.0
+        return metrics
@@ -0,0 +1,64 @@
+"""
+Миграции схемы базы данных
+
+Версия схемы хранится в PRAGMA user_version (SQLite). Каждая миграция идемпотентна,
+поэтому ее можно безопасно применить к базе, созданной любой предыдущей версией бота.
+
+Запуск:
+    python -m db.migrations [sqlite:///trading_bot.db]
+"""
+import sys
+import time
+from typing import Callable, List
+from loguru import logger
+from sqlalchemy import create_engine, text
+from db.models import Base, Trade, engine as default_engine
+
+def _create_tables(connection) -> None:
+    """Создание отсутствующих таблиц"""
+    Base.metadata.create_all(connection)
+
+def _create_trade_indexes(connection) -> None:
+    """Индексы trades по (symbol, timestamp), (strategy, timestamp) и status"""
+    for index in Trade.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    # Статистика для планировщика запросов SQLite
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text("ANALYZE trades"))
+
+# Миграции по порядку: версия схемы после миграции i равна i + 1
+MIGRATIONS: List[Callable] = [
+    _create_tables,
+    _create_trade_indexes
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_version(connection) -> int:
+    if connection.dialect.name != 'sqlite':
+        return 0
+    return int(connection.execute(text("PRAGMA user_version")).scalar())
+
+def migrate(engine=None) -> int:
+    """
+    Приведение схемы базы к текущей версии
+
+    Returns:
+        int: Количество примененных миграций
+    """
+    engine = engine if engine is not None else default_engine
+    with engine.begin() as connection:
+        version = get_version(connection)
+        pending = MIGRATIONS[version:]
+        for number, migration in enumerate(pending, start=version + 1):
+            started = time.perf_counter()
+            migration(connection)
+            logger.info(f"Миграция {number} ({migration.__doc__}) применена за {time.perf_counter() - started:.2f} с")
+        if pending and connection.dialect.name == 'sqlite':
+            connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+    return len(pending)
+
+if __name__ == "__main__":
+    target = create_engine(sys.argv[1]) if len(sys.argv) > 1 else default_engine
+    applied = migrate(target)
+    print(f"Применено миграций: {applied}, версия схемы: {SCHEMA_VERSION}")
@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
 
 Base = declarative_base()
@@ -18,6 +17,13 @@ class Trade(Base):
     strategy = Column(String)
     pnl = Column(Float, default=0.0)
     status = Column(String, default="open")
+    
+    # Отчеты строятся по инструменту или стратегии за период и по открытым сделкам
+    __table_args__ = (
+        Index('ix_trades_symbol_timestamp', 'symbol', 'timestamp'),
+        Index('ix_trades_strategy_timestamp', 'strategy', 'timestamp'),
+        Index('ix_trades_status', 'status'),
+    )
 
 class BalanceSnapshot(Base):
     __tablename__ = "balance_snapshots"
@@ -34,4 +40,6 @@ engine = create_engine('sqlite:///trading_bot.db')
 Session = sessionmaker(bind=engine)
 
 def init_db():
-    Base.metadata.create_all(engine) 
\ No newline at end of file
+    # Импорт здесь: модуль миграций сам импортирует модели
+    from db.migrations import migrate
+    migrate(engine) 
\ No newline at end of file
@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import case, func, select
+from db.models import Trade, Session
+
+class PnlSummary(NamedTuple):
+    """Агрегат сделок по ключу группировки (инструмент, стратегия или день)"""
+    key: str
+    trades: int
+    wins: int
+    pnl: float
+    fees: float
+    volume: float  # Сумма amount * price
+
+class TradeQueries:
+    """
+    Запросы к истории сделок с агрегацией на стороне SQL
+
+    Фильтры по инструменту или стратегии с диапазоном времени используют составные
+    индексы (symbol, timestamp) и (strategy, timestamp), фильтр по статусу - индекс status.
+    """
+
+    def __init__(self, session_factory=Session):
+        self.session_factory = session_factory
+
+    @staticmethod
+    def _filter(statement, symbol: Optional[str] = None, strategy: Optional[str] = None,
+                status: Optional[str] = None, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        if symbol is not None:
+            statement = statement.where(Trade.symbol == symbol)
+        if strategy is not None:
+            statement = statement.where(Trade.strategy == strategy)
+        if status is not None:
+            statement = statement.where(Trade.status == status)
+        if start is not None:
+            statement = statement.where(Trade.timestamp >= start)
+        if end is not None:
+            statement = statement.where(Trade.timestamp < end)
+        return statement
+
+    def trades(self, symbol: Optional[str] = None, strategy: Optional[str] = None, status: Optional[str] = None,
+               start: Optional[datetime] = None, end: Optional[datetime] = None,
+               limit: Optional[int] = None) -> List[Trade]:
+        """Сделки по фильтрам в порядке времени; start включительно, end - нет"""
+        statement = self._filter(select(Trade), symbol, strategy, status, start, end).order_by(Trade.timestamp)
+        if limit is not None:
+            statement = statement.limit(limit)
+        with self.session_factory() as session:
+            return list(session.scalars(statement))
+
+    def _summary(self, key, symbol, strategy, status, start, end) -> List[PnlSummary]:
+        statement = select(
+            key.label('key'),
+            func.count(Trade.id),
+            func.coalesce(func.sum(case((Trade.pnl > 0, 1), else_=0)), 0),
+            func.coalesce(func.sum(Trade.pnl), 0.0),
+            func.coalesce(func.sum(Trade.fee), 0.0),
+            func.coalesce(func.sum(Trade.amount * Trade.price), 0.0)
+        )
+        statement = self._filter(statement, symbol, strategy, status, start, end).group_by(key).order_by(key)
+        with self.session_factory() as session:
+            return [PnlSummary(str(row[0]), int(row[1]), int(row[2]), float(row[3]), float(row[4]), float(row[5]))
+                    for row in session.execute(statement)]
+
+    def pnl_by_symbol(self, strategy: Optional[str] = None, status: Optional[str] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[PnlSummary]:
+        """PnL, количество сделок и объем по инструментам"""
+        return self._summary(Trade.symbol, None, strategy, status, start, end)
+
+    def pnl_by_strategy(self, symbol: Optional[str] = None, status: Optional[str] = None,
+                        start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[PnlSummary]:
+        """PnL, количество сделок и объем по стратегиям"""
+        return self._summary(Trade.strategy, symbol, None, status, start, end)
+
+    def daily_pnl(self, symbol: Optional[str] = None, strategy: Optional[str] = None,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[PnlSummary]:
+        """PnL по дням (ключ - дата в формате YYYY-MM-DD)"""
+        return self._summary(func.date(Trade.timestamp), symbol, strategy, None, start, end)
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Количество сделок по статусам"""
+        statement = select(Trade.status, func.count(Trade.id)).group_by(Trade.status)
+        with self.session_factory() as session:
+            return {status: count for status, count in session.execute(statement)}
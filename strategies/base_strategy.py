@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
 
 class BaseStrategy(ABC):
     def __init__(self, config: Dict[str, Any]):
@@ -27,4 +27,70 @@ class BaseStrategy(ABC):
         """
         Обновляет внутреннее состояние стратегии
         """
-        pass 
\ No newline at end of file
+        pass
+    
+    def warm_up(self, candle_store, limit: Optional[int] = None) -> int:
+        """
+        Прогрев состояния стратегии историей из локального хранилища свечей
+        
+        Args:
+            candle_store: db.candle_store.CandleStore
+            limit: Сколько последних свечей использовать (по умолчанию - все)
+            
+        Returns:
+            int: Количество переданных в update свечей
+        """
+        candles = candle_store.get_range(self.symbol, self.timeframe)
+        if limit is not None:
+            candles = candles[-limit:]
+        for candle in candles:
+            self.update({
+                'timestamp': int(candle['ts']),
+                'open': float(candle['open']),
+                'high': float(candle['high']),
+                'low': float(candle['low']),
+                'close': float(candle['close']),
+                'volume': float(candle['volume'])
+            })
+        return len(candles)
+
+class BatchStrategy(ABC):
+    """
+    Пакетный режим StrategyEngine: одно состояние на все инструменты
+
+    Подмешивается к стратегии вместе с BaseStrategy:
+    class MyStrategy(BatchStrategy, BaseStrategy)
+    """
+    
+    @abstractmethod
+    def init_batch(self, symbols: Sequence[str]) -> None:
+        """
+        Подготовка состояния пакетного режима для набора инструментов
+        
+        Args:
+            symbols: Инструменты; порядок задает индексы во всех массивах update_many
+        """
+        pass
+    
+    @abstractmethod
+    def update_many(self, bars: Dict[str, Any]) -> None:
+        """
+        Обновляет состояние по новой свече всех инструментов
+        
+        Args:
+            bars: Колонки свечей по инструментам (массивы NumPy в порядке init_batch):
+                'ts', 'open', 'high', 'low', 'close', 'volume' и маска 'fresh' -
+                для каких инструментов свеча действительно новая
+        """
+        pass
+    
+    @abstractmethod
+    def generate_signals(self, bars: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Генерирует сигналы по всем инструментам
+        
+        Returns:
+            List[Dict[str, Any]]: Сигналы в формате generate_signal с полем 'symbol',
+            сигналы 'hold' не возвращаются
+        """
+        pass
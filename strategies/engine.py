@@ -0,0 +1,259 @@
+"""
+Пакетный запуск стратегии по множеству инструментов
+
+StrategyEngine хранит последние свечи всех инструментов массивами (struct-of-arrays) и на
+каждом баре передает их стратегии одним вызовом update_many/generate_signals. Свечи
+загружаются KlineFetcher параллельно с ограничением частоты запросов.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Mapping, Optional, Sequence, Union
+import numpy as np
+from loguru import logger
+from core.rate_limiter import TokenBucket
+from db.candle_store import CANDLE_DTYPE, INTERVAL_MS, bar_open, normalize_interval
+from .base_strategy import BaseStrategy, BatchStrategy
+
+BAR_COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+
+# Максимум свечей в одном ответе get_klines: пропуски длиннее догружаются не полностью
+MAX_BACKFILL_BARS = 1000
+
+# После стольких шагов подряд без новой свечи инструмент считается устаревшим и больше не догружается
+MAX_MISSED_STEPS = 3
+
+class KlineFetcher:
+    """Параллельная загрузка свечей по списку инструментов с ограничением частоты запросов"""
+
+    def __init__(self, api_client, max_workers: int = 8, rate: float = 10.0):
+        """
+        Args:
+            api_client: Клиент Bybit с методом get_klines
+            max_workers: Количество одновременных запросов
+            rate: Запросов в секунду
+        """
+        self.api_client = api_client
+        self.limiter = TokenBucket(rate, capacity=max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kline-fetcher")
+
+    def _fetch(self, symbol: str, interval: str, limit: int) -> Optional[np.ndarray]:
+        self.limiter.acquire()
+        try:
+            response = self.api_client.get_klines(symbol=symbol, interval=interval, limit=limit)
+            items = response['result']['list']
+            rows = np.array([tuple(float(value) if i else int(value) for i, value in enumerate(item[:7]))
+                             for item in items], dtype=CANDLE_DTYPE)
+            # Bybit отдает свечи от новых к старым
+            return np.sort(rows, order='ts')
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке свечей {symbol} {interval}: {e}")
+            return None
+
+    def fetch_many(self, symbols: Sequence[str], interval: str,
+                   limit: Union[int, Mapping[str, int]]) -> Dict[str, np.ndarray]:
+        """
+        Последние limit свечей по каждому инструменту
+
+        Args:
+            limit: Количество свечей, общее или по инструментам ({symbol: limit})
+
+        Returns:
+            Dict[str, np.ndarray]: Свечи (CANDLE_DTYPE, по возрастанию ts); инструменты
+            с ошибкой загрузки отсутствуют
+        """
+        interval = normalize_interval(interval)
+        limits = limit if isinstance(limit, Mapping) else dict.fromkeys(symbols, limit)
+        results = self._executor.map(lambda symbol: self._fetch(symbol, interval, limits[symbol]), symbols)
+        return {symbol: rows for symbol, rows in zip(symbols, results) if rows is not None}
+
+    def fetch_closed(self, symbols: Sequence[str], interval: str, now: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Последняя закрытая свеча по каждому инструменту"""
+        step = INTERVAL_MS[normalize_interval(interval)]
+        now = int(time.time() * 1000) if now is None else now
+        closed = {}
+        for symbol, rows in self.fetch_many(symbols, interval, limit=2).items():
+            rows = rows[rows['ts'] + step <= now]
+            if len(rows):
+                closed[symbol] = rows[-1]
+        return closed
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+class StrategyEngine:
+    """Запуск стратегии с пакетным интерфейсом по набору инструментов"""
+
+    def __init__(self, strategy: BatchStrategy, symbols: Sequence[str], api_client=None,
+                 fetcher: Optional[KlineFetcher] = None, candle_store=None):
+        """
+        Args:
+            strategy: Стратегия с пакетным режимом (BatchStrategy); таймфрейм берется из strategy.timeframe
+            symbols: Инструменты
+            api_client: Клиент Bybit (не нужен, если передан fetcher)
+            fetcher: Загрузчик свечей (по умолчанию - KlineFetcher(api_client))
+            candle_store: db.candle_store.CandleStore для прогрева из локальной истории
+        """
+        if not isinstance(strategy, BatchStrategy):
+            raise ValueError(f"{type(strategy).__name__} не поддерживает пакетный режим")
+        self.strategy = strategy
+        self.symbols = list(symbols)
+        self.interval = normalize_interval(strategy.timeframe)
+        self.fetcher = fetcher or KlineFetcher(api_client)
+        self.candle_store = candle_store
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        size = len(self.symbols)
+        # Последняя свеча каждого инструмента; ts = -1 - свечей еще не было
+        self.bars: Dict[str, np.ndarray] = {
+            name: np.full(size, -1, dtype=np.int64) if name == 'ts' else np.full(size, np.nan)
+            for name in BAR_COLUMNS
+        }
+        self.bars['fresh'] = np.zeros(size, dtype=bool)
+        # Шаги подряд, на которых инструмент не получил ожидаемую свечу
+        self._missed = np.zeros(size, dtype=np.int64)
+        self._stop = threading.Event()
+        strategy.init_batch(self.symbols)
+
+    def _apply(self, fresh: np.ndarray, values: Dict[str, np.ndarray]) -> bool:
+        """
+        Запись новых свечей в массивы состояния и обновление стратегии
+
+        Args:
+            fresh: Маска инструментов, для которых пришла свеча
+            values: Колонки BAR_COLUMNS по всем инструментам (учитываются только fresh)
+        """
+        fresh = fresh & (values['ts'] > self.bars['ts'])
+        self.bars['fresh'] = fresh
+        if not fresh.any():
+            return False
+        for name in BAR_COLUMNS:
+            self.bars[name][fresh] = values[name][fresh]
+        self.strategy.update_many(self.bars)
+        return True
+
+    def _columns(self, rows: Dict[str, np.ndarray], timeline: np.ndarray):
+        """Матрицы (бар x инструмент) из свечей по инструментам"""
+        shape = (len(timeline), len(self.symbols))
+        fresh = np.zeros(shape, dtype=bool)
+        values = {name: np.full(shape, -1, dtype=np.int64) if name == 'ts' else np.full(shape, np.nan)
+                  for name in BAR_COLUMNS}
+        for symbol, candles in rows.items():
+            i = self._index[symbol]
+            positions = np.searchsorted(timeline, candles['ts'])
+            fresh[positions, i] = True
+            for name in BAR_COLUMNS:
+                values[name][positions, i] = candles[name]
+        return fresh, values
+
+    def _replay(self, history: Dict[str, np.ndarray]) -> int:
+        """Применение свечей по инструментам на общей шкале времени (без расчета сигналов)"""
+        history = {symbol: rows for symbol, rows in history.items() if len(rows)}
+        if not history:
+            return 0
+        # Общая шкала времени: на каждом баре обновляются только инструменты, у которых есть свеча
+        timeline = np.unique(np.concatenate([rows['ts'] for rows in history.values()]))
+        fresh, values = self._columns(history, timeline)
+        for bar in range(len(timeline)):
+            self._apply(fresh[bar], {name: column[bar] for name, column in values.items()})
+        return len(timeline)
+
+    def _closed(self, history: Dict[str, np.ndarray], now: Optional[int]) -> Dict[str, np.ndarray]:
+        """Только закрытые свечи: последняя свеча с биржи может быть еще не закрыта"""
+        now = int(time.time() * 1000) if now is None else now
+        step = INTERVAL_MS[self.interval]
+        return {symbol: rows[rows['ts'] + step <= now] for symbol, rows in history.items()}
+
+    def warm_up(self, limit: int, now: Optional[int] = None) -> int:
+        """
+        Прогрев стратегии последними limit свечами каждого инструмента
+
+        Свечи берутся из candle_store, если он задан, иначе загружаются с биржи.
+        Как и BaseStrategy.warm_up, прогрев только обновляет состояние без расчета сигналов.
+
+        Returns:
+            int: Количество пройденных баров
+        """
+        if self.candle_store is not None:
+            history = {symbol: np.asarray(self.candle_store.get_range(symbol, self.interval)[-limit:])
+                       for symbol in self.symbols}
+        else:
+            history = self._closed(self.fetcher.fetch_many(self.symbols, self.interval, limit), now)
+        bars = self._replay(history)
+        if bars:
+            logger.info(f"Прогрев {type(self.strategy).__name__}: {len(self.symbols)} инструментов, {bars} баров")
+        return bars
+
+    def step(self, now: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Загрузка закрытых свечей всех инструментов и расчет сигналов
+
+        Если прошлый шаг опоздал или загрузка свечей инструмента не удалась, пропущенные
+        свечи догружаются и применяются по порядку, а сигналы рассчитываются по последнему бару.
+        Глубина догрузки считается по каждому инструменту отдельно; инструмент без новых свечей
+        MAX_MISSED_STEPS шагов подряд запрашивается без догрузки, пока свечи не появятся снова.
+
+        Returns:
+            List[Dict[str, Any]]: Сигналы стратегии; пустой список, если новых свечей нет
+        """
+        now = int(time.time() * 1000) if now is None else now
+        last = self.bars['ts']
+        # Сколько баров прошло с последней свечи инструмента плюс незакрытая
+        gaps = np.where(last >= 0, (now - last) // INTERVAL_MS[self.interval] + 1, 2)
+        limits = np.clip(gaps, 2, MAX_BACKFILL_BARS)
+        # Устаревшие инструменты (делистинг, торги остановлены) запрашиваются без догрузки
+        limits[self._missed >= MAX_MISSED_STEPS] = 2
+        history = self._closed(self.fetcher.fetch_many(self.symbols, self.interval,
+                                                       dict(zip(self.symbols, limits.tolist()))), now)
+        history = {symbol: rows[rows['ts'] > self.bars['ts'][self._index[symbol]]] for symbol, rows in history.items()}
+        latest = {symbol: rows[-1:] for symbol, rows in history.items() if len(rows)}
+        self._track_missed(gaps, latest)
+        if not latest:
+            return []
+        # Пропущенные свечи применяются без расчета сигналов, последняя - отдельным шагом
+        self._replay({symbol: rows[:-1] for symbol, rows in history.items()})
+        fresh = np.zeros(len(self.symbols), dtype=bool)
+        values = {name: column.copy() for name, column in self.bars.items() if name in BAR_COLUMNS}
+        for symbol, rows in latest.items():
+            i = self._index[symbol]
+            fresh[i] = True
+            for name in BAR_COLUMNS:
+                values[name][i] = rows[name][0]
+        if not self._apply(fresh, values):
+            return []
+        return self.strategy.generate_signals(self.bars)
+
+    def _track_missed(self, gaps: np.ndarray, latest: Dict[str, np.ndarray]) -> None:
+        """Учет шагов без новой свечи: закрытая свеча после последней ожидается при разрыве от 3 баров"""
+        received = np.zeros(len(self.symbols), dtype=bool)
+        for symbol in latest:
+            received[self._index[symbol]] = True
+        missed = (self.bars['ts'] >= 0) & (gaps >= 3) & ~received
+        self._missed[received] = 0
+        self._missed[missed] += 1
+        for i in np.flatnonzero(missed & (self._missed == MAX_MISSED_STEPS)):
+            logger.warning(f"Нет новых свечей {self.symbols[i]} {MAX_MISSED_STEPS} шага подряд, догрузка отключена")
+
+    def run(self, on_signal: Callable[[Dict[str, Any]], None], delay: float = 1.0) -> None:
+        """
+        Цикл по закрытию баров до вызова stop()
+
+        Args:
+            on_signal: Обработчик каждого сигнала
+            delay: Задержка после закрытия бара перед запросом свечей, сек
+        """
+        step = INTERVAL_MS[self.interval]
+        logger.info(f"Запуск {type(self.strategy).__name__} по {len(self.symbols)} инструментам, интервал {self.interval}")
+        while not self._stop.is_set():
+            try:
+                for signal in self.step():
+                    on_signal(signal)
+            except Exception as e:
+                logger.error(f"Ошибка в цикле стратегии: {e}")
+            now = int(time.time() * 1000)
+            wait = (bar_open(now, self.interval) + step - now) / 1000 + delay
+            self._stop.wait(wait)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.fetcher.close()
@@ -0,0 +1,235 @@
+"""
+Инкрементальные индикаторы с обновлением за O(1)
+
+Каждый индикатор хранит только фиксированный кольцевой буфер и накопленные суммы,
+поэтому обновление не зависит от периода и не создает новых списков на каждом тике.
+До накопления полного окна value равно None.
+"""
+import math
+from typing import List, Optional
+import numpy as np
+
+class SMA:
+    """Простая скользящая средняя"""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("Период должен быть положительным")
+        self.period = period
+        self._buffer = [0.0] * period
+        self._index = 0
+        self._count = 0
+        self._total = 0.0
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.period
+
+    def update(self, x: float) -> Optional[float]:
+        if self._count >= self.period:
+            self._total -= self._buffer[self._index]
+        else:
+            self._count += 1
+        self._buffer[self._index] = x
+        self._total += x
+        self._index += 1
+        if self._index == self.period:
+            self._index = 0
+            # Раз за оборот буфера пересчитываем сумму, чтобы не накапливать ошибку округления
+            if self._count >= self.period:
+                self._total = math.fsum(self._buffer)
+        if self._count >= self.period:
+            self.value = self._total / self.period
+        return self.value
+
+    def values(self) -> List[float]:
+        """Значения окна в хронологическом порядке"""
+        if self._count < self.period:
+            return self._buffer[:self._count]
+        return self._buffer[self._index:] + self._buffer[:self._index]
+
+class EMA:
+    """Экспоненциальная скользящая средняя, начальное значение - SMA первых period значений"""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("Период должен быть положительным")
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._count = 0
+        self._seed_total = 0.0
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is not None:
+            self.value += self.alpha * (x - self.value)
+            return self.value
+        self._count += 1
+        self._seed_total += x
+        if self._count == self.period:
+            self.value = self._seed_total / self.period
+        return self.value
+
+class RollingStd:
+    """Скользящее стандартное отклонение (скользящий алгоритм Уэлфорда)"""
+
+    def __init__(self, period: int, ddof: int = 0):
+        if period <= ddof:
+            raise ValueError("Период должен быть больше ddof")
+        self.period = period
+        self.ddof = ddof
+        self._buffer = [0.0] * period
+        self._index = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.period
+
+    def update(self, x: float) -> Optional[float]:
+        if self._count < self.period:
+            self._count += 1
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._buffer[self._index]
+            old_mean = self._mean
+            self._mean += (x - old) / self.period
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+        self._buffer[self._index] = x
+        self._index = (self._index + 1) % self.period
+        if self._count >= self.period:
+            self.value = math.sqrt(max(self._m2, 0.0) / (self.period - self.ddof))
+        return self.value
+
+class ATR:
+    """Средний истинный диапазон со сглаживанием Уайлдера"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._seed_total = 0.0
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        if self.value is not None:
+            self.value += (true_range - self.value) / self.period
+            return self.value
+        self._count += 1
+        self._seed_total += true_range
+        if self._count == self.period:
+            self.value = self._seed_total / self.period
+        return self.value
+
+class RSI:
+    """Индекс относительной силы со сглаживанием Уайлдера"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._prev: Optional[float] = None
+        self._count = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self.value: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, x: float) -> Optional[float]:
+        if self._prev is None:
+            self._prev = x
+            return None
+        change = x - self._prev
+        self._prev = x
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        if self._count < self.period:
+            # Первые средние - обычное среднее изменений за период
+            self._count += 1
+            self._avg_gain += gain / self.period
+            self._avg_loss += loss / self.period
+            if self._count < self.period:
+                return None
+        else:
+            self._avg_gain += (gain - self._avg_gain) / self.period
+            self._avg_loss += (loss - self._avg_loss) / self.period
+
+        if self._avg_loss == 0.0:
+            self.value = 100.0 if self._avg_gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._avg_gain / self._avg_loss)
+        return self.value
+
+class BatchSMA:
+    """
+    Простая скользящая средняя сразу для многих инструментов
+
+    Состояние хранится массивами (окно x инструмент), одно обновление - одна векторная
+    операция по всем инструментам. Окно каждого инструмента сдвигается только его
+    собственными значениями. Для инструментов с неполным окном value равно NaN.
+    """
+
+    def __init__(self, size: int, period: int):
+        if period < 1:
+            raise ValueError("Период должен быть положительным")
+        self.size = size
+        self.period = period
+        self._buffer = np.zeros((period, size))
+        self._columns = np.arange(size)
+        self._index = np.zeros(size, dtype=np.int64)
+        self._count = np.zeros(size, dtype=np.int64)
+        self._total = np.zeros(size)
+        self.value = np.full(size, np.nan)
+
+    @property
+    def ready(self) -> np.ndarray:
+        return self._count >= self.period
+
+    def update(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Args:
+            x: Новые значения по инструментам
+            mask: Инструменты, для которых есть новое значение (по умолчанию - все).
+                Окно остальных не меняется
+        """
+        x = np.asarray(x, dtype=np.float64)
+        columns = self._columns if mask is None else np.flatnonzero(mask)
+        if len(columns):
+            index = self._index[columns]
+            values = x[columns]
+            full = self._count[columns] >= self.period
+            self._total[columns] += values - np.where(full, self._buffer[index, columns], 0.0)
+            self._buffer[index, columns] = values
+            self._count[columns] += ~full
+            index += 1
+            wrapped = index == self.period
+            index[wrapped] = 0
+            self._index[columns] = index
+            if wrapped.any():
+                # Раз за оборот окна пересчитываем суммы, чтобы не накапливать ошибку округления
+                wrapped_columns = columns[wrapped]
+                self._total[wrapped_columns] = self._buffer[:, wrapped_columns].sum(axis=0)
+        np.divide(self._total, self.period, out=self.value)
+        self.value[self._count < self.period] = np.nan
+        return self.value
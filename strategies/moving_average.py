@@ -1,29 +1,32 @@
-import pandas as pd
+from typing import Dict, Any, List, Sequence
 import numpy as np
-from typing import Dict, Any
-from .base_strategy import BaseStrategy
+from .base_strategy import BaseStrategy, BatchStrategy
+from .indicators import SMA, BatchSMA
 
-class MovingAverageStrategy(BaseStrategy):
+class MovingAverageStrategy(BatchStrategy, BaseStrategy):
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.sma_period = config.get('sma_period', 20)
         self.position_size = config.get('position_size', 0.001)
-        self.prices = []
+        self.sma = SMA(self.sma_period)
         self.current_position = None
     
+    @property
+    def prices(self) -> List[float]:
+        """История цен в окне SMA"""
+        return self.sma.values()
+    
     def update(self, data: Dict[str, Any]) -> None:
-        """Обновляет историю цен"""
-        self.prices.append(float(data['close']))
-        if len(self.prices) > self.sma_period:
-            self.prices.pop(0)
+        """Обновляет скользящую среднюю"""
+        self.sma.update(float(data['close']))
     
     def generate_signal(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Генерирует сигнал на основе SMA"""
-        if len(self.prices) < self.sma_period:
+        if not self.sma.ready:
             return {'action': 'hold', 'price': float(data['close']), 'amount': 0}
         
         current_price = float(data['close'])
-        sma = np.mean(self.prices)
+        sma = self.sma.value
         
         signal = {
             'price': current_price,
@@ -40,4 +43,37 @@ class MovingAverageStrategy(BaseStrategy):
             signal['action'] = 'hold'
             signal['amount'] = 0
         
-        return signal 
\ No newline at end of file
+        return signal
+    
+    def init_batch(self, symbols: Sequence[str]) -> None:
+        """Состояние SMA и позиций для всех инструментов"""
+        self.symbols = list(symbols)
+        self.batch_sma = BatchSMA(len(self.symbols), self.sma_period)
+        self.long_positions = np.zeros(len(self.symbols), dtype=bool)
+    
+    def update_many(self, bars: Dict[str, Any]) -> None:
+        """Обновляет скользящие средние всех инструментов"""
+        self.batch_sma.update(bars['close'], bars.get('fresh'))
+    
+    def generate_signals(self, bars: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Генерирует сигналы по SMA для всех инструментов"""
+        close = np.asarray(bars['close'], dtype=np.float64)
+        sma = self.batch_sma.value
+        ready = self.batch_sma.ready
+        fresh = bars.get('fresh')
+        if fresh is not None:
+            ready = ready & fresh
+        
+        buy = ready & (close > sma) & ~self.long_positions
+        sell = ready & (close < sma) & self.long_positions
+        self.long_positions = (self.long_positions | buy) & ~sell
+        
+        signals = []
+        for index in np.flatnonzero(buy | sell):
+            signals.append({
+                'symbol': self.symbols[index],
+                'action': 'buy' if buy[index] else 'sell',
+                'price': float(close[index]),
+                'amount': self.position_size
+            })
+        return signals
@@ -1,8 +1,26 @@
 """
 Signals package
+
+Модули подгружаются при первом обращении к имени: импорт парсера не тянет за собой
+клиентов бирж и Telegram.
 """
-from .base_parser import BaseSignalParser
-from .wolfix_parser import WolfixParser
-from .signal_executor import SignalExecutor
+import importlib
+
+_EXPORTS = {
+    'BaseSignalParser': '.base_parser',
+    'WolfixParser': '.wolfix_parser',
+    'SignalExecutor': '.signal_executor',
+    'AsyncSignalExecutor': '.async_signal_executor',
+    'SignalRouter': '.signal_router',
+    'SignalDeduplicator': '.signal_dedup'
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ['BaseSignalParser', 'WolfixParser', 'SignalExecutor'] 
\ No newline at end of file
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from typing import Dict, Any, Optional
+from loguru import logger
+from core.async_api_client import AsyncBybitClient
+from core.order_plan import OrderPlan, TakeProfitSlice, build_order_plan
+from core.order_state import OrderState, OrderRecord, PROTECTION_ORDER_TYPES
+from core.tracing import tracer
+from core.wallet_state import WalletState, WalletSnapshot, describe_snapshot
+from .signal_executor import TAKE_PROFIT_LADDER, RISK_FRACTION, entry_conditions_met, order_link_id, take_profit_stages
+
+class AsyncSignalExecutor:
+    """Исполнитель сигналов на асинхронном клиенте, не блокирующий цикл событий Telethon"""
+
+    def __init__(self, api_client: AsyncBybitClient, wallet: Optional[WalletState] = None,
+                 orders: Optional[OrderState] = None):
+        """
+        Args:
+            api_client: Асинхронный клиент Bybit
+            wallet: Кэш состояния счета; без него баланс запрашивается на каждый сигнал
+            orders: Книга ордеров и позиций; с ней размещенные ордера отслеживаются по потокам
+        """
+        self.api_client = api_client
+        self.wallet = wallet if wallet is not None else WalletState(max_age=0.0)
+        self.orders = orders
+        if orders is not None:
+            orders.add_listener(self.on_fill)
+
+    async def _balance_snapshot(self) -> WalletSnapshot:
+        """Снимок счета из кэша или, если он устарел, из REST"""
+        snapshot = self.wallet.get()
+        if snapshot is None:
+            snapshot = self.wallet.update_from_rest(await self.api_client.get_balance())
+        return snapshot
+
+    async def plan_signal(self, signal: Dict[str, Any], snapshot: WalletSnapshot) -> OrderPlan:
+        """План ордера сигнала по кэшу спецификаций, текущей цене из потока тикеров и снимку счета"""
+        symbol = signal['symbol']
+        return build_order_plan(
+            symbol, signal['side'],
+            price=await self.api_client.get_last_price(symbol),
+            available_balance=snapshot.available_balance,
+            spec=await self.api_client.get_instrument_spec(symbol),
+            stop_loss=signal['sl'],
+            ladder=[(name, signal[name], percentage) for name, percentage in TAKE_PROFIT_LADDER],
+            risk_fraction=RISK_FRACTION,
+            order_link_id=order_link_id(signal),
+            balance_version=snapshot.version
+        )
+
+    def on_fill(self, order: Optional[OrderRecord], fill: Dict[str, Any]) -> None:
+        """Исполнение из потока execution (вызывается из потока WebSocket, а не из цикла событий)"""
+        self.wallet.invalidate()
+        stop_order_type = fill.get('stopOrderType') or (order.stop_order_type if order else "")
+        if stop_order_type in PROTECTION_ORDER_TYPES:
+            logger.info(f"Сработал {stop_order_type} {fill['symbol']}: {fill.get('execQty')} по {fill.get('execPrice')}")
+
+    async def check_entry_conditions(self, signal: Dict[str, Any]) -> bool:
+        """Проверка условий для входа в позицию"""
+        try:
+            with tracer.span('entry_check', symbol=signal['symbol']) as span:
+                current_price = await self.api_client.get_last_price(signal['symbol'])
+                span['met'] = entry_conditions_met(signal, current_price)
+                return span['met']
+        except Exception as e:
+            logger.error(f"Ошибка при проверке условий входа: {e}")
+            return False
+
+    async def execute_signal(self, signal: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполнение торгового сигнала
+
+        Returns:
+            Dict[str, Any]: Результат исполнения в том же формате, что и SignalExecutor.execute_signal
+        """
+        try:
+            started = time.perf_counter()
+            timings: Dict[str, float] = {}
+            symbol = signal['symbol']
+
+            # Берем баланс из кэша состояния счета (при устаревании - через REST)
+            step_started = time.perf_counter()
+            snapshot = await self._balance_snapshot()
+            timings['balance'] = (time.perf_counter() - step_started) * 1000
+
+            # Все размеры рассчитываются один раз по одной цене: план уходит в основной ордер и тейк-профиты
+            step_started = time.perf_counter()
+            plan = await self.plan_signal(signal, snapshot)
+            timings['sizing'] = (time.perf_counter() - step_started) * 1000
+            logger.info("План {side} {contracts} {symbol} по цене {price}: {position_usdt} USDT из {balance} USDT",
+                        event="signal_plan", symbol=symbol, side=plan.side, contracts=plan.contracts, price=plan.price,
+                        position_usdt=plan.position_usdt, balance=snapshot.available_balance,
+                        balance_version=snapshot.version, balance_source=snapshot.source,
+                        stop_loss=plan.stop_loss, take_profits=plan.take_profits, trace_id=tracer.current_trace_id())
+
+            # Размещаем основной ордер (рыночный) только со стоп-лоссом
+            step_started = time.perf_counter()
+            order = await self.api_client.place_order_plan(plan)
+            timings['entry'] = (time.perf_counter() - step_started) * 1000
+            if self.orders is not None:
+                self.orders.track(plan.order_link_id, order.get('orderId', ""), symbol, plan.side, plan.contracts)
+            # Баланс изменился после сделки: следующий сигнал дождется обновления из потока или REST
+            self.wallet.invalidate()
+
+            # Частичные тейк-профиты выставляются одновременно, тейк-профит на всю позицию - после них
+            async def place(tp: TakeProfitSlice) -> Dict[str, Any]:
+                tp_started = time.perf_counter()
+                response = await self.api_client.place_take_profit(
+                    symbol=symbol,
+                    tp_trigger_price=tp.trigger_price,
+                    tp_quantity_percentage=tp.percentage,
+                    total_position_size=plan.contracts,
+                    tp_size=tp.size
+                )
+                timings[tp.name] = (time.perf_counter() - tp_started) * 1000
+                return response
+
+            step_started = time.perf_counter()
+            results = []
+            for stage in take_profit_stages(plan.take_profits):
+                stage_results = await asyncio.gather(*(place(tp) for tp in stage), return_exceptions=True)
+                errors = [result for result in stage_results if isinstance(result, Exception)]
+                if errors:
+                    raise errors[0]
+                results.extend(stage_results)
+            timings['protection'] = (time.perf_counter() - step_started) * 1000
+            timings['total'] = (time.perf_counter() - started) * 1000
+            for name, value in timings.items():
+                tracer.record(f"execute.{name}", value)
+
+            logger.info("Сигнал {symbol} выполнен за {total_ms:.1f} мс", event="signal_done", symbol=symbol,
+                        total_ms=timings['total'], timings=timings, trace_id=tracer.current_trace_id())
+            return {
+                'symbol': symbol,
+                'contracts': plan.contracts,
+                'order': order,
+                'take_profits': results,
+                'timings': timings,
+                'balance_snapshot': describe_snapshot(snapshot),
+                'order_link_id': plan.order_link_id,
+                'plan': plan
+            }
+
+        except Exception as e:
+            logger.error(f"Ошибка выполнения сигнала: {e}")
+            raise
+
+    def close(self) -> None:
+        """Отписка от исполнений при остановке бота"""
+        if self.orders is not None:
+            self.orders.remove_listener(self.on_fill)
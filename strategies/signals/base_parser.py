@@ -1,11 +1,39 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-from core.api_client import BybitClient
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple, Type
+
+if TYPE_CHECKING:
+    # Парсерам клиент нужен только как атрибут: pybit не загружается при импорте парсера
+    from core.api_client import BybitClient
+
+# Реестр реализаций парсеров по имени, заполняется декоратором register_parser
+PARSER_REGISTRY: Dict[str, Type['BaseSignalParser']] = {}
+
+def register_parser(name: str):
+    """Декоратор регистрации класса парсера в PARSER_REGISTRY"""
+    def decorator(cls: Type['BaseSignalParser']) -> Type['BaseSignalParser']:
+        PARSER_REGISTRY[name] = cls
+        return cls
+    return decorator
 
 class BaseSignalParser(ABC):
-    def __init__(self, api_client: BybitClient):
+    def __init__(self, api_client: Optional['BybitClient']):
+        # Клиент не обязателен: для офлайн-парсинга истории достаточно None
         self.api_client = api_client
     
+    def can_handle(self, message: str) -> bool:
+        """Быстрая проверка, может ли сообщение быть сигналом этого парсера"""
+        return True
+    
+    def parse_fields(self, message: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Парсинг с указанием причины отказа
+        
+        Returns:
+            Tuple: (сигнал, None) при успехе или (None, имя_отсутствующего_поля)
+        """
+        signal = self.parse_signal(message)
+        return (signal, None) if signal else (None, 'unknown')
+    
     @abstractmethod
     def parse_signal(self, message: str) -> Optional[Dict[str, Any]]:
         """Парсинг торгового сигнала из сообщения"""
@@ -14,4 +42,4 @@ class BaseSignalParser(ABC):
     @abstractmethod
     def get_parser_name(self) -> str:
         """Возвращает название парсера"""
-        pass 
\ No newline at end of file
+        pass
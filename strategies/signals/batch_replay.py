@@ -0,0 +1,183 @@
+"""
+Офлайн-прогон парсера по выгруженной истории канала
+
+Запуск:
+    python -m strategies.signals.batch_replay history.jsonl signals.npz [--parser Wolfix] [--processes 4]
+
+Поддерживаемые форматы входа:
+    - JSONL: по одному объекту на строку с полями id, date и message (или text)
+    - JSON-выгрузка Telegram Desktop: {"messages": [{"id", "date", "text"}, ...]}
+"""
+import argparse
+import importlib.util
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+from .base_parser import BaseSignalParser, PARSER_REGISTRY
+from . import wolfix_parser  # noqa: F401 - регистрирует WolfixParser в PARSER_REGISTRY
+
+# Причина отказа для сообщений, отсеянных предварительным фильтром парсера
+NOT_A_SIGNAL = 'not_signal'
+
+SIGNAL_COLUMNS = ('symbol', 'side', 'entry_high', 'entry_low', 'tp1', 'tp2', 'tp3', 'sl', 'leverage')
+
+def _message_text(text: Any) -> str:
+    """Текст сообщения; в выгрузке Telegram Desktop он может быть списком фрагментов"""
+    if isinstance(text, list):
+        return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+    return text or ''
+
+def iter_messages(path: str) -> Iterator[Tuple[int, str, str]]:
+    """Потоковое чтение сообщений (id, date, text) из выгрузки канала"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                yield int(item['id']), str(item.get('date', '')), _message_text(item.get('message', item.get('text')))
+        else:
+            for item in json.load(f)['messages']:
+                if item.get('type', 'message') != 'message':
+                    continue
+                yield int(item['id']), str(item.get('date', '')), _message_text(item.get('text'))
+
+def _chunks(messages: Iterator[Tuple[int, str, str]], size: int) -> Iterator[List[Tuple[int, str, str]]]:
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Парсер создается один раз на процесс пула
+_worker_parser: Optional[BaseSignalParser] = None
+
+def _init_worker(parser_name: str) -> None:
+    global _worker_parser
+    # В рабочих процессах не нужны отладочные сообщения парсера
+    logger.remove()
+    _worker_parser = PARSER_REGISTRY[parser_name](None)
+
+def _parse_chunk(chunk: List[Tuple[int, str, str]]) -> List[Tuple[int, str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Парсинг пачки сообщений в рабочем процессе"""
+    results = []
+    for message_id, date, text in chunk:
+        if not _worker_parser.can_handle(text):
+            results.append((message_id, date, None, NOT_A_SIGNAL))
+            continue
+        signal, missing_field = _worker_parser.parse_fields(text)
+        results.append((message_id, date, signal, missing_field))
+    return results
+
+def resolve_output_path(path: str) -> str:
+    """Файл сигналов: .parquet без pyarrow записать нельзя, вместо него пишется .npz"""
+    if path.endswith('.parquet') and importlib.util.find_spec('pyarrow') is None:
+        fallback = f"{os.path.splitext(path)[0]}.npz"
+        logger.warning(f"pyarrow не установлен, сигналы будут записаны в {fallback}")
+        return fallback
+    return path
+
+def write_signals(path: str, rows: List[Tuple[int, str, Dict[str, Any]]]) -> None:
+    """Запись сигналов в колоночный файл (.parquet при наличии pyarrow, иначе .npz)"""
+    columns = {
+        'message_id': np.array([row[0] for row in rows], dtype=np.int64),
+        'date': np.array([row[1] for row in rows], dtype=str),
+    }
+    for name in SIGNAL_COLUMNS:
+        values = [row[2][name] for row in rows]
+        if name in ('symbol', 'side'):
+            columns[name] = np.array(values, dtype=str)
+        elif name == 'leverage':
+            columns[name] = np.array(values, dtype=np.int32)
+        else:
+            columns[name] = np.array(values, dtype=np.float64)
+
+    if path.endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(columns).to_parquet(path, index=False)
+    else:
+        np.savez_compressed(path, **columns)
+
+def replay(input_path: str, output_path: str, parser_name: str = "Wolfix",
+           processes: int = 4, chunk_size: int = 2000) -> Dict[str, Any]:
+    """
+    Прогон парсера по истории канала
+
+    Выгрузка читается потоком: в работе одновременно не больше двух пачек на процесс,
+    поэтому память не растет с размером выгрузки (кроме найденных сигналов).
+
+    Returns:
+        Dict[str, Any]: Отчет: количество сообщений и сигналов, скорость, доля попаданий,
+        причины отказов по полям сигнала и итоговый файл сигналов
+    """
+    if parser_name not in PARSER_REGISTRY:
+        raise ValueError(f"Неизвестный парсер: {parser_name}")
+    # Формат проверяется до парсинга, чтобы не потерять результат долгого прогона
+    output_path = resolve_output_path(output_path)
+
+    started = time.perf_counter()
+    rows = []
+    reasons: Counter = Counter()
+    total = 0
+
+    def collect(results) -> None:
+        nonlocal total
+        for message_id, date, signal, reason in results:
+            total += 1
+            if signal is not None:
+                rows.append((message_id, date, signal))
+            else:
+                reasons[reason] += 1
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(parser_name,)) as pool:
+        # Executor.map отправляет в пул сразу все пачки, поэтому очередь ограничивается вручную;
+        # результаты забираются в порядке отправки, чтобы сигналы шли в порядке сообщений
+        pending = deque()
+        for chunk in _chunks(iter_messages(input_path), chunk_size):
+            if len(pending) >= processes * 2:
+                collect(pending.popleft().result())
+            pending.append(pool.submit(_parse_chunk, chunk))
+        while pending:
+            collect(pending.popleft().result())
+    elapsed = time.perf_counter() - started
+
+    write_signals(output_path, rows)
+
+    candidates = total - reasons[NOT_A_SIGNAL]
+    report = {
+        'messages': total,
+        'signals': len(rows),
+        'candidates': candidates,
+        'elapsed_sec': elapsed,
+        'messages_per_sec': total / elapsed if elapsed else 0.0,
+        'hit_ratio': len(rows) / total if total else 0.0,
+        'candidate_hit_ratio': len(rows) / candidates if candidates else 0.0,
+        'failures': {reason: count for reason, count in reasons.items() if reason != NOT_A_SIGNAL},
+        'not_signal': reasons[NOT_A_SIGNAL],
+        'output': output_path
+    }
+    logger.info(f"Прогон {input_path}: {report}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="Выгрузка канала (.jsonl или .json)")
+    parser.add_argument('output', help="Файл сигналов (.npz или .parquet; без pyarrow - .npz)")
+    parser.add_argument('--parser', default="Wolfix", choices=sorted(PARSER_REGISTRY))
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    report = replay(args.input, args.output, args.parser, args.processes, args.chunk_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from loguru import logger
+
+# Поля сигнала, по которым сравнивается его содержание
+FINGERPRINT_FIELDS = ('symbol', 'side', 'entry_high', 'entry_low', 'tp1', 'tp2', 'tp3', 'sl')
+
+def signal_fingerprint(signal: Dict[str, Any]) -> str:
+    """
+    Отпечаток содержания сигнала, не зависящий от форматирования сообщения
+
+    Цены приводятся к float, символ и направление - к верхнему регистру, поэтому
+    '2500' и '2500.0' или 'buy' и 'BUY' дают один отпечаток.
+    """
+    parts = []
+    for name in FINGERPRINT_FIELDS:
+        value = signal.get(name)
+        if isinstance(value, (int, float)):
+            value = f"{float(value):.10g}"
+        elif isinstance(value, str):
+            value = value.strip().upper()
+        parts.append(f"{name}={value}")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+class SignalDeduplicator:
+    """
+    Индекс уже обработанных сигналов
+
+    Сигнал считается повтором, если уже встречалось его сообщение (канал, id сообщения)
+    или сигнал с тем же отпечатком содержания в пределах окна window. Оба индекса -
+    словари в порядке добавления с O(1) поиском; при превышении max_entries вытесняются
+    самые старые записи. Состояние сохраняется в JSON, чтобы после перезапуска
+    сигналы не исполнялись повторно.
+    """
+
+    def __init__(self, path: Optional[str] = "signal_dedup.json", window: float = 6 * 3600,
+                 max_entries: int = 10_000):
+        """
+        Args:
+            path: Файл состояния (None - только в памяти)
+            window: Сколько секунд одинаковый по содержанию сигнал считается повтором
+            max_entries: Максимальное количество записей каждого индекса
+        """
+        self.path = path
+        self.window = window
+        self.max_entries = max_entries
+        # (канал, id сообщения) -> время обработки
+        self.messages: OrderedDict = OrderedDict()
+        # отпечаток -> время последнего появления
+        self.fingerprints: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.duplicates = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def message_key(signal: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+        message_id = signal.get('message_id')
+        if message_id is None:
+            return None
+        return str(signal.get('channel', "")), int(message_id)
+
+    def _remember(self, index: OrderedDict, key, now: float) -> None:
+        index[key] = now
+        index.move_to_end(key)
+        while len(index) > self.max_entries:
+            index.popitem(last=False)
+
+    def duplicate_reason(self, signal: Dict[str, Any], now: Optional[float] = None) -> Optional[str]:
+        """Причина, по которой сигнал считается повтором ('message' или 'fingerprint'), или None"""
+        now = time.time() if now is None else now
+        key = self.message_key(signal)
+        if key is not None and key in self.messages:
+            return 'message'
+        seen_at = self.fingerprints.get(signal_fingerprint(signal))
+        if seen_at is not None and now - seen_at < self.window:
+            return 'fingerprint'
+        return None
+
+    def accept(self, signal: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        Проверка сигнала и его запись в индекс
+
+        Returns:
+            bool: True, если сигнал новый и его нужно обрабатывать
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            reason = self.duplicate_reason(signal, now)
+            if reason is not None:
+                self.duplicates += 1
+                logger.info("Повтор сигнала {symbol} ({reason}), пропускаем", event="signal_duplicate",
+                            symbol=signal.get('symbol'), reason=reason, channel=signal.get('channel'),
+                            message_id=signal.get('message_id'))
+                return False
+            key = self.message_key(signal)
+            if key is not None:
+                self._remember(self.messages, key, now)
+            self._remember(self.fingerprints, signal_fingerprint(signal), now)
+            self._dirty = True
+            return True
+
+    def load(self) -> None:
+        """Загрузка состояния из self.path"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            # Поврежденный файл не должен мешать запуску: индекс начинается заново
+            logger.warning(f"Не удалось загрузить состояние дедупликации {self.path}: {e}")
+            return
+        with self._lock:
+            for channel, message_id, seen_at in state.get('messages', []):
+                self._remember(self.messages, (channel, message_id), seen_at)
+            for fingerprint, seen_at in state.get('fingerprints', []):
+                self._remember(self.fingerprints, fingerprint, seen_at)
+        logger.info(f"Загружено {len(self.messages)} сообщений и {len(self.fingerprints)} отпечатков сигналов")
+
+    def save(self) -> None:
+        """Атомарное сохранение состояния, если оно изменилось"""
+        if self.path is None or not self._dirty:
+            return
+        now = time.time()
+        with self._lock:
+            state = {
+                'messages': [[channel, message_id, seen_at] for (channel, message_id), seen_at in self.messages.items()],
+                # Отпечатки за пределами окна больше ни на что не влияют
+                'fingerprints': [[fingerprint, seen_at] for fingerprint, seen_at in self.fingerprints.items()
+                                 if now - seen_at < self.window]
+            }
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Ошибка сохранения состояния дедупликации: {e}")
+            raise
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'messages': len(self.messages),
+            'fingerprints': len(self.fingerprints),
+            'duplicates': self.duplicates
+        }
@@ -1,103 +1,253 @@
-from typing import Dict, Any
+import contextvars
+import hashlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from loguru import logger
 from core.api_client import BybitClient
+from core.order_plan import OrderPlan, TakeProfitSlice, build_order_plan
+from core.order_state import OrderState, OrderRecord, PROTECTION_ORDER_TYPES
+from core.tracing import tracer
+from core.wallet_state import WalletState, WalletSnapshot, describe_snapshot
+
+# Лестница тейк-профитов: доля позиции в процентах для TP1, TP2 и TP3 (остаток позиции)
+TAKE_PROFIT_LADDER = (('tp1', 30), ('tp2', 30), ('tp3', 100))
+
+# Доля доступного баланса на одну позицию
+RISK_FRACTION = 0.01
+
+# Поля сигнала, определяющие клиентский идентификатор ордера
+ORDER_LINK_ID_FIELDS = ('channel', 'message_id', 'symbol', 'side', 'entry_high', 'entry_low', 'sl')
+
+def order_link_id(signal: Dict[str, Any], leg: str = "entry") -> str:
+    """
+    orderLinkId ордера сигнала
+    
+    Сигнал с известным сообщением (channel, message_id) всегда дает один и тот же
+    идентификатор, поэтому повторная обработка того же сообщения (в том числе после
+    перезапуска) не откроет вторую позицию. Без message_id одинаковые по содержанию
+    сообщения не различить, и каждый вызов получает новый идентификатор: повторы
+    запроса при сбоях используют идентификатор из плана ордера и остаются идемпотентными.
+    Длина не превышает 36 символов (ограничение Bybit).
+    """
+    key = "|".join(str(signal.get(name, "")) for name in ORDER_LINK_ID_FIELDS)
+    if signal.get('message_id') is None:
+        key = f"{key}|{uuid.uuid4().hex}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:24]
+    return f"sig{digest}-{leg}"
+
+def take_profit_stages(take_profits: List[TakeProfitSlice]) -> List[List[TakeProfitSlice]]:
+    """
+    Этапы выставления лестницы тейк-профитов
+    
+    Частичные тейк-профиты (tpslMode Partial) выставляются вместе, тейк-профит на всю
+    позицию (Full) - следующим этапом после них: так биржа применяет их в том же порядке,
+    что и при последовательной отправке TP1 -> TP2 -> TP3.
+    """
+    partial = [tp for tp in take_profits if tp.percentage != 100]
+    full = [tp for tp in take_profits if tp.percentage == 100]
+    return [stage for stage in (partial, full) if stage]
+
+def entry_conditions_met(signal: Dict[str, Any], current_price: float) -> bool:
+    """Проверка условий входа по текущей цене"""
+    # Проверяем, находится ли цена в зоне входа
+    if signal['entry_low'] <= current_price <= signal['entry_high']:
+        return True
+        
+    # Проверяем дополнительные условия
+    if signal['side'] == 'SELL':
+        # Для продажи: цена должна быть выше TP1 на 0.2%
+        min_price = signal['tp1'] * 1.002
+        return current_price >= min_price
+    else:
+        # Для покупки: цена должна быть ниже TP1 на 0.2%
+        max_price = signal['tp1'] * 0.998
+        return current_price <= max_price
 
 class SignalExecutor:
-    def __init__(self, api_client: BybitClient):
+    def __init__(self, api_client: BybitClient, parallel_take_profits: bool = True, max_workers: int = 3,
+                 wallet: Optional[WalletState] = None, orders: Optional[OrderState] = None):
+        """
+        Args:
+            api_client: Клиент Bybit
+            parallel_take_profits: Выставлять тейк-профиты параллельно после подтверждения основного ордера
+            max_workers: Размер пула потоков для параллельных запросов
+            wallet: Кэш состояния счета; без него баланс запрашивается на каждый сигнал
+            orders: Книга ордеров и позиций; с ней размещенные ордера отслеживаются по потокам
+        """
         self.api_client = api_client
+        self.wallet = wallet if wallet is not None else WalletState(max_age=0.0)
+        self.orders = orders
+        if orders is not None:
+            orders.add_listener(self.on_fill)
+        self.parallel_take_profits = parallel_take_profits
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
         
+    def _balance_snapshot(self) -> WalletSnapshot:
+        """Снимок счета из кэша или, если он устарел, из REST"""
+        snapshot = self.wallet.get()
+        if snapshot is None:
+            snapshot = self.wallet.update_from_rest(self.api_client.get_balance())
+        return snapshot
+    
+    def plan_signal(self, signal: Dict[str, Any], snapshot: WalletSnapshot) -> OrderPlan:
+        """План ордера сигнала по кэшу спецификаций, текущей цене из потока тикеров и снимку счета"""
+        symbol = signal['symbol']
+        return build_order_plan(
+            symbol, signal['side'],
+            price=self.api_client.get_last_price(symbol),
+            available_balance=snapshot.available_balance,
+            spec=self.api_client.get_instrument_spec(symbol),
+            stop_loss=signal['sl'],
+            ladder=[(name, signal[name], percentage) for name, percentage in TAKE_PROFIT_LADDER],
+            risk_fraction=RISK_FRACTION,
+            order_link_id=order_link_id(signal),
+            balance_version=snapshot.version
+        )
+    
+    def on_fill(self, order: Optional[OrderRecord], fill: Dict[str, Any]) -> None:
+        """Исполнение из потока execution: баланс изменился, срабатывание TP/SL видно сразу"""
+        self.wallet.invalidate()
+        stop_order_type = fill.get('stopOrderType') or (order.stop_order_type if order else "")
+        if stop_order_type in PROTECTION_ORDER_TYPES:
+            logger.info(f"Сработал {stop_order_type} {fill['symbol']}: {fill.get('execQty')} по {fill.get('execPrice')}")
+    
     def check_entry_conditions(self, signal: Dict[str, Any]) -> bool:
         """Проверка условий для входа в позицию"""
         try:
-            # Получаем текущую цену
-            klines = self.api_client.get_klines(
-                symbol=signal['symbol'],
-                interval="1",
-                limit=1
-            )
-            current_price = float(klines['result']['list'][0][4])
-            
-            # Проверяем, находится ли цена в зоне входа
-            if signal['entry_low'] <= current_price <= signal['entry_high']:
-                return True
-                
-            # Проверяем дополнительные условия
-            if signal['side'] == 'SELL':
-                # Для продажи: цена должна быть выше TP1 на 0.2%
-                min_price = signal['tp1'] * 1.002
-                return current_price >= min_price
-            else:
-                # Для покупки: цена должна быть ниже TP1 на 0.2%
-                max_price = signal['tp1'] * 0.998
-                return current_price <= max_price
+            with tracer.span('entry_check', symbol=signal['symbol']) as span:
+                # Получаем текущую цену
+                current_price = self.api_client.get_last_price(signal['symbol'])
+                span['met'] = entry_conditions_met(signal, current_price)
+                return span['met']
                 
         except Exception as e:
             logger.error(f"Ошибка при проверке условий входа: {e}")
             return False
             
-    def execute_signal(self, signal: Dict[str, Any]) -> None:
-        """Выполнение торгового сигнала"""
+    def execute_signal(self, signal: Dict[str, Any], parallel: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Выполнение торгового сигнала
+        
+        Args:
+            signal: Распарсенный сигнал
+            parallel: Выставлять тейк-профиты параллельно (по умолчанию - значение из конструктора)
+            
+        Returns:
+            Dict[str, Any]: Результат исполнения с разбивкой времени по шагам в миллисекундах
+            {
+                'symbol': str,
+                'contracts': float,
+                'order': Dict,
+                'take_profits': List[Dict],
+                'timings': Dict[str, float],
+                'balance_snapshot': Dict,  # Снимок счета, по которому рассчитан размер позиции
+                'order_link_id': str,
+                'plan': OrderPlan
+            }
+        """
         try:
+            started = time.perf_counter()
+            timings: Dict[str, float] = {}
             symbol = signal['symbol']
-            side = signal['side']
-            entry_price = (signal['entry_high'] + signal['entry_low']) / 2  # Используем среднюю цену зоны входа
-            sl_price = signal['sl']
-            tp_prices = [signal['tp1'], signal['tp2'], signal['tp3']]
+            if parallel is None:
+                parallel = self.parallel_take_profits
             
-            # Получаем баланс
-            balance_data = self.api_client.get_balance()
-            available_balance = float(balance_data['result']['list'][0]['totalAvailableBalance'])
-            logger.info(f"Доступный баланс: {available_balance} USDT")
+            # Берем баланс из кэша состояния счета (при устаревании - через REST)
+            step_started = time.perf_counter()
+            snapshot = self._balance_snapshot()
+            timings['balance'] = (time.perf_counter() - step_started) * 1000
             
-            # Рассчитываем размер позиции (1% от баланса)
-            position_size = available_balance * 0.01
-            logger.info(f"Размер позиции: {position_size} USDT")
-            
-            # Конвертируем размер позиции в контракты
-            position_contracts = self.api_client._convert_usdt_to_contracts(symbol, position_size)
-            logger.info(f"Размер позиции в контрактах: {position_contracts}")
+            # Все размеры рассчитываются один раз по одной цене: план уходит в основной ордер и тейк-профиты
+            step_started = time.perf_counter()
+            plan = self.plan_signal(signal, snapshot)
+            timings['sizing'] = (time.perf_counter() - step_started) * 1000
+            # Одна структурированная запись вместо строк с подставленными словарями
+            logger.info("План {side} {contracts} {symbol} по цене {price}: {position_usdt} USDT из {balance} USDT",
+                        event="signal_plan", symbol=symbol, side=plan.side, contracts=plan.contracts, price=plan.price,
+                        position_usdt=plan.position_usdt, balance=snapshot.available_balance,
+                        balance_version=snapshot.version, balance_source=snapshot.source,
+                        stop_loss=plan.stop_loss, take_profits=plan.take_profits, trace_id=tracer.current_trace_id())
             
             # Размещаем основной ордер (рыночный) только со стоп-лоссом
-            logger.info(f"Размещение основного ордера: {side} {symbol}")
-            logger.info(f"Тейк-профиты: TP1={tp_prices[0]} (30%), TP2={tp_prices[1]} (30%), TP3={tp_prices[2]} (100%)")
-            logger.info(f"Стоп-лосс: {sl_price} (100%)")
-            
-            self.api_client.place_order(
-                symbol=symbol,
-                side=side,
-                qty=position_size,
-                take_profit=False,  # Убираем тейк-профит из основного ордера
-                stop_loss=True,
-                sl_trigger_price=sl_price,
-                sl_quantity_percentage=100  # 100% для стоп-лосса
-            )
+            step_started = time.perf_counter()
+            order = self.api_client.place_order_plan(plan)
+            timings['entry'] = (time.perf_counter() - step_started) * 1000
+            if self.orders is not None:
+                self.orders.track(plan.order_link_id, order.get('orderId', ""), symbol, plan.side, plan.contracts)
+            # Баланс изменился после сделки: следующий сигнал дождется обновления из потока или REST
+            self.wallet.invalidate()
             
-            # Добавляем первый тейк-профит
-            self.api_client.place_take_profit(
-                symbol=symbol,
-                tp_trigger_price=tp_prices[0],
-                tp_quantity_percentage=30,  # 30% для первого тейк-профита
-                total_position_size=position_contracts
-            )
-            
-            # Добавляем второй тейк-профит
-            self.api_client.place_take_profit(
-                symbol=symbol,
-                tp_trigger_price=tp_prices[1],
-                tp_quantity_percentage=30,  # 30% для второго тейк-профита
-                total_position_size=position_contracts
-            )
-            
-            # Добавляем третий тейк-профит на всю позицию
-            self.api_client.place_take_profit(
-                symbol=symbol,
-                tp_trigger_price=tp_prices[2],
-                tp_quantity_percentage=100,  # 100% для третьего тейк-профита
-                total_position_size=position_contracts
-            )
+            step_started = time.perf_counter()
+            if parallel:
+                take_profits = self._place_take_profits_parallel(plan, timings)
+            else:
+                take_profits = [self._place_take_profit_timed(plan, tp, timings) for tp in plan.take_profits]
+            timings['protection'] = (time.perf_counter() - step_started) * 1000
+            timings['total'] = (time.perf_counter() - started) * 1000
+            for name, value in timings.items():
+                tracer.record(f"execute.{name}", value)
             
-            logger.info("Сигнал успешно выполнен")
+            logger.info("Сигнал {symbol} выполнен за {total_ms:.1f} мс", event="signal_done", symbol=symbol,
+                        total_ms=timings['total'], timings=timings, trace_id=tracer.current_trace_id())
+            return {
+                'symbol': symbol,
+                'contracts': plan.contracts,
+                'order': order,
+                'take_profits': take_profits,
+                'timings': timings,
+                'balance_snapshot': describe_snapshot(snapshot),
+                'order_link_id': plan.order_link_id,
+                'plan': plan
+            }
             
         except Exception as e:
             logger.error(f"Ошибка выполнения сигнала: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    def _place_take_profit_timed(self, plan: OrderPlan, tp: TakeProfitSlice, timings: Dict[str, float]) -> Dict[str, Any]:
+        """Выставление одного тейк-профита плана с замером времени"""
+        step_started = time.perf_counter()
+        response = self.api_client.place_take_profit(
+            symbol=plan.symbol,
+            tp_trigger_price=tp.trigger_price,
+            tp_quantity_percentage=tp.percentage,
+            total_position_size=plan.contracts,
+            tp_size=tp.size
+        )
+        timings[tp.name] = (time.perf_counter() - step_started) * 1000
+        return response
+    
+    def _place_take_profits_parallel(self, plan: OrderPlan, timings: Dict[str, float]) -> List[Dict[str, Any]]:
+        """Выставление лестницы тейк-профитов плана: частичные параллельно, затем тейк-профит на всю позицию"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="take-profit")
+        
+        responses = []
+        for stage in take_profit_stages(plan.take_profits):
+            # Контекст копируется, чтобы запросы из пула попадали в трассу сигнала
+            futures = [
+                self._pool.submit(contextvars.copy_context().run, self._place_take_profit_timed, plan, tp, timings)
+                for tp in stage
+            ]
+            # Дожидаемся всех запросов этапа, даже если какой-то из них упал, чтобы не оставить неучтенные ордера
+            errors = []
+            for tp, future in zip(stage, futures):
+                try:
+                    responses.append(future.result())
+                except Exception as e:
+                    logger.error(f"Ошибка выставления {tp.name.upper()}: {e}")
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+        return responses
+    
+    def close(self) -> None:
+        """Остановка пула потоков тейк-профитов и отписка от исполнений"""
+        if self.orders is not None:
+            self.orders.remove_listener(self.on_fill)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,141 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Awaitable, Callable, List, Optional
+from loguru import logger
+from core.tracing import tracer
+from .base_parser import BaseSignalParser, PARSER_REGISTRY
+
+if TYPE_CHECKING:
+    # Telethon загружается вместе с TelegramBot тем, кто создает подключение
+    from core.telegram_client import TelegramBot
+
+class SignalRouter:
+    """
+    Маршрутизатор сигналов из нескольких каналов через одно подключение Telegram
+
+    Каждый канал обрабатывается собственной асинхронной очередью, а парсинг выполняется
+    в общем пуле потоков, поэтому медленный парсер одного канала не задерживает другие.
+    """
+
+    def __init__(self, telegram_bot: 'TelegramBot',
+                 signal_handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 max_workers: int = 4, queue_size: int = 100):
+        """
+        Args:
+            telegram_bot: Подключение к Telegram
+            signal_handler: Корутина, получающая распарсенный сигнал
+            max_workers: Размер пула потоков для парсинга
+            queue_size: Максимальный размер очереди сообщений одного канала
+        """
+        self.telegram_bot = telegram_bot
+        self.signal_handler = signal_handler
+        self.queue_size = queue_size
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="signal-parser")
+        self.parsers: Dict[str, List[BaseSignalParser]] = {}
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        self.channel_stats: Dict[str, Dict[str, float]] = {}
+
+    def register_parser(self, channel_username: str, parser: BaseSignalParser) -> None:
+        """Привязка парсера к каналу"""
+        self.parsers.setdefault(channel_username, []).append(parser)
+        self.channel_stats.setdefault(channel_username, {
+            'received': 0,
+            'processed': 0,
+            'parsed': 0,
+            'signals': 0,
+            'errors': 0,
+            'latency_total_ms': 0.0,
+            'latency_max_ms': 0.0
+        })
+        logger.info(f"Канал {channel_username}: подключен парсер {parser.get_parser_name()}")
+
+    def register_from_config(self, channels: Dict[str, List[str]], api_client=None) -> None:
+        """
+        Привязка парсеров по именам из PARSER_REGISTRY
+
+        Args:
+            channels: Соответствие канала списку имен парсеров, например {'wolfix_channel': ['Wolfix']}
+            api_client: Клиент Bybit, передаваемый в конструкторы парсеров
+        """
+        for channel_username, parser_names in channels.items():
+            for name in parser_names:
+                if name not in PARSER_REGISTRY:
+                    raise ValueError(f"Неизвестный парсер: {name}")
+                self.register_parser(channel_username, PARSER_REGISTRY[name](api_client))
+
+    async def handle_message(self, channel_username: str, message) -> None:
+        """Постановка сообщения в очередь канала"""
+        if channel_username not in self.parsers:
+            return
+        if channel_username not in self.workers:
+            self._start_worker(channel_username)
+        self.channel_stats[channel_username]['received'] += 1
+        date = getattr(message, 'date', None)
+        if date is not None:
+            # Время публикации в Telegram с точностью до секунды против времени получения
+            tracer.record('telegram.delivery', (time.time() - date.timestamp()) * 1000)
+        await self.queues[channel_username].put((time.perf_counter(), message.text, getattr(message, 'id', None)))
+
+    def _start_worker(self, channel_username: str) -> None:
+        self.queues[channel_username] = asyncio.Queue(maxsize=self.queue_size)
+        self.workers[channel_username] = asyncio.create_task(self._channel_worker(channel_username))
+
+    async def _channel_worker(self, channel_username: str) -> None:
+        """Обработка очереди одного канала"""
+        queue = self.queues[channel_username]
+        stats = self.channel_stats[channel_username]
+        loop = asyncio.get_running_loop()
+        while True:
+            received_at, text, message_id = await queue.get()
+            tracer.record('router.queue', (time.perf_counter() - received_at) * 1000)
+            try:
+                with tracer.trace('message', channel=channel_username, message_id=message_id):
+                    for parser in self.parsers[channel_username]:
+                        if not text or not parser.can_handle(text):
+                            continue
+                        stats['parsed'] += 1
+                        with tracer.span('parse', parser=parser.get_parser_name()) as span:
+                            signal = await loop.run_in_executor(self.pool, parser.parse_signal, text)
+                            span['signal'] = bool(signal)
+                        if not signal:
+                            continue
+                        stats['signals'] += 1
+                        signal['channel'] = channel_username
+                        signal['message_id'] = message_id
+                        await self.signal_handler(signal)
+                        break
+            except Exception as e:
+                stats['errors'] += 1
+                logger.error(f"Ошибка обработки сообщения канала {channel_username}: {e}")
+            finally:
+                latency_ms = (time.perf_counter() - received_at) * 1000
+                stats['latency_total_ms'] += latency_ms
+                stats['latency_max_ms'] = max(stats['latency_max_ms'], latency_ms)
+                stats['processed'] += 1
+                queue.task_done()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Счетчики пропускной способности и задержек по каналам"""
+        result = {}
+        for channel_username, stats in self.channel_stats.items():
+            queue: Optional[asyncio.Queue] = self.queues.get(channel_username)
+            result[channel_username] = {
+                **stats,
+                'queue_depth': queue.qsize() if queue else 0,
+                'latency_avg_ms': stats['latency_total_ms'] / stats['processed'] if stats['processed'] else 0.0
+            }
+        return result
+
+    async def run(self, queue_size: int = 100) -> None:
+        """Запуск мониторинга всех зарегистрированных каналов"""
+        if not self.parsers:
+            raise ValueError("Не зарегистрировано ни одного парсера")
+        self.telegram_bot.set_channel_message_handler(self.handle_message)
+        try:
+            await self.telegram_bot.monitor_channels_events(list(self.parsers), queue_size=queue_size)
+        finally:
+            for worker in self.workers.values():
+                worker.cancel()
+            self.pool.shutdown(wait=False)
@@ -1,11 +1,18 @@
 import asyncio
 import json
-from typing import Optional
+from typing import Dict, List, Optional
 from loguru import logger
 from core.api_client import BybitClient
+from core.async_api_client import AsyncBybitClient
+from core.price_feed import PriceFeed
+from core.wallet_state import WalletState, BybitWalletSource
+from core.order_state import OrderState, BybitPrivateSource
 from core.telegram_client import TelegramBot
+from core.tracing import tracer
 from .wolfix_parser import WolfixParser
-from .signal_executor import SignalExecutor
+from .async_signal_executor import AsyncSignalExecutor
+from .signal_router import SignalRouter
+from .signal_dedup import SignalDeduplicator
 
 class WolfixBot:
     def __init__(self, 
@@ -13,7 +20,12 @@ class WolfixBot:
                  telegram_api_hash: str,
                  telegram_phone: str,
                  channel_username: str,
-                 check_interval: int = 5):
+                 check_interval: int = 5,
+                 intake_mode: str = "events",
+                 extra_channels: Optional[Dict[str, List[str]]] = None,
+                 metrics_port: Optional[int] = None,
+                 latency_dump_path: str = "logs/latency.json",
+                 dedup_path: Optional[str] = "signal_dedup.json"):
         """
         Инициализация бота Wolfix
         
@@ -22,12 +34,36 @@ class WolfixBot:
             telegram_api_hash: Hash API Telegram
             telegram_phone: Номер телефона для авторизации
             channel_username: Имя канала для мониторинга
-            check_interval: Интервал проверки сообщений в секундах
+            check_interval: Интервал проверки сообщений в секундах (для режима polling)
+            intake_mode: Режим получения сообщений: 'events' или 'polling'
+            extra_channels: Дополнительные каналы и имена их парсеров (только для режима events),
+                например {'other_channel': ['Wolfix']}
+            metrics_port: Порт локального HTTP-эндпоинта с задержками этапов (None - не запускать)
+            latency_dump_path: Файл, в который сохраняется статистика задержек при остановке
+            dedup_path: Файл состояния дедупликации сигналов (None - только в памяти)
         """
         # Инициализация клиентов
-        self.api_client = BybitClient()
+        self.api_client = BybitClient(preload_instruments=False)
+        # Ордера отправляются асинхронным клиентом, чтобы не блокировать цикл событий Telethon;
+        # планировщик общий с синхронным клиентом, чтобы оба укладывались в одни лимиты биржи
+        self.async_client = AsyncBybitClient(scheduler=self.api_client.scheduler)
+        # Текущие цены берутся из потока тикеров, подписка оформляется при первом обращении
+        self.price_feed = PriceFeed()
+        self.async_client.attach_price_feed(self.price_feed)
+        # Баланс для расчета размера позиции берется из потока wallet, а не запросом на каждый сигнал
+        self.wallet = WalletState(BybitWalletSource(self.async_client.api_key, self.async_client.api_secret,
+                                                    demo=self.async_client.demo))
         self.parser = WolfixParser(self.api_client)
-        self.executor = SignalExecutor(self.api_client)
+        # Исполнения записываются в журнал сделок фоновым потоком
+        # (импорт здесь: SQLAlchemy не нужен для импорта модуля бота)
+        from db.journal import JournalWriter
+        self.journal = JournalWriter()
+        # Ордера, исполнения и позиции отслеживаются по приватным потокам со сверкой через REST
+        self.orders = OrderState(self.api_client,
+                                 BybitPrivateSource(self.async_client.api_key, self.async_client.api_secret,
+                                                    demo=self.async_client.demo),
+                                 journal=self.journal)
+        self.executor = AsyncSignalExecutor(self.async_client, wallet=self.wallet, orders=self.orders)
         
         # Инициализация Telegram бота
         self.telegram_bot = TelegramBot(
@@ -38,33 +74,99 @@ class WolfixBot:
         
         self.channel_username = channel_username
         self.check_interval = check_interval
-        self.last_processed_message: Optional[str] = None
+        self.intake_mode = intake_mode
+        self.metrics_port = metrics_port
+        self.latency_dump_path = latency_dump_path
+        self.keep_alive_task: Optional[asyncio.Task] = None
+        # Повторы по id сообщения и по содержанию сигнала, в том числе после перезапуска
+        self.dedup = SignalDeduplicator(dedup_path)
         
-    async def handle_message(self, message: str):
-        """Обработка сообщения из Telegram"""
-        # Проверяем, не обрабатывали ли мы уже это сообщение
-        if message == self.last_processed_message:
-            return
-            
-        logger.info("Получено новое сообщение")
-        self.last_processed_message = message
+        # Все каналы обслуживаются одним подключением Telegram через маршрутизатор
+        self.router = SignalRouter(self.telegram_bot, self.handle_signal)
+        self.router.register_parser(channel_username, self.parser)
+        if extra_channels:
+            self.router.register_from_config(extra_channels, self.api_client)
         
-        # Парсим сигнал
-        signal_data = self.parser.parse_signal(message)
-        if not signal_data:
-            logger.info("Сообщение не является торговым сигналом")
+    async def handle_message(self, message: str, message_id: Optional[int] = None):
+        """
+        Обработка текста сообщения основного канала (повторы отсекаются в handle_signal)
+
+        Без message_id одинаковые по содержанию сообщения получают разные orderLinkId,
+        поэтому сообщения с известным id передаются через маршрутизатор
+        """
+        with tracer.trace('message', channel=self.channel_username):
+            # Парсим сигнал
+            with tracer.span('parse', parser=self.parser.get_parser_name()):
+                signal_data = self.parser.parse_signal(message)
+            if not signal_data:
+                logger.info("Сообщение не является торговым сигналом")
+                return
+            signal_data['channel'] = self.channel_username
+            if message_id is not None:
+                signal_data['message_id'] = message_id
+                
+            await self.handle_signal(signal_data)
+        
+    async def handle_signal(self, signal_data: Dict):
+        """Проверка условий входа и исполнение распарсенного сигнала"""
+        logger.info("Сигнал {symbol} {side} ({parser})", event="signal", symbol=signal_data.get('symbol'),
+                    side=signal_data.get('side'), parser=signal_data.get('parser'), signal=signal_data,
+                    trace_id=tracer.current_trace_id())
+        if not self.dedup.accept(signal_data):
             return
-            
-        logger.info(f"Распарсенный сигнал: {signal_data}")
-        logger.info(f"Источник сигнала: {signal_data['parser']}")
         
         # Проверяем условия входа
-        if self.executor.check_entry_conditions(signal_data):
+        if await self.executor.check_entry_conditions(signal_data):
             logger.info("Условия входа выполнены")
             # Выполняем сигнал
-            self.executor.execute_signal(signal_data)
+            await self.executor.execute_signal(signal_data)
         else:
             logger.info("Условия входа не выполнены")
+        # Запись на диск после исполнения, чтобы не задерживать ордер
+        try:
+            await asyncio.to_thread(self.dedup.save)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить состояние дедупликации: {e}")
+            
+    async def warm_up(self):
+        """
+        Подготовка к первому сигналу до начала чтения сообщений: открытие и поддержание
+        REST-соединений, сверка часов, загрузка спецификаций, баланса и состояния ордеров
+        """
+        try:
+            await self.async_client.warm_up()
+        except Exception as e:
+            # Соединения откроются, а спецификации загрузятся при первом сигнале
+            logger.warning(f"Не удалось прогреть асинхронный клиент: {e}")
+        self.keep_alive_task = asyncio.create_task(self.async_client.keep_alive())
+        try:
+            # Синхронный клиент используется для сверки ордеров
+            await asyncio.to_thread(self.api_client.warm_up)
+        except Exception as e:
+            logger.warning(f"Не удалось прогреть клиент Bybit: {e}")
+        try:
+            self.wallet.update_from_rest(await self.async_client.get_balance())
+        except Exception as e:
+            # Без кэша баланс будет запрашиваться через REST при каждом сигнале
+            logger.warning(f"Не удалось инициализировать состояние счета: {e}")
+        try:
+            await asyncio.to_thread(self.wallet.start)
+        except Exception as e:
+            # Отклоненные ключи или неверный адрес потока - ошибка настройки, а не повод работать без потока
+            logger.error(f"Ошибка подписки на поток счета: {e}")
+            raise
+        try:
+            await asyncio.to_thread(self._start_journal)
+            await asyncio.to_thread(self.orders.start)
+        except Exception as e:
+            logger.error(f"Ошибка запуска отслеживания ордеров: {e}")
+            raise
+
+    def _start_journal(self):
+        """Создание таблиц журнала при первом запуске и запуск фоновой записи"""
+        from db.models import init_db
+        init_db()
+        self.journal.start()
             
     async def run(self):
         """Запуск бота"""
@@ -72,22 +174,53 @@ class WolfixBot:
         self.telegram_bot.set_message_handler(self.handle_message)
         
         try:
+            if self.metrics_port is not None:
+                tracer.serve(self.metrics_port)
+            await self.warm_up()
+            
             # Запускаем бота
-            await self.telegram_bot.run(
-                channel_username=self.channel_username,
-                interval=self.check_interval
-            )
+            if self.intake_mode == "polling":
+                # Последнее сообщение канала приходит при каждом опросе: повторы отсекаются по его id
+                self.telegram_bot.set_channel_message_handler(self.router.handle_message)
+                await self.telegram_bot.run(
+                    channel_username=self.channel_username,
+                    interval=self.check_interval,
+                    mode=self.intake_mode
+                )
+            else:
+                await self.telegram_bot.start()
+                await self.router.run()
         except KeyboardInterrupt:
             logger.info("Получен сигнал остановки")
         finally:
             # Останавливаем бота
+            if self.keep_alive_task is not None:
+                self.keep_alive_task.cancel()
             await self.telegram_bot.stop()
+            await self.async_client.close()
+            self.price_feed.stop()
+            self.wallet.stop()
+            self.executor.close()
+            self.orders.stop()
+            self.journal.stop()
+            try:
+                self.dedup.save()
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить состояние дедупликации: {e}")
+            tracer.stop()
+            try:
+                tracer.dump(self.latency_dump_path)
+            except Exception as e:
+                logger.warning(f"Не удалось сохранить статистику задержек: {e}")
             
 def run_wolfix_bot(telegram_api_id: str,
                    telegram_api_hash: str,
                    telegram_phone: str,
                    channel_username: str,
-                   check_interval: int = 5):
+                   check_interval: int = 5,
+                   intake_mode: str = "events",
+                   extra_channels: Optional[Dict[str, List[str]]] = None,
+                   metrics_port: Optional[int] = None):
     """
     Запуск бота Wolfix
     
@@ -96,14 +229,20 @@ def run_wolfix_bot(telegram_api_id: str,
         telegram_api_hash: Hash API Telegram
         telegram_phone: Номер телефона для авторизации
         channel_username: Имя канала для мониторинга
-        check_interval: Интервал проверки сообщений в секундах
+        check_interval: Интервал проверки сообщений в секундах (для режима polling)
+        intake_mode: Режим получения сообщений: 'events' или 'polling'
+        extra_channels: Дополнительные каналы и имена их парсеров
+        metrics_port: Порт локального HTTP-эндпоинта с задержками этапов
     """
     bot = WolfixBot(
         telegram_api_id=telegram_api_id,
         telegram_api_hash=telegram_api_hash,
         telegram_phone=telegram_phone,
         channel_username=channel_username,
-        check_interval=check_interval
+        check_interval=check_interval,
+        intake_mode=intake_mode,
+        extra_channels=extra_channels,
+        metrics_port=metrics_port
     )
     
     # Запускаем бота в асинхронном режиме
@@ -122,7 +261,10 @@ def main():
         telegram_api_hash=telegram_config['api_hash'],
         telegram_phone=telegram_config['telegram_phone'],
         channel_username=telegram_config['channel_username'],
-        check_interval=telegram_config['check_interval']
+        check_interval=telegram_config['check_interval'],
+        intake_mode=telegram_config.get('intake_mode', 'events'),
+        extra_channels=telegram_config.get('extra_channels'),
+        metrics_port=telegram_config.get('metrics_port')
     )
 
 if __name__ == "__main__":
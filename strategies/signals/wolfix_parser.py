@@ -1,87 +1,104 @@
 import re
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
 from loguru import logger
-from core.api_client import BybitClient
-from .base_parser import BaseSignalParser
+from .base_parser import BaseSignalParser, register_parser
 
+if TYPE_CHECKING:
+    from core.api_client import BybitClient
+
+# Все поля сигнала извлекаются одним проходом по сообщению
+SIGNAL_TOKEN_RE = re.compile(
+    r'(?P<pair>[A-Z]+/[A-Z]+)\s*[📈📉]\s*(?P<side>BUY|SELL)'
+    r'|Entry zone:\s*(?P<entry_high>\d+\.?\d*)-(?P<entry_low>\d+\.?\d*)'
+    r'|TP\d+\s*(?P<tp>\d+\.?\d*)'
+    r'|SL\s*(?P<sl>\d+\.?\d*)'
+    r'|Leverage\s*(?P<leverage>\d+)x'
+)
+
+# Самое короткое сообщение, в котором помещаются все обязательные поля
+MIN_SIGNAL_LENGTH = 40
+
+@register_parser("Wolfix")
 class WolfixParser(BaseSignalParser):
-    def __init__(self, api_client: BybitClient):
+    def __init__(self, api_client: 'BybitClient'):
         super().__init__(api_client)
-        
+
     def get_parser_name(self) -> str:
         return "Wolfix"
-        
+
+    def can_handle(self, message: str) -> bool:
+        """Отсев сообщений без обязательных маркеров сигнала до запуска регулярных выражений"""
+        return bool(message) and len(message) >= MIN_SIGNAL_LENGTH and 'Entry zone' in message and 'SL' in message
+
     def parse_signal(self, message: str) -> Optional[Dict[str, Any]]:
         """Парсинг торгового сигнала из сообщения Wolfix"""
         try:
-            logger.debug(f"Начинаем парсинг сигнала Wolfix: {message}")
-            
-            # Извлекаем торговую пару и направление
-            pair_match = re.search(r'([A-Z]+/[A-Z]+)\s*[📈📉]\s*(BUY|SELL)', message)
-            if not pair_match:
-                logger.error("Не удалось найти торговую пару и направление")
-                return None
-                
-            symbol = pair_match.group(1).replace('/', '')
-            side = pair_match.group(2)
-            logger.debug(f"Найдена торговая пара: {symbol}, направление: {side}")
-            
-            # Извлекаем зону входа
-            entry_match = re.search(r'Entry zone:\s*(\d+\.?\d*)-(\d+\.?\d*)', message)
-            if not entry_match:
-                logger.error("Не удалось найти зону входа")
-                logger.debug(f"Текст для поиска зоны входа: {message}")
-                return None
-                
-            entry_high = float(entry_match.group(1))
-            entry_low = float(entry_match.group(2))
-            logger.debug(f"Найдена зона входа: {entry_low}-{entry_high}")
-            
-            # Извлекаем тейк-профиты
-            tp_matches = re.findall(r'TP\d+\s*(\d+\.?\d*)', message)
-            logger.debug(f"Найденные тейк-профиты: {tp_matches}")
-            
-            if len(tp_matches) != 3:
-                logger.error(f"Не удалось найти все тейк-профиты. Найдено: {len(tp_matches)}")
-                logger.debug(f"Текст для поиска тейк-профитов: {message}")
+            if not self.can_handle(message):
+                logger.debug("Сообщение не содержит маркеров сигнала Wolfix")
                 return None
-                
-            tp1, tp2, tp3 = map(float, tp_matches)
-            logger.debug(f"Распарсенные тейк-профиты: TP1={tp1}, TP2={tp2}, TP3={tp3}")
-            
-            # Извлекаем стоп-лосс
-            sl_match = re.search(r'SL\s*(\d+\.?\d*)', message)
-            if not sl_match:
-                logger.error("Не удалось найти стоп-лосс")
-                logger.debug(f"Текст для поиска стоп-лосса: {message}")
-                return None
-                
-            sl = float(sl_match.group(1))
-            logger.debug(f"Найден стоп-лосс: {sl}")
-            
-            # Извлекаем плечо
-            leverage_match = re.search(r'Leverage\s*(\d+)x', message)
-            if not leverage_match:
-                logger.error("Не удалось найти плечо")
-                logger.debug(f"Текст для поиска плеча: {message}")
+
+            logger.opt(lazy=True).debug("Начинаем парсинг сигнала Wolfix: {}", lambda: message)
+            signal, missing_field = self.parse_fields(message)
+            if signal is None:
+                logger.error(f"Не удалось найти поле сигнала: {missing_field}")
+                logger.opt(lazy=True).debug("Текст сообщения: {}", lambda: message)
                 return None
-                
-            leverage = int(leverage_match.group(1))
-            logger.debug(f"Найдено плечо: {leverage}x")
-            
-            return {
-                'symbol': symbol,
-                'side': side,
-                'entry_high': entry_high,
-                'entry_low': entry_low,
-                'tp1': tp1,
-                'tp2': tp2,
-                'tp3': tp3,
-                'sl': sl,
-                'leverage': leverage,
-                'parser': self.get_parser_name()
-            }
-            
+
+            logger.opt(lazy=True).debug("Распарсенный сигнал Wolfix: {}", lambda: signal)
+            return signal
+
         except Exception as e:
             logger.error(f"Ошибка при парсинге сигнала Wolfix: {e}")
-            return None 
\ No newline at end of file
+            return None
+
+    def parse_fields(self, message: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Извлечение полей сигнала без логирования
+
+        Returns:
+            Tuple: (сигнал, None) при успехе или (None, имя_отсутствующего_поля):
+            'pair', 'entry_zone', 'tp', 'sl' или 'leverage'
+        """
+        pair = side = entry_high = entry_low = sl = leverage = None
+        tps = []
+        for match in SIGNAL_TOKEN_RE.finditer(message):
+            group = match.lastgroup
+            # Как и при поиске re.search, для каждого поля берется первое вхождение
+            if group == 'side':
+                if pair is None:
+                    pair, side = match.group('pair'), match.group('side')
+            elif group == 'entry_low':
+                if entry_high is None:
+                    entry_high, entry_low = match.group('entry_high'), match.group('entry_low')
+            elif group == 'tp':
+                tps.append(match.group('tp'))
+            elif group == 'sl':
+                if sl is None:
+                    sl = match.group('sl')
+            elif group == 'leverage':
+                if leverage is None:
+                    leverage = match.group('leverage')
+
+        if pair is None:
+            return None, 'pair'
+        if entry_high is None:
+            return None, 'entry_zone'
+        if len(tps) != 3:
+            return None, 'tp'
+        if sl is None:
+            return None, 'sl'
+        if leverage is None:
+            return None, 'leverage'
+
+        return {
+            'symbol': pair.replace('/', ''),
+            'side': side,
+            'entry_high': float(entry_high),
+            'entry_low': float(entry_low),
+            'tp1': float(tps[0]),
+            'tp2': float(tps[1]),
+            'tp3': float(tps[2]),
+            'sl': float(sl),
+            'leverage': int(leverage),
+            'parser': self.get_parser_name()
+        }, None
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from aiohttp import web
+from core.async_api_client import AsyncBybitClient
+from core.rate_limiter import RequestScheduler
+from core.retry import RetryPolicy
+from strategies.signals.async_signal_executor import AsyncSignalExecutor
+
+API_KEY = "test-key"
+API_SECRET = "test-secret"
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+# Часы заглушки на 2 секунды впереди локальных
+SERVER_AHEAD_MS = 2000
+
+def ok(result):
+    return web.json_response({'retCode': 0, 'retMsg': "OK", 'result': result,
+                              'time': int(time.time() * 1000) + SERVER_AHEAD_MS})
+
+async def start_stub_server(requests_log, signed_at=None):
+    """Локальная заглушка REST API Bybit v5"""
+    signed_at = [] if signed_at is None else signed_at
+
+    async def check_signature(request, payload):
+        expected = hmac.new(
+            API_SECRET.encode(),
+            f"{request.headers['X-BAPI-TIMESTAMP']}{API_KEY}{request.headers['X-BAPI-RECV-WINDOW']}{payload}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        assert request.headers['X-BAPI-SIGN'] == expected
+
+    async def kline(request):
+        requests_log.append(request.path)
+        return ok({'list': [["1700000000000", "2490", "2495", "2485", "2490", "1", "2490"]]})
+
+    async def instruments(request):
+        requests_log.append(request.path)
+        item = {'symbol': "ETHUSDT", 'lotSizeFilter': {'minOrderQty': "0.01", 'qtyStep': "0.01"}}
+        return ok({'list': [item], 'nextPageCursor': ""})
+
+    async def server_time(request):
+        requests_log.append(request.path)
+        return ok({})
+
+    async def wallet(request):
+        requests_log.append(request.path)
+        await check_signature(request, request.query_string)
+        signed_at.append(int(request.headers['X-BAPI-TIMESTAMP']) - time.time() * 1000)
+        return ok({'list': [{'totalAvailableBalance': "10000"}]})
+
+    async def order(request):
+        requests_log.append(request.path)
+        body = await request.text()
+        await check_signature(request, body)
+        return ok({'orderId': "1", 'qty': json.loads(body)['qty']})
+
+    async def trading_stop(request):
+        requests_log.append(request.path)
+        await check_signature(request, await request.text())
+        return ok({})
+
+    app = web.Application()
+    app.router.add_get("/v5/market/kline", kline)
+    app.router.add_get("/v5/market/instruments-info", instruments)
+    app.router.add_get("/v5/market/time", server_time)
+    app.router.add_get("/v5/account/wallet-balance", wallet)
+    app.router.add_post("/v5/order/create", order)
+    app.router.add_post("/v5/position/trading-stop", trading_stop)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+def test_async_executor_against_stub_server():
+    async def scenario():
+        requests_log = []
+        runner, url = await start_stub_server(requests_log)
+        try:
+            async with AsyncBybitClient(base_url=url, api_key=API_KEY, api_secret=API_SECRET) as client:
+                await client.preload_instruments()
+                executor = AsyncSignalExecutor(client)
+                assert await executor.check_entry_conditions(SIGNAL)
+                result = await executor.execute_signal(SIGNAL)
+        finally:
+            await runner.cleanup()
+        return requests_log, result
+
+    requests_log, result = asyncio.run(scenario())
+
+    # 100 USDT / 2490 = 0.0401... -> 0.04 контракта
+    assert result['order']['qty'] == "0.040"
+    assert requests_log.count("/v5/position/trading-stop") == 3
+    # Спецификации загружены заранее и повторно не запрашиваются
+    assert requests_log.count("/v5/market/instruments-info") == 1
+
+def test_warm_up_opens_connections_and_syncs_clock():
+    async def scenario():
+        requests_log = []
+        signed_at = []
+        runner, url = await start_stub_server(requests_log, signed_at)
+        try:
+            async with AsyncBybitClient(base_url=url, api_key=API_KEY, api_secret=API_SECRET) as client:
+                await client.warm_up(connections=2)
+                # Соединения открыты до первого запроса сигнала и остаются в пуле
+                opened = sum(len(conns) for conns in client.session.connector._conns.values())
+                await client.get_balance()
+                offset = client.time_offset_ms
+        finally:
+            await runner.cleanup()
+        return requests_log, signed_at, opened, offset
+
+    requests_log, signed_at, opened, offset = asyncio.run(scenario())
+
+    assert requests_log.count("/v5/market/time") == 2
+    assert requests_log.count("/v5/market/instruments-info") == 1
+    assert opened == 2
+    assert abs(offset - SERVER_AHEAD_MS) < 500
+    # Подписанные запросы используют часы биржи
+    assert abs(signed_at[0] - SERVER_AHEAD_MS) < 500
+
+async def start_faulty_server(orders, faults):
+    """
+    Заглушка создания ордеров со сбоями
+
+    faults - очередь сбоев для следующих /v5/order/create:
+        'lost_response' - ордер создан, но клиент получил HTTP 502
+        int - отказ биржи с этим кодом, ордер не создан
+    """
+    async def create(request):
+        params = json.loads(await request.text())
+        fault = faults.pop(0) if faults else None
+        if fault == 10006:
+            reset = str(int(time.time() * 1000) + 100)
+            return web.json_response({'retCode': fault, 'retMsg': "Too many visits!", 'result': {}},
+                                     headers={'X-Bapi-Limit-Reset-Timestamp': reset})
+        if isinstance(fault, int):
+            return web.json_response({'retCode': fault, 'retMsg': "Injected error", 'result': {}})
+        if any(order['orderLinkId'] == params.get('orderLinkId') for order in orders):
+            return web.json_response({'retCode': 110072, 'retMsg': "OrderLinkedID is duplicate", 'result': {}})
+        orders.append({'orderId': str(len(orders) + 1), 'orderLinkId': params.get('orderLinkId', "")})
+        if fault == 'lost_response':
+            return web.Response(status=502)
+        response = ok({'orderId': orders[-1]['orderId'], 'orderLinkId': params.get('orderLinkId')})
+        response.headers.update({'X-Bapi-Limit': "7", 'X-Bapi-Limit-Status': "6"})
+        return response
+
+    async def realtime(request):
+        return ok({'list': []})
+
+    async def history(request):
+        link_id = request.query.get('orderLinkId')
+        return ok({'list': [order for order in orders if order['orderLinkId'] == link_id]})
+
+    app = web.Application()
+    app.router.add_post("/v5/order/create", create)
+    app.router.add_get("/v5/order/realtime", realtime)
+    app.router.add_get("/v5/order/history", history)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+def place_with_faults(faults, orders=None, order_link_id="wolfix-1", scheduler=None):
+    """Размещение ордера через заглушку со сбоями: (результат или исключение, ордера на бирже)"""
+    orders = [] if orders is None else orders
+
+    async def scenario():
+        runner, url = await start_faulty_server(orders, faults)
+        try:
+            async with AsyncBybitClient(base_url=url, api_key=API_KEY, api_secret=API_SECRET,
+                                        retry_policy=RetryPolicy(base_delay=0.01, max_delay=0.02),
+                                        scheduler=scheduler) as client:
+                return await client.place_order("ETHUSDT", "buy", 100.0, contracts=0.04,
+                                                order_link_id=order_link_id)
+        except Exception as e:
+            return e
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario()), orders
+
+def test_lost_response_recovers_existing_order():
+    result, orders = place_with_faults(['lost_response'])
+
+    assert len(orders) == 1
+    assert result['orderId'] == orders[0]['orderId']
+
+def test_duplicate_order_link_id_returns_existing_order():
+    orders = [{'orderId': "7", 'orderLinkId': "wolfix-1"}]
+    result, orders = place_with_faults([], orders)
+
+    assert len(orders) == 1
+    assert result['orderId'] == "7"
+
+def test_retryable_code_is_retried():
+    result, orders = place_with_faults([10016, 10016])
+
+    assert len(orders) == 1
+    assert result['orderId'] == "1"
+
+def test_order_without_link_id_not_retried_after_lost_response():
+    result, orders = place_with_faults(['lost_response'], order_link_id=None)
+
+    # Без orderLinkId повтор мог бы открыть вторую позицию
+    assert isinstance(result, Exception)
+    assert len(orders) == 1
+
+def test_rate_limit_and_headers_feed_shared_scheduler():
+    scheduler = RequestScheduler()
+    result, orders = place_with_faults([10006], scheduler=scheduler)
+
+    assert result['orderId'] == "1"
+    stats = scheduler.stats()['order']
+    assert stats['rate_limited'] == 1
+    assert stats['calls'] == 2
+    # Лимит группы подстроен по заголовку X-Bapi-Limit ответа
+    assert stats['rate'] == 7.0
+
+if __name__ == "__main__":
+    test_async_executor_against_stub_server()
+    test_warm_up_opens_connections_and_syncs_clock()
+    test_lost_response_recovers_existing_order()
+    test_duplicate_order_link_id_returns_existing_order()
+    test_retryable_code_is_retried()
+    test_order_without_link_id_not_retried_after_lost_response()
+    test_rate_limit_and_headers_feed_shared_scheduler()
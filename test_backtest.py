@@ -0,0 +1,47 @@
+import numpy as np
+from backtest import backtest_signals
+
+MINUTE = 60_000
+
+def make_candles(closes):
+    closes = np.asarray(closes, dtype=np.float64)
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    return {
+        'ts': np.arange(len(closes), dtype=np.int64) * MINUTE,
+        'open': opens,
+        'high': np.maximum(opens, closes) + 1,
+        'low': np.minimum(opens, closes) - 1,
+        'close': closes
+    }
+
+def make_signals(rows):
+    columns = ('ts', 'symbol', 'side', 'entry_high', 'entry_low', 'tp1', 'tp2', 'tp3', 'sl')
+    return {name: np.array([row[i] for row in rows]) for i, name in enumerate(columns)}
+
+def test_ladder_outcomes():
+    # Цена проходит зону 100, поднимается до 112 и падает до 90
+    candles = {'ETHUSDT': make_candles([105, 101, 100, 103, 106, 109, 112, 104, 95, 90])}
+    signals = make_signals([
+        (0, 'ETHUSDT', 'BUY', 100, 101, 104, 108, 120, 95),      # TP1, TP2, затем стоп
+        (0, 'ETHUSDT', 'BUY', 100, 101, 102, 104, 106, 80),      # вся лестница
+        (0, 'ETHUSDT', 'SELL', 111, 113, 104, 100, 94, 115),     # шорт от 112, все TP
+        (0, 'ETHUSDT', 'BUY', 50, 55, 60, 65, 70, 40),           # зона не достигнута
+    ])
+
+    result = backtest_signals(signals, candles, horizon=10, entry_timeout=10)
+    trades = result['trades']
+
+    assert list(trades['outcome']) == [3, 4, 4, 0]
+    fill = trades['fill_price'][0]
+    expected = 0.3 * (104 - fill) / fill + 0.3 * (108 - fill) / fill + 0.4 * (95 - fill) / fill
+    assert np.isclose(trades['pnl'][0], expected)
+    assert trades['pnl'][2] > 0
+    assert result['stats']['filled'] == 3
+    assert result['stats']['outcomes']['not_filled'] == 1
+
+def test_sl_wins_same_candle_tie():
+    candles = {'BTCUSDT': make_candles([100, 100, 100])}
+    # Диапазон свечи 99-101 задевает и стоп, и TP1
+    signals = make_signals([(0, 'BTCUSDT', 'BUY', 100, 100, 100.5, 150, 160, 99.5)])
+    trades = backtest_signals(signals, candles, horizon=3, entry_timeout=3)['trades']
+    assert trades['outcome'][0] == 1
@@ -0,0 +1,49 @@
+import importlib.util
+import json
+import numpy as np
+from strategies.signals.batch_replay import replay
+
+SIGNAL = """ETH/USDT 📈 BUY
+
+🔹Entry zone: 2480-2500
+
+💰TP1 2600
+💰TP2 2700
+💰TP3 2800
+🚫SL 2400
+
+〽️Leverage 10x"""
+
+def test_replay_reports_signals_and_failures(tmp_path):
+    history = tmp_path / "history.jsonl"
+    messages = [
+        {'id': 1, 'date': "2024-01-01T00:00:00", 'message': SIGNAL},
+        {'id': 2, 'date': "2024-01-01T01:00:00", 'message': "Good morning traders ☀️"},
+        {'id': 3, 'date': "2024-01-01T02:00:00", 'message': SIGNAL.replace("〽️Leverage 10x", "")},
+        {'id': 4, 'date': "2024-01-01T03:00:00", 'message': SIGNAL.replace("ETH", "SOL")},
+    ]
+    history.write_text("\n".join(json.dumps(m, ensure_ascii=False) for m in messages), encoding='utf-8')
+    output = tmp_path / "signals.npz"
+
+    report = replay(str(history), str(output), processes=2, chunk_size=2)
+
+    assert report['messages'] == 4
+    assert report['signals'] == 2
+    assert report['not_signal'] == 1
+    assert report['failures'] == {'leverage': 1}
+    columns = np.load(output)
+    assert list(columns['message_id']) == [1, 4]
+    assert list(columns['symbol']) == ["ETHUSDT", "SOLUSDT"]
+    assert columns['tp3'][0] == 2800.0
+
+def test_parquet_without_pyarrow_falls_back_to_npz(tmp_path, monkeypatch):
+    history = tmp_path / "history.jsonl"
+    messages = [{'id': i, 'date': "2024-01-01T00:00:00", 'message': SIGNAL} for i in range(1, 26)]
+    history.write_text("\n".join(json.dumps(m, ensure_ascii=False) for m in messages), encoding='utf-8')
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+
+    # Пачек больше, чем помещается в очередь пула
+    report = replay(str(history), str(tmp_path / "signals.parquet"), processes=2, chunk_size=3)
+
+    assert report['output'] == str(tmp_path / "signals.npz")
+    assert list(np.load(report['output'])['message_id']) == list(range(1, 26))
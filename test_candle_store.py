@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from db.candle_store import CandleStore, bar_open, normalize_interval
+from strategies.moving_average import MovingAverageStrategy
+
+MINUTE = 60_000
+
+class FakeKlineClient:
+    """Имитация get_klines: свечи каждую минуту, от новых к старым, не больше limit"""
+    def __init__(self):
+        self.calls = []
+
+    def get_klines(self, symbol, interval, limit=100, start=None, end=None):
+        self.calls.append((start, end))
+        first = start // MINUTE * MINUTE
+        stamps = list(range(first, end + 1, MINUTE))[-limit:]
+        rows = [[str(ts), "1", "2", "0.5", str(ts / MINUTE), "10", "10"] for ts in reversed(stamps)]
+        return {'result': {'list': rows}}
+
+def test_initial_and_incremental_sync(tmp_path):
+    client = FakeKlineClient()
+    store = CandleStore(client, root=str(tmp_path))
+
+    # 2500 минут истории требуют трех страниц
+    added = store.sync("ETHUSDT", "1", start=0, now=2500 * MINUTE + 1)
+    assert added == 2500
+    assert len(client.calls) == 3
+
+    client.calls.clear()
+    assert store.sync("ETHUSDT", "1", now=2510 * MINUTE) == 10
+    assert client.calls == [(2500 * MINUTE, 2509 * MINUTE)]
+
+    candles = store.load("ETHUSDT", "1")
+    assert np.all(np.diff(candles['ts']) == MINUTE)
+    assert candles['close'][-1] == 2509
+
+def test_range_is_zero_copy_and_gaps_are_filled(tmp_path):
+    client = FakeKlineClient()
+    store = CandleStore(client, root=str(tmp_path))
+    store.sync("BTCUSDT", "1", start=0, now=100 * MINUTE)
+
+    view = store.get_range("BTCUSDT", "1", start=10 * MINUTE, end=19 * MINUTE)
+    assert len(view) == 10
+    assert np.shares_memory(view, store.load("BTCUSDT", "1"))
+
+    # Вырезаем кусок истории и восстанавливаем его
+    candles = np.array(store.load("BTCUSDT", "1"))
+    store._rewrite("BTCUSDT", "1", np.concatenate([candles[:30], candles[40:]]))
+    assert store.find_gaps("BTCUSDT", "1") == [(30 * MINUTE, 39 * MINUTE)]
+    assert store.fill_gaps("BTCUSDT", "1") == 10
+    assert store.find_gaps("BTCUSDT", "1") == []
+
+def test_strategy_warm_up_reads_store(tmp_path):
+    store = CandleStore(FakeKlineClient(), root=str(tmp_path))
+    store.sync("ETHUSDT", "1m", start=0, now=50 * MINUTE)
+    strategy = MovingAverageStrategy({'symbol': "ETHUSDT", 'timeframe': "1m", 'sma_period': 20})
+
+    assert strategy.warm_up(store, limit=20) == 20
+    assert strategy.prices[-1] == 49.0
+
+DAY = 86_400_000
+WEEK = 7 * DAY
+# 2024-01-01 00:00 UTC - понедельник
+MONDAY = 1_704_067_200_000
+
+class WeeklyKlineClient:
+    """Имитация get_klines для недельных свечей, открывающихся в понедельник"""
+    def get_klines(self, symbol, interval, limit=100, start=None, end=None):
+        first = MONDAY + -(-(start - MONDAY) // WEEK) * WEEK
+        stamps = list(range(first, end + 1, WEEK))[-limit:]
+        rows = [[str(ts), "1", "2", "0.5", "1", "10", "10"] for ts in reversed(stamps)]
+        return {'result': {'list': rows}}
+
+def test_weekly_bars_open_on_monday(tmp_path):
+    store = CandleStore(WeeklyKlineClient(), root=str(tmp_path))
+    assert bar_open(MONDAY + 3 * DAY, "1w") == MONDAY
+
+    # Среда пятой недели: закрыты четыре свечи
+    assert store.sync("ETHUSDT", "W", start=MONDAY, now=MONDAY + 4 * WEEK + 2 * DAY) == 4
+    # В следующий понедельник закрывается пятая
+    assert store.sync("ETHUSDT", "W", now=MONDAY + 5 * WEEK) == 1
+    assert list(store.load("ETHUSDT", "W")['ts']) == [MONDAY + i * WEEK for i in range(5)]
+    assert store.find_gaps("ETHUSDT", "W") == []
+
+def test_monthly_interval_is_rejected():
+    for interval in ("M", "1M"):
+        with pytest.raises(ValueError):
+            normalize_interval(interval)
@@ -1,4 +1,6 @@
 import logging
+import sys
+import tempfile
 
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger("urllib3").setLevel(logging.DEBUG)
@@ -8,9 +10,10 @@ from core.api_client import BybitClient
 from loguru import logger
 from core.logger import setup_logger
 
-def test_connection():
-    # Инициализация логгера
-    logger = setup_logger()
+def test_connection(tmp_path=None):
+    # Инициализация логгера: файлы журнала теста не попадают в рабочий каталог
+    log_dir = str(tmp_path) if tmp_path is not None else tempfile.mkdtemp(prefix="trading_bot_logs_")
+    logger = setup_logger(log_dir=log_dir)
     logger.info("Начинаем тест подключения к Bybit")
     
     try:
@@ -59,6 +62,10 @@ def test_connection():
     except Exception as e:
         logger.error(f"Ошибка при тестировании: {e}")
         raise
+    finally:
+        # Остальные тесты пишут в обработчик loguru по умолчанию, а не в файл этого теста
+        logger.remove()
+        logger.add(sys.stderr)
 
 if __name__ == "__main__":
     test_connection() 
\ No newline at end of file
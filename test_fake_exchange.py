@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from pybit.exceptions import InvalidRequestError
+from core.api_client import BybitClient
+from core.async_api_client import AsyncBybitClient
+from core.fake_exchange import FakeBybitExchange, FakeExchangeServer
+from core.order_state import OrderState, ReplayPrivateSource
+from core.rate_limiter import RequestScheduler, ENDPOINT_GROUPS
+from core.retry import RetryPolicy
+from core.wallet_state import WalletState
+from strategies.signals.async_signal_executor import AsyncSignalExecutor
+from strategies.signals.signal_executor import SignalExecutor
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix",
+    'channel': "wolfix", 'message_id': 1
+}
+
+def make_client(exchange):
+    policy = RetryPolicy(max_attempts=4, base_delay=0.0, max_delay=0.0)
+    client = BybitClient(http_client=exchange, preload_instruments=False, retry_policy=policy)
+    # Лимиты запросов Bybit к имитации не применяются
+    client.scheduler = RequestScheduler({name: (1e9, priority) for name, (_, priority) in ENDPOINT_GROUPS.items()},
+                                        ip_rate=1e9)
+    return client
+
+def protection(exchange, status="Untriggered"):
+    return sorted((order['stopOrderType'], order['triggerPrice'], order['qty'])
+                  for order in exchange.orders.values() if order['stopOrderType'] and order['orderStatus'] == status)
+
+def test_signal_lifecycle_through_matching_engine():
+    exchange = FakeBybitExchange()
+    executor = SignalExecutor(make_client(exchange), wallet=WalletState(max_age=60))
+
+    assert executor.check_entry_conditions(SIGNAL)
+    executor.execute_signal(SIGNAL)
+    # 10000 * 1% / 2490 -> 0.04 контракта, тейк-профиты по 30% -> 0.01
+    assert exchange.positions['ETHUSDT']['size'] == pytest.approx(0.04)
+    assert protection(exchange) == [('PartialTakeProfit', "2600", "0.01"), ('PartialTakeProfit', "2700", "0.01"),
+                                    ('StopLoss', "2400", "0.04"), ('TakeProfit', "2800", "0.04")]
+
+    exchange.set_price("ETHUSDT", 2610)
+    assert exchange.positions['ETHUSDT']['size'] == pytest.approx(0.03)
+    exchange.set_price("ETHUSDT", 2390)
+    assert 'ETHUSDT' not in exchange.positions
+    # Остаток закрыт стоп-лоссом, оставшиеся тейк-профиты сняты
+    assert protection(exchange) == []
+    assert [fill['stopOrderType'] for fill in exchange.executions] == ["", "PartialTakeProfit", "StopLoss"]
+    # +0.01 * 120 - 0.03 * 100 и комиссии
+    assert exchange.balance == pytest.approx(10000 + 1.2 - 3.0 - 0.00055 * (0.04 * 2490 + 0.01 * 2610 + 0.03 * 2390))
+    assert [record.method for record in exchange.requests].count('set_trading_stop') == 3
+
+def test_order_validation_and_limit_orders():
+    exchange = FakeBybitExchange(balance=100.0)
+    exchange.place_order(symbol="ETHUSDT", side="Buy", orderType="Limit", qty="0.1", price="2400", orderLinkId="a")
+    assert exchange.get_open_orders(symbol="ETHUSDT")['result']['list'][0]['orderStatus'] == "New"
+    exchange.set_price("ETHUSDT", 2399)
+    assert exchange.positions['ETHUSDT']['entry_price'] == 2400
+
+    with pytest.raises(InvalidRequestError) as duplicate:
+        exchange.place_order(symbol="ETHUSDT", side="Buy", qty="0.1", orderLinkId="a")
+    assert duplicate.value.status_code == 110072
+    with pytest.raises(InvalidRequestError) as bad_qty:
+        exchange.place_order(symbol="ETHUSDT", side="Buy", qty="0.015")
+    assert bad_qty.value.status_code == 10001
+    with pytest.raises(InvalidRequestError) as no_margin:
+        exchange.place_order(symbol="ETHUSDT", side="Buy", qty="10")
+    assert no_margin.value.status_code == 110007
+    with pytest.raises(InvalidRequestError):
+        exchange.set_trading_stop(symbol="BTCUSDT", takeProfit="70000", tpslMode="Full")
+    assert exchange.stats()['errors'] == 4
+
+def test_injected_faults_are_retried_without_duplicates():
+    exchange = FakeBybitExchange(error_rate=0.1, seed=7)
+    exchange.faults['place_order'] = ['lost_response']
+    # Последовательные тейк-профиты: сбои выпадают одним и тем же запросам при каждом запуске
+    executor = SignalExecutor(make_client(exchange), parallel_take_profits=False, wallet=WalletState(max_age=60))
+
+    for message_id in range(20):
+        executor.execute_signal({**SIGNAL, 'message_id': message_id})
+
+    entries = [order for order in exchange.orders.values() if not order['stopOrderType']]
+    assert len(entries) == 20
+    assert exchange.positions['ETHUSDT']['size'] == pytest.approx(0.8)
+    assert exchange.stats()['errors'] > 0
+
+def test_order_state_follows_fake_streams():
+    exchange = FakeBybitExchange()
+    source = ReplayPrivateSource()
+    exchange.add_listener(source.push)
+    client = make_client(exchange)
+    orders = OrderState(client, source)
+    orders.start()
+    fills = []
+    orders.add_listener(lambda order, fill: fills.append(fill['stopOrderType']))
+
+    SignalExecutor(client, wallet=WalletState(max_age=60), orders=orders).execute_signal(SIGNAL)
+    exchange.set_price("ETHUSDT", 2850)
+
+    assert fills == ["", "PartialTakeProfit", "PartialTakeProfit", "TakeProfit"]
+    assert orders.get_position("ETHUSDT") is None
+    assert orders.open_orders() == []
+
+def test_async_executor_over_http():
+    exchange = FakeBybitExchange(latency=0.001)
+
+    async def scenario(url):
+        async with AsyncBybitClient(base_url=url, api_key="key", api_secret="secret") as client:
+            await client.warm_up()
+            executor = AsyncSignalExecutor(client)
+            return await asyncio.gather(*(executor.execute_signal({**SIGNAL, 'message_id': message_id})
+                                          for message_id in range(10)))
+
+    with FakeExchangeServer(exchange) as server:
+        results = asyncio.run(scenario(server.url))
+
+    assert len({result['order']['orderId'] for result in results}) == 10
+    assert exchange.calls['set_trading_stop'] == 30
+    assert exchange.positions['ETHUSDT']['size'] == pytest.approx(0.4)
@@ -0,0 +1,52 @@
+import numpy as np
+from strategies.indicators import SMA, EMA, RollingStd, ATR, RSI
+from strategies.moving_average import MovingAverageStrategy
+
+def random_walk(n: int = 500, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return 1000 + np.cumsum(rng.normal(0, 5, n))
+
+def test_sma_and_std_match_numpy():
+    prices = random_walk()
+    sma, std = SMA(20), RollingStd(20)
+    for i, price in enumerate(prices):
+        sma.update(price)
+        std.update(price)
+        if i >= 19:
+            window = prices[i - 19:i + 1]
+            assert np.isclose(sma.value, window.mean())
+            assert np.isclose(std.value, window.std())
+    assert sma.values() == list(prices[-20:])
+
+def test_ema_matches_recursive_definition():
+    prices = random_walk()
+    ema = EMA(10)
+    expected = prices[:10].mean()
+    for price in prices[:10]:
+        ema.update(price)
+    for price in prices[10:]:
+        expected += 2 / 11 * (price - expected)
+        ema.update(price)
+    assert np.isclose(ema.value, expected)
+
+def test_atr_and_rsi_bounds():
+    prices = random_walk()
+    atr, rsi = ATR(14), RSI(14)
+    for price in prices:
+        atr.update(price + 3, price - 3, price)
+        rsi.update(price)
+    assert atr.value >= 6
+    assert 0 <= rsi.value <= 100
+    # Монотонный рост дает RSI = 100
+    rising = RSI(5)
+    for price in range(10):
+        rising.update(price)
+    assert rising.value == 100.0
+
+def test_strategy_signals_unchanged():
+    strategy = MovingAverageStrategy({'sma_period': 3})
+    actions = []
+    for price in [10, 10, 10, 12, 9]:
+        strategy.update({'close': price})
+        actions.append(strategy.generate_signal({'close': price})['action'])
+    assert actions == ['hold', 'hold', 'hold', 'buy', 'sell']
@@ -0,0 +1,54 @@
+from core.api_client import InstrumentCache
+
+def make_item(symbol: str, min_qty: str = "0.01", qty_step: str = "0.01"):
+    return {
+        'symbol': symbol,
+        'lotSizeFilter': {'minOrderQty': min_qty, 'maxOrderQty': "1000", 'qtyStep': qty_step},
+        'priceFilter': {'tickSize': "0.01"}
+    }
+
+class FakeInstrumentsLoader:
+    """Имитация постраничного get_instruments_info"""
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def __call__(self, **params):
+        self.calls.append(params)
+        if 'symbol' in params:
+            return {'result': {'list': [make_item(params['symbol'], "1", "1")]}}
+        page = int(params.get('cursor') or 0)
+        next_cursor = str(page + 1) if page + 1 < len(self.pages) else ""
+        return {'result': {'list': self.pages[page], 'nextPageCursor': next_cursor}}
+
+def test_preload_reads_all_pages():
+    loader = FakeInstrumentsLoader([[make_item("BTCUSDT")], [make_item("ETHUSDT", "0.1", "0.1")]])
+    cache = InstrumentCache(loader)
+
+    assert cache.preload() == 2
+    assert len(loader.calls) == 2
+    assert cache.get("ETHUSDT")['qty_step'] == 0.1
+    assert not cache.is_stale()
+
+def test_hits_and_misses():
+    loader = FakeInstrumentsLoader([[make_item("BTCUSDT")]])
+    cache = InstrumentCache(loader)
+    cache.preload()
+
+    for _ in range(3):
+        cache.get("BTCUSDT")
+    assert len(loader.calls) == 1
+
+    # Промах загружает один инструмент и дальше отдается из памяти
+    assert cache.get("XRPUSDT")['min_qty'] == 1.0
+    cache.get("XRPUSDT")
+    assert len(loader.calls) == 2
+
+    stats = cache.stats()
+    assert stats['hits'] == 4
+    assert stats['misses'] == 1
+    assert stats['size'] == 2
+
+if __name__ == "__main__":
+    test_preload_reads_all_pages()
+    test_hits_and_misses()
@@ -0,0 +1,46 @@
+from sqlalchemy import create_engine, func, select, text
+from db.journal import JournalWriter
+from db.models import Base, Trade, BalanceSnapshot
+from core.trade_manager import TradeManager
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    Base.metadata.create_all(engine)
+    return engine
+
+def trade(i):
+    return {'symbol': "ETHUSDT", 'side': "buy", 'amount': 0.01, 'price': 2500.0 + i, 'strategy': "test"}
+
+def test_rows_are_group_committed_and_flushed_on_stop(tmp_path):
+    engine = make_engine(tmp_path)
+    journal = JournalWriter(engine, batch_size=200, flush_interval=0.05)
+    journal.start()
+    for i in range(1000):
+        journal.log_trade(trade(i))
+    journal.log_balance_snapshot({'balance': 100.0, 'equity': 100.0, 'margin': 0.0, 'free_margin': 100.0})
+    journal.stop()
+
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Trade)).scalar() == 1000
+        assert connection.execute(select(func.count()).select_from(BalanceSnapshot)).scalar() == 1
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        # Значения по умолчанию колонок применяются и при пакетной вставке
+        assert connection.execute(select(Trade.status).limit(1)).scalar() == "open"
+
+    stats = journal.stats()
+    assert stats['rows'] == 1001
+    assert stats['batches'] <= 20
+    assert stats['batch_size_max'] <= 200
+    assert stats['queue_depth'] == 0
+
+def test_trade_manager_writes_through_journal(tmp_path):
+    engine = make_engine(tmp_path)
+    journal = JournalWriter(engine, flush_interval=0.01)
+    journal.start()
+    manager = TradeManager(api_client=None, journal=journal)
+    manager.log_trade(trade(0))
+    journal.flush()
+
+    with engine.connect() as connection:
+        assert connection.execute(select(Trade.price)).scalar() == 2500.0
+    journal.stop()
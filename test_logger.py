@@ -0,0 +1,70 @@
+import io
+import json
+import sys
+import pytest
+from loguru import logger
+import core.logger
+from core.logger import BackgroundJsonSink, LogFilter, setup_logger
+
+@pytest.fixture
+def restore_handlers():
+    """Возврат обработчика loguru по умолчанию после тестов, заменяющих все обработчики"""
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+def make_record(name, level, event=None):
+    extra = {'event': event} if event else {}
+    return {'name': name, 'level': logger.level(level), 'extra': extra}
+
+def test_filter_levels_by_module_prefix():
+    log_filter = LogFilter({"": "INFO", "pybit": "WARNING", "core.api_client": "DEBUG"})
+    assert not log_filter(make_record("pybit._http_manager", "INFO"))
+    assert log_filter(make_record("pybit._http_manager", "ERROR"))
+    assert log_filter(make_record("core.api_client", "DEBUG"))
+    assert not log_filter(make_record("core.trade_manager", "DEBUG"))
+    # Префикс совпадает только по границе модуля
+    assert log_filter(make_record("pybitx", "INFO"))
+
+def test_filter_samples_events():
+    log_filter = LogFilter(sample_rates={'sizing': 0.1, 'tp_size': 0})
+    kept = sum(log_filter(make_record("core.api_client", "DEBUG", "sizing")) for _ in range(100))
+    assert kept == 10
+    assert not log_filter(make_record("core.api_client", "DEBUG", "tp_size"))
+    assert log_filter(make_record("core.api_client", "DEBUG", "order_placed"))
+
+def test_production_writes_json_lines_in_background(restore_handlers, monkeypatch):
+    registered = []
+    monkeypatch.setattr(core.logger, "_atexit_registered", False)
+    monkeypatch.setattr(core.logger.atexit, "register", registered.append)
+    stream = io.StringIO()
+    # Повторная настройка не добавляет второй atexit-обработчик
+    setup_logger("production", stream=io.StringIO(), log_dir=None)
+    setup_logger("production", stream=stream, log_dir=None, sample_rates={'sizing': 0.5})
+    assert registered == [logger.remove]
+    try:
+        for qty in range(4):
+            logger.debug("Расчет размера {qty}", qty=qty, event="sizing")
+            logger.info("Ордер размещен {order_id}", order_id=f"id-{qty}", event="order_placed", symbol="ETHUSDT")
+    finally:
+        logger.remove()  # Дожидается записи очереди
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    placed = [line for line in lines if line.get('event') == 'order_placed']
+    assert [line['order_id'] for line in placed] == ['id-0', 'id-1', 'id-2', 'id-3']
+    assert placed[0]['msg'] == "Ордер размещен id-0"
+    assert placed[0]['lvl'] == "INFO" and placed[0]['symbol'] == "ETHUSDT"
+    assert placed[0]['mod'] == __name__
+    # DEBUG ниже уровня production по умолчанию
+    assert not [line for line in lines if line['lvl'] == "DEBUG"]
+
+def test_background_sink_writes_daily_file(tmp_path):
+    sink = BackgroundJsonSink(log_dir=str(tmp_path))
+    handler_id = logger.add(sink, format="{message}")
+    logger.info("Запись в файл", event="signal")
+    logger.remove(handler_id)
+
+    files = list(tmp_path.glob("trading_bot_*.jsonl"))
+    assert len(files) == 1
+    entry = json.loads(files[0].read_text(encoding='utf-8').strip())
+    assert entry['msg'] == "Запись в файл" and entry['event'] == "signal"
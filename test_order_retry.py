@@ -0,0 +1,168 @@
+import itertools
+import time
+import pytest
+import requests
+from pybit.exceptions import InvalidRequestError
+from core.api_client import BybitClient
+from core.retry import RetryPolicy
+from strategies.signals.signal_executor import SignalExecutor, order_link_id
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix",
+    'channel': "wolfix", 'message_id': 1
+}
+
+class FakeExchange:
+    """
+    Имитация pybit HTTP с внедрением сбоев
+
+    faults[метод] - очередь сбоев для следующих вызовов:
+        'lost_request' - таймаут, запрос до биржи не дошел
+        'lost_response' - таймаут, запрос исполнен, но ответ потерян
+        int - отказ биржи с этим кодом
+    """
+    def __init__(self):
+        self.orders = []
+        self.stop_orders = []
+        self.calls = []
+        self.faults = {}
+        self._ids = itertools.count(1)
+
+    def _fault(self, method):
+        queue = self.faults.get(method)
+        fault = queue.pop(0) if queue else None
+        if fault == 'lost_request':
+            raise requests.exceptions.ReadTimeout("Read timed out")
+        if isinstance(fault, int):
+            raise InvalidRequestError(request=method, message="Injected error", status_code=fault,
+                                      time="", resp_headers={})
+        return fault
+
+    def place_order(self, **params):
+        self.calls.append('place_order')
+        fault = self._fault('place_order')
+        link_id = params.get('orderLinkId')
+        if link_id and any(order['orderLinkId'] == link_id for order in self.orders):
+            raise InvalidRequestError(request="place_order", message="OrderLinkedID is duplicate",
+                                      status_code=110072, time="", resp_headers={})
+        order = {'orderId': str(next(self._ids)), 'orderLinkId': link_id or "", 'symbol': params['symbol'],
+                 'qty': params['qty'], 'orderStatus': "Filled"}
+        self.orders.append(order)
+        if fault == 'lost_response':
+            raise requests.exceptions.ReadTimeout("Read timed out")
+        return {'retCode': 0, 'retMsg': "OK", 'result': {'orderId': order['orderId'], 'orderLinkId': link_id}}
+
+    def set_trading_stop(self, **params):
+        self.calls.append('set_trading_stop')
+        fault = self._fault('set_trading_stop')
+        self.stop_orders.append({'symbol': params['symbol'], 'stopOrderType': "PartialTakeProfit",
+                                 'triggerPrice': params['takeProfit'], 'qty': params['tpSize']})
+        if fault == 'lost_response':
+            raise requests.exceptions.ReadTimeout("Read timed out")
+        return {'retCode': 0, 'retMsg': "OK", 'result': {}}
+
+    def get_open_orders(self, category, symbol, orderLinkId=None, orderFilter=None):
+        if orderFilter == "StopOrder":
+            items = [order for order in self.stop_orders if order['symbol'] == symbol]
+        else:
+            # Рыночные ордера исполняются сразу и в активных не видны
+            items = []
+        return {'retCode': 0, 'result': {'list': items}}
+
+    def get_order_history(self, category, symbol, orderLinkId=None):
+        items = [order for order in self.orders if order['orderLinkId'] == orderLinkId]
+        return {'retCode': 0, 'result': {'list': items}}
+
+    def get_wallet_balance(self, accountType):
+        return {'retCode': 0, 'result': {'list': [{'totalAvailableBalance': "10000"}]}}
+
+    def get_instruments_info(self, category, symbol=None, **params):
+        item = {'symbol': "ETHUSDT", 'lotSizeFilter': {'minOrderQty': "0.01", 'qtyStep': "0.01"}}
+        return {'retCode': 0, 'result': {'list': [item]}}
+
+    def get_kline(self, **params):
+        return {'retCode': 0, 'result': {'list': [["0", "2490", "2490", "2490", "2490", "1", "1"]]}}
+
+def make_client(exchange, deadline=5.0):
+    policy = RetryPolicy(max_attempts=4, base_delay=0.01, max_delay=0.05, deadline=deadline)
+    return BybitClient(http_client=exchange, preload_instruments=False, retry_policy=policy)
+
+def test_lost_response_does_not_duplicate_order():
+    exchange = FakeExchange()
+    exchange.faults['place_order'] = ['lost_response']
+    client = make_client(exchange)
+
+    result = client.place_order("ETHUSDT", "BUY", 100, contracts=0.04, order_link_id="sig-test-entry")
+    assert len(exchange.orders) == 1
+    assert result['orderId'] == exchange.orders[0]['orderId']
+
+def test_retry_after_lost_request_and_repeated_send():
+    exchange = FakeExchange()
+    exchange.faults['place_order'] = ['lost_request']
+    client = make_client(exchange)
+
+    first = client.place_order("ETHUSDT", "BUY", 100, contracts=0.04, order_link_id="sig-test-entry")
+    assert exchange.calls.count('place_order') == 2
+    # Повторная отправка того же ордера возвращает уже созданный
+    second = client.place_order("ETHUSDT", "BUY", 100, contracts=0.04, order_link_id="sig-test-entry")
+    assert first['orderId'] == second['orderId']
+    assert len(exchange.orders) == 1
+
+def test_retryable_and_fatal_codes():
+    exchange = FakeExchange()
+    exchange.faults['place_order'] = [10016]
+    client = make_client(exchange)
+    client.place_order("ETHUSDT", "BUY", 100, contracts=0.04)
+    assert exchange.calls.count('place_order') == 2
+
+    # Недостаточно средств - повтор бессмысленен
+    exchange.faults['place_order'] = [110007]
+    with pytest.raises(InvalidRequestError):
+        client.place_order("ETHUSDT", "BUY", 100, contracts=0.04)
+    assert exchange.calls.count('place_order') == 3
+
+    # Без orderLinkId таймаут не повторяется: ордер мог быть исполнен
+    exchange.faults['place_order'] = ['lost_request']
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.place_order("ETHUSDT", "BUY", 100, contracts=0.04)
+    assert exchange.calls.count('place_order') == 4
+
+def test_deadline_bounds_retries():
+    exchange = FakeExchange()
+    exchange.faults['place_order'] = ['lost_request'] * 100
+    client = make_client(exchange, deadline=0.2)
+    client.retry_policy.max_attempts = 100
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.place_order("ETHUSDT", "BUY", 100, contracts=0.04, order_link_id="sig-test-entry")
+    assert time.monotonic() - started < 0.5
+
+def test_executor_survives_lost_take_profit_response():
+    exchange = FakeExchange()
+    exchange.faults['place_order'] = ['lost_response']
+    exchange.faults['set_trading_stop'] = ['lost_response', 'lost_request']
+    client = make_client(exchange)
+
+    result = SignalExecutor(client, parallel_take_profits=False).execute_signal(SIGNAL)
+    assert len(exchange.orders) == 1
+    assert exchange.orders[0]['orderLinkId'] == order_link_id(SIGNAL)
+    assert sorted(float(order['triggerPrice']) for order in exchange.stop_orders) == [2600.0, 2700.0, 2800.0]
+    assert len(result['take_profits']) == 3
+
+def test_order_link_id_is_deterministic():
+    assert order_link_id(SIGNAL) == order_link_id(dict(SIGNAL))
+    assert order_link_id(SIGNAL) != order_link_id(dict(SIGNAL, sl=2390.0))
+    assert order_link_id(SIGNAL) != order_link_id(dict(SIGNAL, message_id=2))
+    assert len(order_link_id(SIGNAL)) <= 36
+
+def test_repeated_post_without_message_id_opens_new_order():
+    # Два сообщения с одинаковым содержанием без id: второе не должно совпасть с первым ордером
+    signal = {key: value for key, value in SIGNAL.items() if key != 'message_id'}
+    assert order_link_id(signal) != order_link_id(dict(signal))
+    exchange = FakeExchange()
+    executor = SignalExecutor(make_client(exchange), parallel_take_profits=False)
+    first = executor.execute_signal(signal)
+    second = executor.execute_signal(dict(signal))
+    assert first['order_link_id'] != second['order_link_id']
+    assert len(exchange.orders) == 2
@@ -0,0 +1,242 @@
+import threading
+import time
+from pybit._websocket_stream import _WebSocketManager, _V5WebSocketManager
+from sqlalchemy import create_engine, func, select
+from core.order_state import OrderState, ReplayPrivateSource, BybitPrivateSource
+from core.private_stream import DEMO_PRIVATE_WSS
+from core.wallet_state import WalletState
+from db.journal import JournalWriter
+from db.models import Base, Trade
+from strategies.signals.signal_executor import SignalExecutor
+
+def order_item(link_id, status, updated, order_id="1", stop_order_type="", cum="0"):
+    return {'orderId': order_id, 'orderLinkId': link_id, 'symbol': "ETHUSDT", 'side': "Buy", 'orderType': "Market",
+            'stopOrderType': stop_order_type, 'qty': "0.04", 'price': "0", 'triggerPrice': "0",
+            'cumExecQty': cum, 'avgPrice': "2500", 'orderStatus': status, 'updatedTime': str(updated)}
+
+def execution(exec_id, order_id, link_id="", stop_order_type="", closed="0", exec_time=1700000001000, qty="0.01"):
+    return {'execId': exec_id, 'orderId': order_id, 'orderLinkId': link_id, 'symbol': "ETHUSDT", 'side': "Sell",
+            'execQty': qty, 'execPrice': "2600", 'execFee': "0.01", 'execTime': str(exec_time),
+            'execType': "Trade", 'stopOrderType': stop_order_type, 'closedSize': closed}
+
+class FakeJournal:
+    def __init__(self):
+        self.trades = []
+
+        self.closed = []
+
+    def log_trade(self, trade_data):
+        self.trades.append(trade_data)
+
+    def close_trades(self, symbol):
+        self.closed.append(symbol)
+
+class RestSnapshot:
+    """REST-снимок состояния счета для сверки"""
+    def __init__(self):
+        self.executions = []
+        self.open_orders = []
+        self.positions = []
+        self.history = {}
+        self.execution_requests = []
+
+    def get_executions(self, start_time=None):
+        self.execution_requests.append(start_time)
+        return [item for item in self.executions if int(item['execTime']) >= (start_time or 0)]
+
+    def get_open_orders(self, symbol=None):
+        return self.open_orders
+
+    def get_positions(self, symbol=None):
+        return self.positions
+
+    def find_order(self, symbol, order_link_id):
+        return self.history.get(order_link_id)
+
+def test_stream_updates_fills_and_listeners():
+    source = ReplayPrivateSource()
+    journal = FakeJournal()
+    state = OrderState(source=source, journal=journal)
+    fills = []
+    state.add_listener(lambda order, fill: fills.append((order, fill['execId'])))
+    state.start()
+
+    state.track("sig1-entry", "1", "ETHUSDT", "Buy", 0.04)
+    source.push('order', [order_item("sig1-entry", "Filled", 1700000000500, cum="0.04")])
+    # Устаревшее событие не затирает более новое
+    source.push('order', [order_item("sig1-entry", "New", 1700000000100)])
+    assert state.get_order("sig1-entry").status == "Filled"
+    assert state.wait_for("sig1-entry", timeout=0.01).cum_exec_qty == 0.04
+
+    source.push('position', [{'symbol': "ETHUSDT", 'side': "Buy", 'size': "0.04", 'entryPrice': "2500",
+                              'unrealisedPnl': "0", 'updatedTime': "1700000000600"}])
+    assert state.get_position("ETHUSDT").size == 0.04
+
+    # Тейк-профит позиции без orderLinkId хранится по orderId
+    source.push('order', [order_item("", "Untriggered", 1700000000700, order_id="77", stop_order_type="PartialTakeProfit")])
+    assert [order.key for order in state.open_orders("ETHUSDT")] == ["77"]
+    source.push('execution', [execution("e1", "77", stop_order_type="PartialTakeProfit", closed="0.01")])
+    source.push('execution', [execution("e1", "77", stop_order_type="PartialTakeProfit", closed="0.01")])
+
+    assert [(order.key, exec_id) for order, exec_id in fills] == [("77", "e1")]
+    assert len(journal.trades) == 1
+    assert journal.trades[0]['status'] == "closed"
+    assert journal.trades[0]['amount'] == 0.01
+    assert state.stats()['duplicates'] == 1
+
+    source.push('position', [{'symbol': "ETHUSDT", 'side': "", 'size': "0", 'updatedTime': "1700000000900"}])
+    assert state.get_position("ETHUSDT") is None
+
+def test_reconcile_after_reconnect():
+    source = ReplayPrivateSource()
+    rest = RestSnapshot()
+    journal = FakeJournal()
+    state = OrderState(rest, source, journal)
+    rest.open_orders = [order_item("sig2-entry", "New", 1700000000000, order_id="2")]
+    state._last_exec_time = 1700000000000
+    state.start()
+    assert state.get_order("sig2-entry").status == "New"
+
+    # Пока соединение было разорвано, ордер исполнился и сработал стоп-лосс
+    rest.open_orders = []
+    rest.history["sig2-entry"] = order_item("sig2-entry", "Filled", 1700000002000, order_id="2", cum="0.04")
+    rest.executions = [execution("e2", "2", "sig2-entry", exec_time=1700000001000),
+                       execution("e3", "9", stop_order_type="StopLoss", closed="0.04", exec_time=1700000003000)]
+    rest.positions = []
+    source.reconnect()
+
+    assert state.get_order("sig2-entry").status == "Filled"
+    assert [trade['status'] for trade in journal.trades] == ["open", "closed"]
+    assert journal.closed == ["ETHUSDT"]
+    assert rest.execution_requests[-1] == 1700000000000
+
+    # Повторная сверка не записывает исполнения второй раз и продолжает с последнего
+    source.reconnect()
+    assert len(journal.trades) == 2
+    assert rest.execution_requests[-1] == 1700000003000
+
+def test_take_profits_close_entry_in_journal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    Base.metadata.create_all(engine)
+    journal = JournalWriter(engine, flush_interval=0.01)
+    journal.start()
+    source = ReplayPrivateSource()
+    state = OrderState(source=source, journal=journal)
+    state.start()
+
+    def open_rows():
+        journal.flush()
+        with engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(Trade).where(Trade.status == 'open')).scalar()
+
+    source.push('execution', [execution("e1", "1", "sig1-entry", qty="0.04")])
+    assert open_rows() == 1
+    # Частичный тейк-профит: позиция еще открыта
+    source.push('execution', [execution("e2", "7", stop_order_type="PartialTakeProfit", closed="0.02", qty="0.02")])
+    assert open_rows() == 1
+    source.push('execution', [execution("e3", "8", stop_order_type="PartialTakeProfit", closed="0.02", qty="0.02")])
+    assert open_rows() == 0
+    journal.stop()
+
+def test_reconcile_closes_journal_for_vanished_position():
+    source = ReplayPrivateSource()
+    rest = RestSnapshot()
+    journal = FakeJournal()
+    state = OrderState(rest, source, journal)
+    rest.positions = [{'symbol': "ETHUSDT", 'side': "Buy", 'size': "0.04", 'updatedTime': "1700000000000"}]
+    state.start()
+    assert journal.closed == []
+
+    # Позиция закрыта вручную, исполнения в догрузку не попали
+    rest.positions = []
+    source.reconnect()
+    assert journal.closed == ["ETHUSDT"]
+    source.reconnect()
+    assert journal.closed == ["ETHUSDT"]
+
+def test_wait_for_is_woken_by_stream():
+    source = ReplayPrivateSource()
+    state = OrderState(source=source)
+    state.start()
+    timer = threading.Timer(0.02, source.push, ('order', [order_item("sig3-entry", "Filled", 1)]))
+    timer.start()
+    assert state.wait_for("sig3-entry", timeout=2.0).status == "Filled"
+
+def test_executor_tracks_entry_and_reacts_to_fills():
+    class Client:
+        def get_balance(self):
+            return {'result': {'list': [{'accountType': "UNIFIED", 'totalAvailableBalance': "10000"}]}}
+
+        def get_last_price(self, symbol):
+            return 2500.0
+
+        def get_instrument_spec(self, symbol):
+            return {'min_qty': 0.01, 'qty_step': 0.01}
+
+        def place_order_plan(self, plan):
+            return {'orderId': "5", 'orderLinkId': plan.order_link_id}
+
+        def place_take_profit(self, **params):
+            return {'retCode': 0}
+
+    source = ReplayPrivateSource()
+    state = OrderState(source=source)
+    state.start()
+    executor = SignalExecutor(Client(), parallel_take_profits=False, wallet=WalletState(max_age=60), orders=state)
+    signal = {'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+              'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0}
+    result = executor.execute_signal(signal)
+    assert state.get_order(result['order_link_id']).status == "Created"
+
+    executor.wallet.update_from_rest(Client().get_balance())
+    assert executor.wallet.get() is not None
+    source.push('execution', [execution("e9", "78", stop_order_type="TakeProfit", closed="0.04")])
+    assert executor.wallet.get() is None
+
+class FakePrivateWebSocket:
+    """Авторизованное соединение pybit: атрибут ws заменяется при каждом переподключении"""
+    def __init__(self):
+        self.auth = True
+        self.ws = object()
+
+    def order_stream(self, callback):
+        pass
+
+    execution_stream = position_stream = order_stream
+
+    def reconnect(self):
+        self.auth = False
+        self.ws = object()
+        self.auth = True
+
+    def exit(self):
+        pass
+
+def test_private_source_demo_endpoint(monkeypatch):
+    urls, topics = [], []
+
+    def connect(ws, url):
+        urls.append(url)
+        ws.auth = True
+
+    monkeypatch.setattr(_WebSocketManager, "_connect", connect)
+    monkeypatch.setattr(_V5WebSocketManager, "subscribe", lambda ws, topic, callback, symbol=False: topics.append(topic))
+    source = BybitPrivateSource("key", "secret", demo=True)
+    source.subscribe(lambda m: None, lambda m: None, lambda m: None)
+    assert urls == [DEMO_PRIVATE_WSS]
+    assert topics == ["order", "execution", "position"]
+
+def test_private_source_reconciles_after_reconnect():
+    source = BybitPrivateSource("key", "secret", demo=True, check_interval=0.01)
+    source.ws = FakePrivateWebSocket()
+    connects = []
+    source.subscribe(lambda m: None, lambda m: None, lambda m: None, on_connect=lambda: connects.append(1))
+    time.sleep(0.05)
+    # Первое подключение сверяет сам OrderState.start
+    assert connects == []
+    source.ws.reconnect()
+    deadline = time.monotonic() + 1
+    while not connects and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert connects == [1]
+    source.stop()
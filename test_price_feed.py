@@ -0,0 +1,38 @@
+import time
+from core.price_feed import PriceFeed, ReplayTickerSource
+
+def ticker(symbol: str, **fields):
+    return {'topic': f"tickers.{symbol}", 'type': "snapshot", 'ts': 1700000000000, 'data': {'symbol': symbol, **fields}}
+
+def test_replay_updates_quotes():
+    source = ReplayTickerSource([
+        ticker("ETHUSDT", lastPrice="2500.5", bid1Price="2500.4", ask1Price="2500.6"),
+        ticker("BTCUSDT", lastPrice="60000"),
+        ticker("ETHUSDT", lastPrice="2501.0")
+    ])
+    feed = PriceFeed(source)
+    feed.subscribe(["ETHUSDT"])
+    source.replay()
+
+    quote = feed.get_quote("ETHUSDT")
+    assert quote.last == 2501.0
+    # Поля, отсутствующие в дельте, сохраняются из предыдущей котировки
+    assert quote.bid == 2500.4
+    assert quote.ask == 2500.6
+    # Неподписанный инструмент не попадает в таблицу
+    assert feed.get_last_price("BTCUSDT") is None
+
+def test_stale_quote_is_ignored():
+    source = ReplayTickerSource()
+    feed = PriceFeed(source, max_age=0.05)
+    feed.subscribe(["ETHUSDT"])
+    source.push(ticker("ETHUSDT", lastPrice="2500"))
+
+    assert feed.get_last_price("ETHUSDT") == 2500.0
+    time.sleep(0.1)
+    assert feed.get_last_price("ETHUSDT") is None
+    assert feed.get_last_price("ETHUSDT", max_age=1.0) == 2500.0
+
+if __name__ == "__main__":
+    test_replay_updates_quotes()
+    test_stale_quote_is_ignored()
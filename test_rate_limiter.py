@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+from pybit.exceptions import InvalidRequestError
+from core.api_client import BybitClient
+from core.rate_limiter import RequestScheduler, PRIORITY_TRADE, PRIORITY_INFO
+from core.retry import RetryPolicy
+
+def make_scheduler(rate=5.0):
+    return RequestScheduler({'order': (rate, PRIORITY_TRADE), 'market': (rate, PRIORITY_INFO)}, ip_rate=rate)
+
+def test_bucket_limits_rate_and_records_waits():
+    scheduler = make_scheduler(rate=20.0)
+    started = time.monotonic()
+    for _ in range(30):
+        scheduler.acquire('market')
+    # 20 запросов из полного ведра сразу, еще 10 - за полсекунды
+    assert time.monotonic() - started >= 0.45
+    stats = scheduler.stats()['market']
+    assert stats['calls'] == 30
+    assert stats['waited'] >= 9
+    assert stats['queue_depth'] == 0
+
+def test_orders_go_before_waiting_info_calls():
+    scheduler = make_scheduler(rate=5.0)
+    # Опустошаем общее ведро, дальше запросы выдаются по одному за 0.2 с
+    for _ in range(5):
+        scheduler.acquire('market')
+
+    order_log = []
+    def call(group):
+        scheduler.acquire(group)
+        order_log.append(group)
+
+    info_threads = [threading.Thread(target=call, args=('market',)) for _ in range(3)]
+    for thread in info_threads:
+        thread.start()
+    time.sleep(0.05)
+    assert scheduler.queue_depth('market') == 3
+    order_thread = threading.Thread(target=call, args=('order',))
+    order_thread.start()
+    for thread in info_threads + [order_thread]:
+        thread.join()
+    assert order_log[0] == 'order'
+
+def test_headers_calibrate_bucket():
+    scheduler = make_scheduler(rate=5.0)
+    scheduler.update_from_headers('order', {'X-Bapi-Limit': '20', 'X-Bapi-Limit-Status': '0',
+                                            'X-Bapi-Limit-Reset-Timestamp': str(int(time.time() * 1000) + 300)})
+    assert scheduler.buckets['order'].rate == 20.0
+    # Остаток исчерпан: следующий запрос ждет сброса окна
+    assert scheduler.acquire('order') >= 0.2
+
+def test_client_retries_after_rate_limit_error():
+    client = BybitClient.__new__(BybitClient)
+    client.scheduler = make_scheduler(rate=100.0)
+    client.retry_policy = RetryPolicy(base_delay=0.01)
+    calls = []
+
+    def place_order(**params):
+        calls.append(params)
+        if len(calls) == 1:
+            reset = str(int(time.time() * 1000) + 100)
+            raise InvalidRequestError(request="POST /v5/order/create", message="Too many visits!",
+                                      status_code=10006, time="", resp_headers={'X-Bapi-Limit-Reset-Timestamp': reset})
+        return {'retCode': 0, 'result': {'orderId': '1'}}, 0.01, {'X-Bapi-Limit': '10', 'X-Bapi-Limit-Status': '9'}
+
+    response = client._call('order', place_order, symbol="BTCUSDT")
+    assert response['result']['orderId'] == '1'
+    assert len(calls) == 2
+    stats = client.scheduler.stats()['order']
+    assert stats['rate_limited'] == 1
+    assert stats['rate'] == 10.0
+
+def test_async_acquire_shares_budget_and_priority_with_sync_callers():
+    scheduler = make_scheduler(rate=5.0)
+    for _ in range(5):
+        scheduler.acquire('market')
+
+    order_log = []
+    def call(group):
+        scheduler.acquire(group)
+        order_log.append(group)
+
+    async def scenario():
+        info_threads = [threading.Thread(target=call, args=('market',)) for _ in range(2)]
+        for thread in info_threads:
+            thread.start()
+        await asyncio.sleep(0.05)
+        # Ордер из цикла событий проходит раньше ожидающих информационных запросов
+        await scheduler.acquire_async('order')
+        order_log.append('order')
+        await asyncio.to_thread(lambda: [thread.join() for thread in info_threads])
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert order_log[0] == 'order'
+    # Общее ведро пусто: три запроса после него выдаются по одному за 0.2 с
+    assert time.monotonic() - started >= 0.5
+    assert scheduler.stats()['order']['calls'] == 1
+    assert scheduler.queue_depth() == 0
@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from core.api_client import BybitClient
+from core.trade_manager import TradeManager
+from db.migrations import migrate
+from db.models import Trade
+
+class TickersClient:
+    """HTTP-клиент, отдающий снимок всех тикеров и считающий запросы"""
+    def __init__(self, prices):
+        self.prices = prices
+        self.ticker_calls = 0
+
+    def get_tickers(self, **params):
+        self.ticker_calls += 1
+        items = [{'symbol': symbol, 'lastPrice': str(price)} for symbol, price in self.prices.items()]
+        return {'retCode': 0, 'result': {'list': items}}, 0.0, {}
+
+def make_manager(tmp_path, prices):
+    engine = create_engine(f"sqlite:///{tmp_path / 'trades.db'}")
+    migrate(engine)
+    rows = [
+        {'symbol': "BTCUSDT", 'side': "buy", 'amount': 0.5, 'price': 40000.0, 'status': "open"},
+        {'symbol': "BTCUSDT", 'side': "sell", 'amount': 0.2, 'price': 41000.0, 'status': "open"},
+        {'symbol': "ETHUSDT", 'side': "Buy", 'amount': 2.0, 'price': 2000.0, 'status': "open"},
+        {'symbol': "ETHUSDT", 'side': "buy", 'amount': 1.0, 'price': 1500.0, 'status': "closed", 'pnl': 7.0},
+        {'symbol': "XRPUSDT", 'side': "buy", 'amount': 100.0, 'price': 0.5, 'status': "open"}
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(Trade), [dict({'pnl': 0.0}, **row) for row in rows])
+    http = TickersClient(prices)
+    client = BybitClient(http_client=http, preload_instruments=False)
+    manager = TradeManager(client)
+    manager.session = sessionmaker(bind=engine)()
+    return manager, http
+
+def test_revalue_open_trades(tmp_path):
+    manager, http = make_manager(tmp_path, {"BTCUSDT": 42000.0, "ETHUSDT": 2100.0})
+
+    exposure = manager.revalue_open_trades()
+    assert http.ticker_calls == 1
+    assert set(exposure) == {"BTCUSDT", "ETHUSDT"}
+    assert exposure["BTCUSDT"]['trades'] == 2
+    assert abs(exposure["BTCUSDT"]['net_amount'] - 0.3) < 1e-9
+    assert abs(exposure["BTCUSDT"]['notional'] - 0.7 * 42000.0) < 1e-6
+    assert abs(exposure["BTCUSDT"]['pnl'] - (0.5 * 2000.0 - 0.2 * 1000.0)) < 1e-6
+    assert exposure["ETHUSDT"]['pnl'] == 200.0
+
+    pnl = dict(manager.session.execute(select(Trade.id, Trade.pnl).order_by(Trade.id)).all())
+    assert pnl[3] == 200.0
+    # Закрытые сделки и инструменты без цены не меняются
+    assert pnl[4] == 7.0
+    assert pnl[5] == 0.0
+
+    # Повторная переоценка в пределах ticker_ttl использует тот же снимок тикеров
+    manager.revalue_open_trades()
+    assert http.ticker_calls == 1
@@ -0,0 +1,48 @@
+from strategies.signals.signal_dedup import SignalDeduplicator, signal_fingerprint
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+def make_signal(channel="wolfix", message_id=1, **fields):
+    return {**SIGNAL, 'channel': channel, 'message_id': message_id, **fields}
+
+def test_fingerprint_ignores_formatting_and_source():
+    assert signal_fingerprint(make_signal()) == signal_fingerprint(
+        make_signal(channel="other", message_id=99, side="buy", entry_high=2500, leverage=20))
+    assert signal_fingerprint(make_signal()) != signal_fingerprint(make_signal(sl=2390.0))
+
+def test_duplicates_by_message_and_fingerprint_window():
+    dedup = SignalDeduplicator(path=None, window=3600)
+    assert dedup.accept(make_signal(), now=1000)
+    # Тот же пост (например, отредактированный) и репост в другом канале
+    assert not dedup.accept(make_signal(sl=2390.0), now=1010)
+    assert not dedup.accept(make_signal(channel="other", message_id=5), now=1020)
+    # Тот же сигнал через неделю - новый сигнал
+    assert dedup.accept(make_signal(message_id=2), now=1000 + 7 * 86400)
+    assert dedup.stats() == {'messages': 2, 'fingerprints': 1, 'duplicates': 2}
+
+def test_index_is_bounded():
+    dedup = SignalDeduplicator(path=None, max_entries=3)
+    for message_id in range(10):
+        assert dedup.accept(make_signal(message_id=message_id, sl=2000.0 + message_id), now=1000 + message_id)
+    assert len(dedup.messages) == 3 and len(dedup.fingerprints) == 3
+    assert ("wolfix", 0) not in dedup.messages
+    assert not dedup.accept(make_signal(message_id=9), now=1100)
+
+def test_state_survives_restart(tmp_path):
+    path = str(tmp_path / "dedup.json")
+    dedup = SignalDeduplicator(path=path)
+    assert dedup.accept(make_signal())
+    dedup.save()
+
+    restarted = SignalDeduplicator(path=path)
+    assert restarted.duplicate_reason(make_signal()) == 'message'
+    assert restarted.duplicate_reason(make_signal(channel="other", message_id=3)) == 'fingerprint'
+
+def test_corrupted_state_starts_empty(tmp_path):
+    path = tmp_path / "dedup.json"
+    path.write_text("{not json", encoding='utf-8')
+    dedup = SignalDeduplicator(path=str(path))
+    assert dedup.accept(make_signal())
@@ -0,0 +1,58 @@
+import time
+from strategies.signals.signal_executor import SignalExecutor
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+class SlowClient:
+    """Клиент с фиксированной задержкой на выставление тейк-профитов"""
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.orders = []
+        self.take_profits = []
+
+    def get_balance(self):
+        return {'result': {'list': [{'totalAvailableBalance': "10000"}]}}
+
+    def get_last_price(self, symbol):
+        return 2500.0
+
+    def get_instrument_spec(self, symbol):
+        return {'min_qty': 0.01, 'qty_step': 0.01}
+
+    def place_order_plan(self, plan):
+        self.orders.append(plan)
+        return {'orderId': "1"}
+
+    def place_take_profit(self, **params):
+        time.sleep(self.delay)
+        self.take_profits.append(params)
+        return {'retCode': 0}
+
+def test_take_profits_are_placed_in_parallel():
+    client = SlowClient(delay=0.1)
+    executor = SignalExecutor(client)
+    result = executor.execute_signal(SIGNAL)
+    executor.close()
+
+    assert client.orders[0].contracts == 0.04
+    assert [tp['tp_size'] for tp in sorted(client.take_profits, key=lambda tp: tp['tp_trigger_price'])] == \
+        ["0.010", "0.010", "0.040"]
+    assert sorted(tp['tp_trigger_price'] for tp in client.take_profits) == [2600.0, 2700.0, 2800.0]
+    # TP1 и TP2 выставляются вместе, TP3 на всю позицию - после них: две задержки вместо трех
+    assert client.take_profits[-1]['tp_quantity_percentage'] == 100
+    assert result['timings']['protection'] < 280
+    assert set(result['timings']) >= {'balance', 'sizing', 'entry', 'tp1', 'tp2', 'tp3', 'protection', 'total'}
+
+def test_sequential_mode():
+    client = SlowClient(delay=0.02)
+    result = SignalExecutor(client, parallel_take_profits=False).execute_signal(SIGNAL)
+
+    assert [tp['tp_quantity_percentage'] for tp in client.take_profits] == [30, 30, 100]
+    assert result['timings']['protection'] >= 60
+
+if __name__ == "__main__":
+    test_take_profits_are_placed_in_parallel()
+    test_sequential_mode()
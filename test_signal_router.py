@@ -0,0 +1,52 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from strategies.signals.base_parser import BaseSignalParser
+from strategies.signals.signal_router import SignalRouter
+
+class SleepyParser(BaseSignalParser):
+    """Парсер с фиксированной задержкой, возвращающий текст сообщения как сигнал"""
+    def __init__(self, name: str, delay: float):
+        super().__init__(None)
+        self.name = name
+        self.delay = delay
+
+    def can_handle(self, message: str) -> bool:
+        return message.startswith("signal")
+
+    def parse_signal(self, message: str):
+        time.sleep(self.delay)
+        return {'text': message, 'parser': self.name}
+
+    def get_parser_name(self) -> str:
+        return self.name
+
+def test_slow_channel_does_not_delay_fast_channel():
+    handled = []
+
+    async def on_signal(signal):
+        handled.append((signal['channel'], time.perf_counter()))
+
+    async def scenario():
+        router = SignalRouter(telegram_bot=None, signal_handler=on_signal, max_workers=2)
+        router.register_parser("slow", SleepyParser("Slow", delay=0.3))
+        router.register_parser("fast", SleepyParser("Fast", delay=0.0))
+        started = time.perf_counter()
+        await router.handle_message("slow", SimpleNamespace(text="signal 1"))
+        await router.handle_message("fast", SimpleNamespace(text="signal 2"))
+        await router.handle_message("fast", SimpleNamespace(text="just chatting"))
+        await asyncio.gather(*(queue.join() for queue in router.queues.values()))
+        return router.stats(), started
+
+    stats, started = asyncio.run(scenario())
+
+    fast_done = next(at for channel, at in handled if channel == "fast")
+    assert fast_done - started < 0.2
+    assert [channel for channel, _ in handled] == ["fast", "slow"]
+    assert stats["fast"]['received'] == 2
+    assert stats["fast"]['parsed'] == 1
+    assert stats["fast"]['signals'] == 1
+    assert stats["slow"]['latency_max_ms'] >= 300
+
+if __name__ == "__main__":
+    test_slow_channel_does_not_delay_fast_channel()
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from core.api_client import BybitClient
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def imported_modules(module: str):
+    """Модули, загруженные импортом module в чистом интерпретаторе, и профиль -X importtime"""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    profile = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            profile[parts[2].strip()] = int(parts[1])
+    return set(json.loads(result.stdout)), profile
+
+def test_signal_bot_import_skips_analytics_stack():
+    modules, profile = imported_modules("strategies.signals.wolfix_bot")
+    assert not modules & {"pandas", "numpy", "sqlalchemy", "http.server"}
+    assert "strategies.signals.wolfix_bot" in profile
+
+def test_parser_import_skips_clients():
+    # Воркеры batch_replay и офлайн-парсинг не загружают клиенты бирж и Telegram
+    modules, _ = imported_modules("strategies.signals.wolfix_parser")
+    assert not modules & {"pybit", "requests", "aiohttp", "telethon", "pandas", "numpy"}
+    assert "strategies.signals.signal_executor" not in modules
+
+class WarmUpHTTP:
+    """pybit HTTP с часами биржи на 1.5 секунды впереди локальных"""
+    def __init__(self):
+        self.calls = []
+
+    def get_server_time(self, **params):
+        self.calls.append('time')
+        return {'retCode': 0, 'time': int(time.time() * 1000) + 1500, 'result': {}}
+
+    def get_instruments_info(self, **params):
+        self.calls.append('instruments')
+        item = {'symbol': "ETHUSDT", 'lotSizeFilter': {'minOrderQty': "0.01", 'qtyStep': "0.01"}}
+        return {'retCode': 0, 'result': {'list': [item], 'nextPageCursor': ""}}
+
+def test_warm_up_syncs_clock_and_preloads_specs():
+    http = WarmUpHTTP()
+    client = BybitClient(http_client=http, preload_instruments=False)
+    try:
+        offset = client.warm_up()
+        assert abs(offset - 1500) < 500
+        assert http.calls == ['time', 'instruments']
+        # Спецификации уже в кэше: повторный прогрев их не загружает
+        client.warm_up()
+        assert http.calls == ['time', 'instruments', 'time']
+        assert client.get_instrument_spec("ETHUSDT")['qty_step'] == 0.01
+    finally:
+        client.instruments.stop_auto_refresh()
@@ -0,0 +1,140 @@
+import numpy as np
+from strategies.engine import KlineFetcher, StrategyEngine
+from strategies.indicators import BatchSMA
+from strategies.moving_average import MovingAverageStrategy
+
+MINUTE = 60_000
+
+class FakeKlineClient:
+    """Имитация get_klines: у каждого инструмента свой ценовой ряд, свечи от новых к старым"""
+    def __init__(self, closes, now):
+        self.closes = closes
+        self.now = now
+        self.calls = 0
+        self.limits = []
+        # Инструменты, торги по которым остановлены: {symbol: минута последней свечи}
+        self.halted = {}
+
+    def get_klines(self, symbol, interval, limit=100, start=None, end=None):
+        self.calls += 1
+        self.limits.append((symbol, limit))
+        # Последняя свеча открыта в текущую минуту и еще не закрыта
+        count = self.now // MINUTE + 1
+        if symbol in self.halted:
+            count = min(count, self.halted[symbol] + 1)
+        prices = self.closes[symbol][:count][-limit:]
+        first = count - len(prices)
+        rows = [[str((first + i) * MINUTE), "1", "2", "0.5", str(price), "10", "10"]
+                for i, price in enumerate(prices)]
+        return {'result': {'list': list(reversed(rows))}}
+
+def test_batch_sma_matches_single_sma_per_column():
+    rng = np.random.default_rng(1)
+    prices = 100 + np.cumsum(rng.normal(0, 1, (60, 4)), axis=0)
+    batch = BatchSMA(4, 10)
+    for row in prices:
+        batch.update(row)
+    assert np.allclose(batch.value, prices[-10:].mean(axis=0))
+
+    # Окно инструмента без свечи на баре не сдвигается
+    batch = BatchSMA(2, 3)
+    batch.update(np.array([1.0, np.nan]), np.array([True, False]))
+    batch.update(np.array([np.nan, 5.0]), np.array([False, True]))
+    batch.update(np.array([4.0, 5.0]))
+    assert np.isnan(batch.value).all()
+    batch.update(np.array([7.0, 8.0]), np.array([True, False]))
+    assert batch.value[0] == 4.0
+    assert np.isnan(batch.value[1])
+    for x in (9.0, 10.0, 11.0):
+        batch.update(np.array([x, x]))
+    assert np.allclose(batch.value, [10.0, 10.0])
+
+def test_engine_matches_single_symbol_strategy():
+    rng = np.random.default_rng(7)
+    symbols = [f"SYM{i}USDT" for i in range(20)]
+    closes = {symbol: list(100 + np.cumsum(rng.normal(0, 1, 200))) for symbol in symbols}
+    client = FakeKlineClient(closes, now=150 * MINUTE + 1)
+    config = {'timeframe': '1m', 'sma_period': 10, 'position_size': 0.01}
+
+    engine = StrategyEngine(MovingAverageStrategy(config), symbols, fetcher=KlineFetcher(client, rate=1000))
+    assert engine.warm_up(101, now=client.now) == 100
+
+    single = {}
+    for symbol in symbols:
+        strategy = MovingAverageStrategy(dict(config, symbol=symbol))
+        for price in closes[symbol][50:150]:
+            strategy.update({'close': price})
+        single[symbol] = strategy
+
+    # Состояние после прогрева совпадает с отдельными стратегиями
+    assert np.allclose(engine.strategy.batch_sma.value, [single[s].sma.value for s in symbols])
+
+    batch_signals = []
+    expected = []
+    for minute in range(151, 181):
+        client.now = minute * MINUTE + 1
+        batch_signals.extend(engine.step(now=client.now))
+        for symbol in symbols:
+            price = closes[symbol][minute - 1]
+            single[symbol].update({'close': price})
+            signal = single[symbol].generate_signal({'close': price})
+            if signal['action'] != 'hold':
+                expected.append((symbol, signal['action'], price))
+    engine.stop()
+
+    assert expected
+    assert sorted((s['symbol'], s['action'], s['price']) for s in batch_signals) == sorted(expected)
+
+def test_step_without_new_bar_returns_nothing():
+    closes = {"BTCUSDT": [float(i) for i in range(1, 40)]}
+    client = FakeKlineClient(closes, now=20 * MINUTE + 1)
+    engine = StrategyEngine(MovingAverageStrategy({'timeframe': '1m', 'sma_period': 5}), ["BTCUSDT"],
+                            fetcher=KlineFetcher(client, rate=1000))
+    engine.warm_up(20, now=client.now)
+    assert engine.step(now=client.now) == []
+    engine.stop()
+
+def test_step_backfills_missed_bars():
+    rng = np.random.default_rng(3)
+    symbols = ["BTCUSDT", "ETHUSDT"]
+    closes = {symbol: list(100 + np.cumsum(rng.normal(0, 1, 80))) for symbol in symbols}
+    client = FakeKlineClient(closes, now=30 * MINUTE + 1)
+    engine = StrategyEngine(MovingAverageStrategy({'timeframe': '1m', 'sma_period': 5}), symbols,
+                            fetcher=KlineFetcher(client, rate=1000))
+    engine.warm_up(30, now=client.now)
+
+    # Шаги на 31-й и 32-й минутах пропущены: свечи 30 и 31 догружаются на 33-й
+    client.now = 33 * MINUTE + 1
+    engine.step(now=client.now)
+    assert list(engine.bars['ts']) == [32 * MINUTE, 32 * MINUTE]
+    expected = [np.mean(closes[symbol][28:33]) for symbol in symbols]
+    assert np.allclose(engine.strategy.batch_sma.value, expected)
+    engine.stop()
+
+def test_stale_symbol_does_not_deepen_fetch_for_others():
+    symbols = ["BTCUSDT", "ETHUSDT"]
+    closes = {symbol: [float(i) for i in range(1, 80)] for symbol in symbols}
+    client = FakeKlineClient(closes, now=30 * MINUTE + 1)
+    engine = StrategyEngine(MovingAverageStrategy({'timeframe': '1m', 'sma_period': 5}), symbols,
+                            fetcher=KlineFetcher(client, rate=1000))
+    engine.warm_up(30, now=client.now)
+    client.halted["ETHUSDT"] = 29
+
+    for minute in range(31, 36):
+        client.limits.clear()
+        client.now = minute * MINUTE + 1
+        engine.step(now=client.now)
+    limits = dict(client.limits)
+    # Глубина запроса считается по своей последней свече, а не по самой старой среди инструментов
+    assert limits["BTCUSDT"] == 3
+    # После MAX_MISSED_STEPS шагов без свечей устаревший инструмент запрашивается без догрузки
+    assert limits["ETHUSDT"] == 2
+    assert list(engine.bars['ts']) == [34 * MINUTE, 29 * MINUTE]
+
+    # Торги возобновились: инструмент снова получает свечи и догружается как обычно
+    del client.halted["ETHUSDT"]
+    client.now = 36 * MINUTE + 1
+    engine.step(now=client.now)
+    assert engine.bars['ts'][1] == 35 * MINUTE
+    assert engine._missed[1] == 0
+    engine.stop()
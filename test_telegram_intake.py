@@ -0,0 +1,149 @@
+import asyncio
+from types import SimpleNamespace
+from core.telegram_client import TelegramBot
+
+class FakeTelegramClient:
+    """Имитация TelegramClient с историей сообщений канала"""
+    def __init__(self, history):
+        self.history = history
+        self.handlers = []
+        self.connects = 0
+        self.disconnected = asyncio.Event()
+
+    async def get_entity(self, username):
+        return username
+
+    async def get_messages(self, entity, limit=1):
+        return sorted(self.history, key=lambda m: m.id, reverse=True)[:limit]
+
+    def add_event_handler(self, handler, event):
+        self.handlers.append(handler)
+
+    def remove_event_handler(self, handler):
+        self.handlers.remove(handler)
+
+    async def run_until_disconnected(self):
+        await self.disconnected.wait()
+
+    async def connect(self):
+        self.connects += 1
+        self.disconnected.clear()
+
+    async def disconnect(self):
+        self.disconnected.set()
+
+    async def iter_messages(self, entity, min_id=0, reverse=False):
+        for message in sorted(self.history, key=lambda m: m.id, reverse=not reverse):
+            if message.id > min_id:
+                yield message
+
+def make_bot(history):
+    # Обходим конструктор, чтобы не создавать файл сессии Telethon
+    bot = TelegramBot.__new__(TelegramBot)
+    bot.client = FakeTelegramClient(history)
+    bot.last_message_ids = {}
+    bot.pending_message_ids = {}
+    bot.channel_message_handler = None
+    bot.stopping = False
+    return bot
+
+def test_burst_and_catch_up_keep_every_message_once():
+    history = [SimpleNamespace(id=i, text=f"message {i}") for i in range(1, 8)]
+    bot = make_bot(history)
+    received = []
+
+    async def handler(text):
+        received.append(text)
+    bot.message_handler = handler
+
+    async def scenario():
+        queue = asyncio.Queue(maxsize=2)
+        bot.last_message_ids["channel"] = 2
+        consumer = asyncio.create_task(bot._consume_messages(queue))
+        # Пачка событий за одно мгновение и повторная доставка уже обработанного сообщения
+        for message in history[2:5] + [history[3]]:
+            await bot._enqueue_message("channel", message, queue)
+        # Догрузка после переподключения не дублирует уже полученные сообщения
+        await bot._catch_up("channel", None, queue)
+        await queue.join()
+        consumer.cancel()
+
+    asyncio.run(scenario())
+    assert received == [f"message {i}" for i in range(3, 8)]
+    assert bot.last_message_ids["channel"] == 7
+
+def test_periodic_catch_up_and_stop_without_reconnect():
+    history = [SimpleNamespace(id=i, text=f"message {i}") for i in range(1, 4)]
+    bot = make_bot(history)
+    received = []
+
+    async def handler(text):
+        received.append(text)
+    bot.message_handler = handler
+
+    async def scenario():
+        monitor = asyncio.create_task(bot.monitor_channels_events(["channel"], catch_up_interval=0.01))
+        await asyncio.sleep(0.02)
+        # Сообщения, пришедшие во время внутреннего переподключения Telethon, без событий NewMessage
+        history.extend(SimpleNamespace(id=i, text=f"message {i}") for i in (4, 5))
+        for _ in range(100):
+            if len(received) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await bot.stop()
+        await asyncio.wait_for(monitor, 1)
+
+    asyncio.run(scenario())
+    assert received == ["message 4", "message 5"]
+    assert bot.client.connects == 0
+    assert bot.client.handlers == []
+
+def test_catch_up_from_watermark_after_newer_live_post():
+    history = [SimpleNamespace(id=i, text=f"message {i}") for i in range(1, 8) if i != 5]
+    bot = make_bot(history)
+    received = []
+
+    async def handler(text):
+        received.append(text)
+    bot.message_handler = handler
+
+    async def scenario():
+        queue = asyncio.Queue()
+        bot.last_message_ids["channel"] = 2
+        consumer = asyncio.create_task(bot._consume_messages(queue))
+        await bot._enqueue_message("channel", history[2], queue)
+        # Сообщения 4 и 6 потеряны при тихом переподключении, 7 пришло живым событием раньше догрузки
+        await bot._enqueue_message("channel", history[5], queue)
+        assert bot.last_message_ids["channel"] == 3
+        assert bot.pending_message_ids["channel"] == {7}
+        await bot._catch_up("channel", None, queue)
+        await queue.join()
+        consumer.cancel()
+
+    asyncio.run(scenario())
+    assert received == ["message 3", "message 7", "message 4", "message 6"]
+    # Удаленное сообщение 5 не держит разрыв: после догрузки отметка сдвинута до конца истории
+    assert bot.last_message_ids["channel"] == 7
+    assert bot.pending_message_ids["channel"] == set()
+
+def test_pending_ids_are_bounded():
+    bot = make_bot([])
+    bot.MAX_PENDING_IDS = 3
+
+    async def scenario():
+        queue = asyncio.Queue()
+        bot.last_message_ids["channel"] = 1
+        for message_id in (3, 4, 6, 8):
+            await bot._enqueue_message("channel", SimpleNamespace(id=message_id, text=""), queue)
+        return queue.qsize()
+
+    assert asyncio.run(scenario()) == 4
+    # Самый старый разрыв (2) пропущен, разрыв 5 еще ждет догрузки
+    assert bot.last_message_ids["channel"] == 4
+    assert bot.pending_message_ids["channel"] == {6, 8}
+
+if __name__ == "__main__":
+    test_burst_and_catch_up_keep_every_message_once()
+    test_periodic_catch_up_and_stop_without_reconnect()
+    test_catch_up_from_watermark_after_newer_live_post()
+    test_pending_ids_are_bounded()
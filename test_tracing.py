@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+import urllib.request
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+from core.api_client import BybitClient
+from core.tracing import Tracer, tracer
+from strategies.signals.signal_router import SignalRouter
+
+class ClockHTTP:
+    """pybit HTTP, отвечающий с временем биржи на 250 мс впереди локального"""
+    def get_wallet_balance(self, **params):
+        return {'retCode': 0, 'time': int(time.time() * 1000) + 250, 'result': {'list': []}}, 0.0, {}
+
+def test_spans_share_trace_id_and_percentiles():
+    local = Tracer()
+    with local.trace('message', channel="wolfix") as trace_id:
+        with local.span('parse'):
+            pass
+        for value in range(1, 101):
+            local.record('execute.entry', float(value))
+    assert local.current_trace_id() is None
+
+    spans = local.recent(trace_id)
+    assert [span['name'] for span in spans] == ['parse', 'message']
+    assert all(span['duration_ms'] >= 0 for span in spans)
+
+    summary = local.summary()['execute.entry']
+    assert summary['count'] == 100
+    assert summary['p50_ms'] in (50.0, 51.0)
+    assert summary['p99_ms'] == 99.0
+    assert summary['max_ms'] == 100.0
+
+def test_trace_id_follows_async_tasks():
+    local = Tracer()
+
+    async def stage(name):
+        await asyncio.sleep(0)
+        with local.span(name):
+            return local.current_trace_id()
+
+    async def scenario():
+        with local.trace('message') as trace_id:
+            ids = await asyncio.gather(stage('a'), stage('b'))
+        return trace_id, ids
+
+    trace_id, ids = asyncio.run(scenario())
+    assert ids == [trace_id, trace_id]
+
+def test_client_calls_and_server_clock():
+    tracer.reset()
+    client = BybitClient(http_client=ClockHTTP(), preload_instruments=False)
+    with tracer.trace('message') as trace_id:
+        client.get_balance()
+
+    assert [span['name'] for span in tracer.recent(trace_id)] == ['bybit.get_wallet_balance', 'message']
+    offset = tracer.summary()['clock.server_offset']
+    assert 200 < offset['p50_ms'] < 300
+
+def test_router_records_delivery_and_dump(tmp_path):
+    tracer.reset()
+
+    class Parser:
+        def can_handle(self, text):
+            return True
+
+        def parse_signal(self, text):
+            return {'symbol': "ETHUSDT"}
+
+        def get_parser_name(self):
+            return "Fake"
+
+    handled = []
+
+    async def handler(signal):
+        handled.append(tracer.current_trace_id())
+
+    async def scenario():
+        router = SignalRouter(SimpleNamespace(), handler)
+        router.register_parser("wolfix", Parser())
+        date = datetime.now(timezone.utc) - timedelta(seconds=2)
+        await router.handle_message("wolfix", SimpleNamespace(id=7, date=date, text="signal"))
+        await router.queues["wolfix"].join()
+        router.pool.shutdown()
+
+    asyncio.run(scenario())
+    summary = tracer.summary()
+    assert handled[0] is not None
+    assert 1500 < summary['telegram.delivery']['p50_ms'] < 5000
+    assert {'router.queue', 'parse', 'message'} <= set(summary)
+    message_span = [span for span in tracer.recent(handled[0]) if span['name'] == 'message'][0]
+    assert message_span['message_id'] == 7
+
+    path = tmp_path / "latency.json"
+    tracer.dump(str(path))
+    assert 'parse' in json.loads(path.read_text(encoding='utf-8'))['stages']
+
+def test_metrics_endpoint():
+    local = Tracer()
+    local.record('parse', 1.5)
+    port = local.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = json.loads(response.read())
+    finally:
+        local.stop()
+    assert body['parse']['count'] == 1
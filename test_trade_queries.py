@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, inspect, text
+from sqlalchemy.orm import sessionmaker
+from db.migrations import migrate, SCHEMA_VERSION
+from db.models import Trade
+from db.queries import TradeQueries
+
+START = datetime(2024, 1, 1)
+
+def make_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'trades.db'}")
+    migrate(engine)
+    rows = []
+    for i in range(300):
+        rows.append({
+            'symbol': ("BTCUSDT", "ETHUSDT", "SOLUSDT")[i % 3], 'side': "buy", 'amount': 1.0, 'price': 10.0,
+            'fee': 0.01, 'strategy': ("wolfix", "sma")[i % 2], 'pnl': 1.0 if i % 4 else -2.0,
+            'status': "closed" if i < 250 else "open", 'timestamp': START + timedelta(hours=i)
+        })
+    with engine.begin() as connection:
+        connection.execute(insert(Trade), rows)
+    return engine, TradeQueries(sessionmaker(bind=engine))
+
+def test_aggregates_are_computed_in_sql(tmp_path):
+    engine, queries = make_db(tmp_path)
+
+    by_symbol = {row.key: row for row in queries.pnl_by_symbol()}
+    assert set(by_symbol) == {"BTCUSDT", "ETHUSDT", "SOLUSDT"}
+    assert sum(row.trades for row in by_symbol.values()) == 300
+    assert sum(row.pnl for row in by_symbol.values()) == 225 * 1.0 - 75 * 2.0
+    assert by_symbol["BTCUSDT"].volume == 100 * 10.0
+
+    first_day = queries.daily_pnl(end=START + timedelta(days=1))
+    assert [row.key for row in first_day] == ["2024-01-01"]
+    assert first_day[0].trades == 24
+
+    assert queries.count_by_status() == {"closed": 250, "open": 50}
+    eth = queries.trades(symbol="ETHUSDT", start=START, end=START + timedelta(hours=12))
+    assert [trade.timestamp.hour for trade in eth] == [1, 4, 7, 10]
+
+def test_range_queries_use_indexes(tmp_path):
+    engine, _ = make_db(tmp_path)
+    with engine.connect() as connection:
+        plan = connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT sum(pnl) FROM trades WHERE symbol = 'ETHUSDT' AND timestamp >= '2024-01-02'"
+        )).fetchall()
+        assert any('ix_trades_symbol_timestamp' in str(row) for row in plan)
+        plan = connection.execute(text("EXPLAIN QUERY PLAN SELECT id FROM trades WHERE status = 'open'")).fetchall()
+        assert any('ix_trades_status' in str(row) for row in plan)
+
+def test_migration_of_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # Схема первых версий бота: таблица без индексов
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE trades (id INTEGER PRIMARY KEY, symbol VARCHAR, side VARCHAR, amount FLOAT, price FLOAT, "
+            "fee FLOAT, timestamp DATETIME, strategy VARCHAR, pnl FLOAT, status VARCHAR)"
+        ))
+        connection.execute(text("INSERT INTO trades (symbol, side, amount, price, status) VALUES ('BTCUSDT', 'buy', 1, 1, 'open')"))
+
+    assert migrate(engine) == SCHEMA_VERSION
+    names = {index['name'] for index in inspect(engine).get_indexes('trades')}
+    assert names >= {'ix_trades_symbol_timestamp', 'ix_trades_strategy_timestamp', 'ix_trades_status'}
+    assert 'balance_snapshots' in inspect(engine).get_table_names()
+    # Повторный запуск ничего не делает
+    assert migrate(engine) == 0
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM trades")).scalar() == 1
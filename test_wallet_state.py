@@ -0,0 +1,114 @@
+import time
+import pytest
+from pybit._websocket_stream import _WebSocketManager, _V5WebSocketManager
+from core.private_stream import DEMO_PRIVATE_WSS, MAINNET_PRIVATE_WSS, private_ws_url
+from core.wallet_state import WalletState, ReplayWalletSource, BybitWalletSource
+from strategies.signals.signal_executor import SignalExecutor
+
+SIGNAL = {
+    'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2500.0, 'entry_low': 2480.0,
+    'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+}
+
+def wallet_message(available: str):
+    return {'topic': "wallet", 'creationTime': 1700000000000,
+            'data': [{'accountType': "UNIFIED", 'totalAvailableBalance': available, 'totalEquity': available}]}
+
+class CountingClient:
+    """Клиент, считающий запросы баланса"""
+    def __init__(self):
+        self.balance_calls = 0
+
+    def get_balance(self):
+        self.balance_calls += 1
+        return {'time': 1700000000000, 'result': {'list': [{'accountType': "UNIFIED", 'totalAvailableBalance': "5000"}]}}
+
+    def get_last_price(self, symbol):
+        return 2500.0
+
+    def get_instrument_spec(self, symbol):
+        return {'min_qty': 0.01, 'qty_step': 0.01}
+
+    def place_order_plan(self, plan):
+        return {'orderId': "1"}
+
+    def place_take_profit(self, **params):
+        return {'retCode': 0}
+
+def test_stream_updates_and_staleness():
+    source = ReplayWalletSource()
+    wallet = WalletState(source, max_age=0.05)
+    wallet.start()
+    assert wallet.get() is None
+
+    source.push(wallet_message("1000"))
+    snapshot = wallet.get()
+    assert snapshot.available_balance == 1000.0
+    assert snapshot.source == "stream"
+
+    time.sleep(0.06)
+    assert wallet.get() is None
+
+def test_executor_uses_cache_and_records_snapshot():
+    client = CountingClient()
+    source = ReplayWalletSource()
+    wallet = WalletState(source, max_age=60)
+    wallet.start()
+    wallet.update_from_rest(client.get_balance())
+    executor = SignalExecutor(client, parallel_take_profits=False, wallet=wallet)
+
+    result = executor.execute_signal(SIGNAL)
+    assert client.balance_calls == 1
+    assert result['balance_snapshot']['source'] == "rest"
+    assert result['contracts'] == 0.02
+
+    # После сделки снимок недействителен до обновления из потока
+    source.push(wallet_message("10000"))
+    result = executor.execute_signal(SIGNAL)
+    assert client.balance_calls == 1
+    assert result['balance_snapshot']['source'] == "stream"
+    assert result['contracts'] == 0.04
+
+    # Без обновления из потока следующий сигнал запрашивает баланс через REST
+    result = executor.execute_signal(SIGNAL)
+    assert client.balance_calls == 2
+    assert result['balance_snapshot']['version'] == 3
+
+def test_executor_without_cache_queries_every_time():
+    client = CountingClient()
+    executor = SignalExecutor(client, parallel_take_profits=False)
+    executor.execute_signal(SIGNAL)
+    executor.execute_signal(SIGNAL)
+    assert client.balance_calls == 2
+
+def fake_connect(urls, auth):
+    """Подключение без сети: запоминает адрес и результат авторизации"""
+    def connect(ws, url):
+        urls.append(url)
+        ws.endpoint = url
+        ws.auth = auth
+        ws.exited = not auth
+    return connect
+
+def test_demo_mode_uses_demo_private_endpoint(monkeypatch):
+    assert private_ws_url(demo=True) == DEMO_PRIVATE_WSS
+    assert private_ws_url() == MAINNET_PRIVATE_WSS
+    urls = []
+    monkeypatch.setattr(_WebSocketManager, "_connect", fake_connect(urls, auth=True))
+    topics = []
+    monkeypatch.setattr(_V5WebSocketManager, "subscribe", lambda ws, topic, callback, symbol=False: topics.append(topic))
+    monkeypatch.setattr(_WebSocketManager, "exit", lambda ws: None)
+    source = BybitWalletSource("key", "secret", demo=True)
+    source.subscribe(lambda message: None)
+    assert urls == [DEMO_PRIVATE_WSS]
+    assert topics == ["wallet"]
+    assert source.ws.endpoint == "wss://stream-demo.bybit.com/v5/private"
+
+def test_rejected_auth_fails_subscription(monkeypatch):
+    urls = []
+    monkeypatch.setattr(_WebSocketManager, "_connect", fake_connect(urls, auth=False))
+    monkeypatch.setattr(_WebSocketManager, "exit", lambda ws: None)
+    wallet = WalletState(BybitWalletSource("key", "secret", demo=True))
+    with pytest.raises(ConnectionError):
+        wallet.start()
+    assert urls == [DEMO_PRIVATE_WSS]
@@ -0,0 +1,38 @@
+from strategies.signals.wolfix_parser import WolfixParser
+
+TEST_SIGNAL = """🔔CRYPTO VIP SIGNAL (https://wolfxsignals.com/plans-lp/)🔔
+
+ETH/USDT 📉 BUY 
+
+🔹Entry zone: 2480-2500 
+
+💰TP1 2600
+💰TP2 2700
+💰TP3 2800
+🚫SL 2400
+
+〽️Leverage 10x"""
+
+def test_parse_signal_offline():
+    parser = WolfixParser(api_client=None)
+    assert parser.parse_signal(TEST_SIGNAL) == {
+        'symbol': "ETHUSDT", 'side': "BUY", 'entry_high': 2480.0, 'entry_low': 2500.0,
+        'tp1': 2600.0, 'tp2': 2700.0, 'tp3': 2800.0, 'sl': 2400.0, 'leverage': 10, 'parser': "Wolfix"
+    }
+
+def test_non_signal_is_rejected_by_prefilter():
+    parser = WolfixParser(api_client=None)
+    message = "🔥 TP1 hit on ETH/USDT! Congratulations to all VIP members 🚀"
+    assert not parser.can_handle(message)
+    assert parser.parse_signal(message) is None
+
+def test_missing_field_is_reported():
+    parser = WolfixParser(api_client=None)
+    signal, missing_field = parser.parse_fields(TEST_SIGNAL.replace("💰TP3 2800\n", ""))
+    assert signal is None
+    assert missing_field == 'tp'
+
+if __name__ == "__main__":
+    test_parse_signal_offline()
+    test_non_signal_is_rejected_by_prefilter()
+    test_missing_field_is_reported()